@@ -1,12 +1,180 @@
-from flask import Flask, render_template, request, jsonify
+import time
+
+_import_started = time.perf_counter()
+
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+import json
+import os
+import threading
+
+from models.cache import ExtractionCache, make_cache_key, text_hash
+from models.disk_cache import DiskExtractionCache
+from models.entity_table import EntityTable
 from models.healthcare_model import HealthcareModel
 from models.finance_model import FinanceModel
+from models.metrics import metrics, format_histogram, format_samples
+from models.registry import registry, DEFAULT_BATCH_SIZE
+from models.relation_store import RelationStore
+from models.scheduler import MicroBatchScheduler
+from models.workers import WorkerPool
+from utils.streaming import iter_batches, iter_json_array, iter_ndjson
 
 app = Flask(__name__)
 
-# Initialize models
-healthcare_model = HealthcareModel()
-finance_model = FinanceModel()
+# Optional on-disk result cache shared by all worker processes
+disk_cache = None
+if os.environ.get('EXTRACTION_DISK_CACHE'):
+    disk_cache = DiskExtractionCache(os.environ['EXTRACTION_DISK_CACHE'],
+                                     max_entries=int(os.environ.get('EXTRACTION_DISK_CACHE_SIZE', '100000')))
+
+# Optional corpus-level store of every extracted relation, with counts and provenance
+relation_store = None
+if os.environ.get('RELATION_STORE'):
+    relation_store = RelationStore(os.environ['RELATION_STORE'])
+
+# Extraction engines: 'full' runs BERT NER plus the rules, 'rules' skips BERT entirely
+ENGINES = ('full', 'rules')
+DEFAULT_ENGINE = os.environ.get('EXTRACTION_ENGINE', 'full')
+
+# Models are constructed on first use so importing the app does not wait for BERT
+MODEL_CLASSES = {
+    'healthcare': HealthcareModel,
+    'finance': FinanceModel
+}
+_models = {}
+_models_lock = threading.Lock()
+
+# Startup timings reported by /ready
+startup_timings = {'import_seconds': None, 'model_load_seconds': {}}
+
+# Set once the models are loaded eagerly (warm-up or worker pool); until then they load on first use
+_eager_loading = threading.Event()
+
+# Cache of recent results keyed by domain, ruleset version and text hash
+cache_ttl = os.environ.get('EXTRACTION_CACHE_TTL', '3600')
+extraction_cache = ExtractionCache(max_size=int(os.environ.get('EXTRACTION_CACHE_SIZE', '1024')),
+                                   ttl=float(cache_ttl) if cache_ttl else None)
+
+# Optional micro-batching of concurrent /extract calls, one scheduler per domain
+MICROBATCH = os.environ.get('EXTRACTION_MICROBATCH', '0') == '1'
+MICROBATCH_MAX_SIZE = int(os.environ.get('EXTRACTION_MICROBATCH_SIZE', str(DEFAULT_BATCH_SIZE)))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get('EXTRACTION_MICROBATCH_WAIT_MS', '10'))
+_schedulers = {}
+
+# Optional pool of forked inference processes sharing the loaded models
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', '0'))
+worker_pool = None
+
+# Request-level metrics; recorded only when EXTRACTION_METRICS=1
+request_count = metrics.counter('extraction_requests_total', 'HTTP requests by endpoint, method and status',
+                                ('endpoint', 'method', 'status'))
+request_seconds = metrics.histogram('extraction_request_seconds', 'HTTP request latency', ('endpoint',))
+
+def get_model(domain):
+    """Return the model for a domain, constructing it on first use."""
+    model = _models.get(domain)
+    if model is None:
+        with _models_lock:
+            model = _models.get(domain)
+            if model is None:
+                started = time.perf_counter()
+                # A rules-only deployment never loads the NER model
+                model = MODEL_CLASSES[domain](cache=disk_cache, use_ner=DEFAULT_ENGINE != 'rules')
+                startup_timings['model_load_seconds'][domain] = time.perf_counter() - started
+                _models[domain] = model
+    return model
+
+def get_scheduler(domain):
+    """Return the micro-batch scheduler for a domain, starting it on first use."""
+    scheduler = _schedulers.get(domain)
+    if scheduler is None:
+        model = get_model(domain)
+        with _models_lock:
+            scheduler = _schedulers.get(domain)
+            if scheduler is None:
+                scheduler = MicroBatchScheduler(model, max_batch_size=MICROBATCH_MAX_SIZE,
+                                                max_wait_ms=MICROBATCH_MAX_WAIT_MS)
+                _schedulers[domain] = scheduler
+    return scheduler
+
+def start_worker_pool(processes=INFERENCE_WORKERS, torch_threads=None):
+    """Load every model, then fork the inference workers that share them."""
+    global worker_pool
+    warm_up()
+    if torch_threads is None and os.environ.get('INFERENCE_TORCH_THREADS'):
+        torch_threads = int(os.environ['INFERENCE_TORCH_THREADS'])
+    try:
+        worker_pool = WorkerPool(_models, processes=processes, torch_threads=torch_threads)
+        print(f"Started {worker_pool.processes} inference workers "
+              f"with {worker_pool.torch_threads} torch threads each")
+    except RuntimeError as e:
+        print(f"Running inference in-process: {e}")
+    return worker_pool
+
+def warm_up():
+    """Construct every domain model so the first requests do not pay for loading."""
+    _eager_loading.set()
+    for domain in MODEL_CLASSES:
+        get_model(domain)
+
+def start_warm_up():
+    """Load the models in a background thread."""
+    thread = threading.Thread(target=warm_up, name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def run_extraction(domain, text, use_ner=True):
+    """
+    Extract entities and relations for one document, using the result cache.
+
+    Args:
+        domain (str): Key of MODEL_CLASSES
+        text (str): Input text
+        use_ner (bool): False runs the rules only
+
+    Returns:
+        tuple: (entities, relations)
+    """
+    with metrics.span('extract', domain=domain, use_ner=use_ner):
+        model = get_model(domain)
+        
+        # Identical resubmissions are served from the cache
+        key = make_cache_key(domain, model.cache_version(use_ner), text)
+        if worker_pool is not None:
+            compute = lambda: worker_pool.extract(domain, text, use_ner=use_ner)
+        elif MICROBATCH:
+            # Concurrent requests for the same domain share one batched pipeline call
+            compute = lambda: get_scheduler(domain).extract(text, use_ner=use_ner)
+        else:
+            compute = lambda: model.extract(text, use_ner=use_ner)
+        entities, relations = extraction_cache.get_or_compute(key, compute)
+        
+        # Documents are keyed by text hash, so resubmissions are not counted twice
+        store_relations([(key[2], domain, relations)])
+        return entities, relations
+
+def store_relations(documents):
+    """Add (document key, domain, relations) to the relation store; failures are logged, not raised."""
+    if relation_store is None:
+        return
+    try:
+        relation_store.ingest(documents)
+    except Exception as e:
+        print(f"Error adding relations to the store: {e}")
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled:
+        g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unknown'
+        request_seconds.observe(time.perf_counter() - started, endpoint=endpoint)
+        request_count.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
 
 @app.route('/')
 def index():
@@ -17,14 +185,14 @@ def extract_relations():
     # Get data from request
     text = request.form['text']
     domain = request.form['domain']
+    engine = request.form.get('engine', DEFAULT_ENGINE)
     
     # Process based on selected domain
-    if domain == 'healthcare':
-        entities, relations = healthcare_model.extract(text)
-    elif domain == 'finance':
-        entities, relations = finance_model.extract(text)
-    else:
+    if domain not in MODEL_CLASSES:
         return jsonify({'error': 'Invalid domain selected'})
+    if engine not in ENGINES:
+        return jsonify({'error': 'Invalid engine selected'})
+    entities, relations = run_extraction(domain, text, engine == 'full')
     
     # Return results
     return jsonify({
@@ -32,5 +200,243 @@ def extract_relations():
         'relations': relations
     })
 
+def extract_batch_lines(records, use_ner, batch_size, entity_table=None):
+    """
+    Run records through the models one micro-batch at a time and yield NDJSON lines.
+    
+    With an entity_table, results are written in compact form: entities and relations
+    reference interned entity IDs, whose type and text are sent once per stream.
+    """
+    for batch in iter_batches(records, batch_size):
+        # Group the micro-batch by domain so each model gets one batched call
+        by_domain = {}
+        for record in batch:
+            if not isinstance(record, dict) or not isinstance(record.get('text'), str):
+                yield json.dumps({'id': record.get('id') if isinstance(record, dict) else None,
+                                  'error': 'Record must be an object with a text field'}) + '\n'
+            elif record.get('domain') not in MODEL_CLASSES:
+                yield json.dumps({'id': record.get('id'), 'error': 'Invalid domain selected'}) + '\n'
+            else:
+                by_domain.setdefault(record['domain'], []).append(record)
+        
+        for domain, domain_records in by_domain.items():
+            texts = [record['text'] for record in domain_records]
+            if worker_pool is not None:
+                results = worker_pool.extract_many(domain, texts, batch_size=batch_size, use_ner=use_ner)
+            else:
+                results = get_model(domain).extract_many(texts, batch_size=batch_size, use_ner=use_ner)
+            store_relations((text_hash(record['text']), domain, relations)
+                            for record, (_, relations) in zip(domain_records, results))
+            for record, (entities, relations) in zip(domain_records, results):
+                if entity_table is not None:
+                    # IDs are attached after the cache so cached results stay shareable
+                    yield json.dumps({'id': record.get('id'), 'domain': domain,
+                                      **entity_table.to_compact(domain, entities, relations)}) + '\n'
+                    continue
+                yield json.dumps({
+                    'id': record.get('id'),
+                    'domain': domain,
+                    'entities': entities,
+                    'relations': relations
+                }) + '\n'
+
+@app.route('/extract/batch', methods=['POST'])
+def extract_batch():
+    # Records arrive as a JSON array or as NDJSON and are parsed incrementally
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        records = iter_ndjson(request.stream)
+    else:
+        records = iter_json_array(request.stream)
+    
+    engine = request.args.get('engine', DEFAULT_ENGINE)
+    if engine not in ENGINES:
+        return jsonify({'error': 'Invalid engine selected'}), 400
+    batch_size = request.args.get('batch_size', DEFAULT_BATCH_SIZE, type=int)
+    output_format = request.args.get('format', 'full')
+    if output_format not in ('full', 'compact'):
+        return jsonify({'error': 'Invalid output format selected'}), 400
+    # Entity IDs are numbered per response, so every stream can be decoded on its own
+    entity_table = EntityTable() if output_format == 'compact' else None
+    
+    def generate():
+        try:
+            yield from extract_batch_lines(records, engine == 'full', max(batch_size, 1), entity_table)
+        except ValueError as e:
+            # Malformed input ends the stream with an error line
+            yield json.dumps({'error': f'Invalid batch input: {e}'}) + '\n'
+    
+    # Results stream back as each micro-batch finishes
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/graph', methods=['POST'])
+def graph_image():
+    # Imported here so starting the server does not wait for matplotlib
+    from utils.visualization import IMAGE_FORMATS, renderer
+    
+    image_format = request.args.get('format', 'png')
+    if image_format not in IMAGE_FORMATS:
+        return jsonify({'error': 'Invalid image format selected'}), 400
+    data = request.get_json(silent=True) or {}
+    try:
+        image = renderer.render(data.get('entities', []), data.get('relations', []), image_format)
+    except (KeyError, TypeError, AttributeError):
+        return jsonify({'error': 'Graph needs entities (text, type) and relations (source, target, type)'}), 400
+    return Response(image, mimetype=IMAGE_FORMATS[image_format])
+
+@app.route('/graph/summary', methods=['POST'])
+def graph_summary():
+    from utils.visualization import DEFAULT_MAX_NODES, RANKINGS, graph_to_json, level_of_detail, register_graph
+    
+    max_nodes = request.args.get('max_nodes', DEFAULT_MAX_NODES, type=int)
+    min_edge_weight = request.args.get('min_edge_weight', 1, type=int)
+    rank_by = request.args.get('rank_by', 'degree')
+    if rank_by not in RANKINGS:
+        return jsonify({'error': 'Invalid ranking selected'}), 400
+    data = request.get_json(silent=True) or {}
+    try:
+        graph_id, G = register_graph(data.get('entities', []), data.get('relations', []))
+    except (KeyError, TypeError, AttributeError):
+        return jsonify({'error': 'Graph needs entities (text, type) and relations (source, target, type)'}), 400
+    
+    # The view is bounded by max_nodes; the rest is fetched through /graph/expand
+    view = graph_to_json(level_of_detail(G, max(max_nodes, 1), min_edge_weight, rank_by))
+    return jsonify({
+        'graph_id': graph_id,
+        'total_nodes': G.number_of_nodes(),
+        'total_edges': G.number_of_edges(),
+        **view
+    })
+
+@app.route('/graph/expand')
+def graph_expand():
+    from utils.visualization import DEFAULT_MAX_NODES, RANKINGS, graph_to_json, lookup_graph, neighborhood
+    
+    G = lookup_graph(request.args.get('graph_id', ''))
+    if G is None:
+        return jsonify({'error': 'Unknown graph; post it to /graph/summary again'}), 404
+    node = request.args.get('node', '')
+    depth = min(max(request.args.get('depth', 1, type=int), 1), 3)
+    max_nodes = min(max(request.args.get('max_nodes', 50, type=int), 1), DEFAULT_MAX_NODES)
+    min_edge_weight = request.args.get('min_edge_weight', 1, type=int)
+    rank_by = request.args.get('rank_by', 'degree')
+    if rank_by not in RANKINGS:
+        return jsonify({'error': 'Invalid ranking selected'}), 400
+    try:
+        view = graph_to_json(neighborhood(G, node, depth, max_nodes, min_edge_weight, rank_by))
+    except KeyError:
+        return jsonify({'error': f'Unknown node: {node}'}), 404
+    return jsonify({'graph_id': request.args['graph_id'], 'node': node, **view})
+
+@app.route('/relations')
+def relations_query():
+    if relation_store is None:
+        return jsonify({'error': 'Relation store is disabled; set RELATION_STORE'}), 404
+    role = request.args.get('role', 'any')
+    if role not in ('any', 'source', 'target'):
+        return jsonify({'error': 'Invalid role selected'}), 400
+    results = relation_store.query(entity=request.args.get('entity'),
+                                   relation_type=request.args.get('type'),
+                                   role=role,
+                                   domain=request.args.get('domain'),
+                                   limit=request.args.get('limit', 100, type=int))
+    return jsonify({'relations': results})
+
+@app.route('/relations/provenance')
+def relations_provenance():
+    if relation_store is None:
+        return jsonify({'error': 'Relation store is disabled; set RELATION_STORE'}), 404
+    if not all(request.args.get(name) for name in ('source', 'type', 'target')):
+        return jsonify({'error': 'source, type and target are required'}), 400
+    documents = relation_store.provenance(request.args['source'], request.args['type'], request.args['target'],
+                                          domain=request.args.get('domain'))
+    return jsonify({'documents': documents})
+
+@app.route('/relations/stats')
+def relations_stats():
+    if relation_store is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **relation_store.stats()})
+
+@app.route('/cache/stats')
+def cache_stats():
+    stats = {'memory': extraction_cache.stats()}
+    if disk_cache is not None:
+        stats['disk'] = disk_cache.stats()
+    return jsonify(stats)
+
+@app.route('/scheduler/stats')
+def scheduler_stats():
+    return jsonify({
+        'enabled': MICROBATCH,
+        'domains': {domain: scheduler.stats() for domain, scheduler in sorted(_schedulers.items())}
+    })
+
+def collect_runtime_metrics():
+    """Export cache and micro-batch scheduler statistics when /metrics is scraped."""
+    caches = {'memory': extraction_cache.stats()}
+    if disk_cache is not None:
+        caches['disk'] = disk_cache.stats()
+    lines = []
+    lines += format_samples('extraction_cache_hits_total', 'counter', 'Result cache hits',
+                            [({'cache': name}, stats['hits']) for name, stats in caches.items()])
+    lines += format_samples('extraction_cache_misses_total', 'counter', 'Result cache misses',
+                            [({'cache': name}, stats['misses']) for name, stats in caches.items()])
+    lines += format_samples('extraction_cache_entries', 'gauge', 'Results held in the cache',
+                            [({'cache': name}, stats['size']) for name, stats in caches.items()])
+    
+    schedulers = {domain: scheduler.stats() for domain, scheduler in sorted(_schedulers.items())}
+    lines += format_samples('extraction_microbatch_queue_depth', 'gauge', 'Requests waiting for a micro-batch',
+                            [({'domain': domain}, stats['queue_depth']) for domain, stats in schedulers.items()])
+    for name, key, help_text in (('extraction_microbatch_size', 'batch_size', 'Documents per micro-batch'),
+                                 ('extraction_microbatch_wait_ms', 'wait_ms', 'Milliseconds a request waited for its batch')):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for domain, stats in schedulers.items():
+            histogram = stats[key]
+            lines += format_histogram(name, histogram['buckets'], histogram['sum'], histogram['count'],
+                                      {'domain': domain})
+    return lines
+
+metrics.add_collector(collect_runtime_metrics)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/traces')
+def traces():
+    return jsonify({'enabled': metrics.tracing, 'traces': metrics.traces()})
+
+@app.route('/health')
+def health():
+    return jsonify({'status': 'ok'})
+
+@app.route('/ready')
+def ready():
+    loaded = sorted(_models)
+    # Without warm-up, models only load when a request needs them, so waiting for them would never end
+    lazy = not _eager_loading.is_set()
+    is_ready = lazy or len(loaded) == len(MODEL_CLASSES)
+    response = jsonify({
+        'ready': is_ready,
+        'lazy_loading': lazy,
+        'models': loaded,
+        'timings': {
+            'import_seconds': startup_timings['import_seconds'],
+            'model_load_seconds': dict(startup_timings['model_load_seconds']),
+            'ner': registry.timings()
+        }
+    })
+    return response, 200 if is_ready else 503
+
+startup_timings['import_seconds'] = time.perf_counter() - _import_started
+
+if INFERENCE_WORKERS > 0:
+    # Fork before any request thread or warm-up thread exists
+    start_worker_pool()
+elif os.environ.get('EXTRACTION_WARMUP', '0') == '1':
+    start_warm_up()
+
 if __name__ == '__main__':
+    if worker_pool is None:
+        start_warm_up()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+Asyncio serving mode for the extraction service.
+
+Exposes the same `/` and `/extract` contract as app.py as a plain ASGI
+application, so one process can hold many open connections while model
+inference runs on a bounded thread pool:
+
+    uvicorn asgi:app --workers 1
+
+Requests beyond the pending limit are rejected with 429, and requests that
+arrive while the server is shutting down get 503. On shutdown the server
+waits for in-flight extractions to finish before exiting.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import json
+import mimetypes
+import os
+
+from flask import render_template
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import FormDataParser
+from werkzeug.http import parse_options_header
+from werkzeug.security import safe_join
+
+import app as flask_app
+
+# Threads running model inference
+INFERENCE_THREADS = int(os.environ.get('ASGI_INFERENCE_THREADS', '4'))
+# Extractions allowed to run or wait for a thread before new ones are rejected
+MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', '64'))
+# Largest accepted request body in bytes
+MAX_BODY_SIZE = int(os.environ.get('ASGI_MAX_BODY_SIZE', str(1024 * 1024)))
+# Seconds to wait for in-flight extractions on shutdown
+DRAIN_TIMEOUT = float(os.environ.get('ASGI_DRAIN_TIMEOUT', '30'))
+# Seconds clients are told to wait before retrying a rejected request
+RETRY_AFTER = os.environ.get('ASGI_RETRY_AFTER', '1')
+
+
+class ExtractionServer:
+    """ASGI application serving the extraction form and the /extract endpoint."""
+
+    def __init__(self, inference_threads=INFERENCE_THREADS, max_pending=MAX_PENDING):
+        """
+        Initialize the server.
+
+        Args:
+            inference_threads (int): Size of the inference thread pool
+            max_pending (int): Maximum number of queued or running extractions
+        """
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=inference_threads, thread_name_prefix='inference')
+        self.pending = 0
+        self.draining = False
+        self._idle = None
+        self._index_html = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        """Warm up the models on startup and drain in-flight work on shutdown."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if os.environ.get('EXTRACTION_WARMUP', '0') == '1':
+                    flask_app.start_warm_up()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.drain()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def drain(self, timeout=DRAIN_TIMEOUT):
+        """Stop accepting extractions and wait for the running ones to finish."""
+        self.draining = True
+        if self._idle is not None:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                print(f"Shutting down with {self.pending} extractions still running")
+        self.executor.shutdown(wait=False)
+        for scheduler in flask_app._schedulers.values():
+            scheduler.close(timeout=1)
+
+    async def handle(self, scope, receive, send):
+        """Route an HTTP request."""
+        path = scope['path']
+        method = scope['method']
+
+        if path == '/' and method in ('GET', 'HEAD'):
+            await self.respond(send, 200, self.index_html(), 'text/html; charset=utf-8')
+        elif path == '/extract':
+            if method != 'POST':
+                await self.respond_json(send, 405, {'error': 'Method not allowed'})
+            else:
+                await self.extract(scope, receive, send)
+        elif path.startswith('/static/') and method in ('GET', 'HEAD'):
+            await self.static(path[len('/static/'):], send)
+        elif path == '/metrics' and method == 'GET':
+            body = flask_app.metrics.render().encode('utf-8')
+            await self.respond(send, 200, body, 'text/plain; version=0.0.4; charset=utf-8')
+        elif path == '/health':
+            if self.draining:
+                await self.respond_json(send, 503, {'status': 'draining'})
+            else:
+                await self.respond_json(send, 200, {'status': 'ok'})
+        else:
+            await self.respond_json(send, 404, {'error': 'Not found'})
+
+    async def extract(self, scope, receive, send):
+        """Handle POST /extract with the same form fields and response as app.py."""
+        if self.draining:
+            await self.respond_json(send, 503, {'error': 'Server is shutting down'},
+                                    [(b'retry-after', RETRY_AFTER.encode())])
+            return
+        if self.pending >= self.max_pending:
+            # Backpressure: reject instead of queueing without bound
+            await self.respond_json(send, 429, {'error': 'Too many pending requests'},
+                                    [(b'retry-after', RETRY_AFTER.encode())])
+            return
+
+        if self._idle is None:
+            # Created lazily so it belongs to the running event loop
+            self._idle = asyncio.Event()
+        # Counted before the body is read so concurrent uploads cannot overshoot the limit
+        self.pending += 1
+        self._idle.clear()
+        try:
+            await self.run_extract(scope, receive, send)
+        finally:
+            self.pending -= 1
+            if self.pending == 0:
+                self._idle.set()
+
+    async def run_extract(self, scope, receive, send):
+        """Parse the form, run the extraction on the executor and send the result."""
+        body = await self.read_body(receive)
+        if body is None:
+            await self.respond_json(send, 413, {'error': 'Request body too large'})
+            return
+        try:
+            form = self.parse_form(scope, body)
+        except RequestEntityTooLarge:
+            await self.respond_json(send, 413, {'error': 'Too many form fields'})
+            return
+        except ValueError as e:
+            print(f"Malformed form data: {e}")
+            await self.respond_json(send, 400, {'error': 'Malformed form data'})
+            return
+        if 'text' not in form or 'domain' not in form:
+            await self.respond_json(send, 400, {'error': 'Missing text or domain'})
+            return
+
+        text = form['text']
+        domain = form['domain']
+        engine = form.get('engine', flask_app.DEFAULT_ENGINE)
+        if domain not in flask_app.MODEL_CLASSES:
+            await self.respond_json(send, 200, {'error': 'Invalid domain selected'})
+            return
+        if engine not in flask_app.ENGINES:
+            await self.respond_json(send, 200, {'error': 'Invalid engine selected'})
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+            entities, relations = await loop.run_in_executor(
+                self.executor, flask_app.run_extraction, domain, text, engine == 'full'
+            )
+        except Exception as e:
+            print(f"Error during extraction: {e}")
+            await self.respond_json(send, 500, {'error': 'Extraction failed'})
+            return
+
+        await self.respond_json(send, 200, {'entities': entities, 'relations': relations})
+
+    async def read_body(self, receive):
+        """Read the request body, or return None if it exceeds MAX_BODY_SIZE."""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_SIZE:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    @staticmethod
+    def parse_form(scope, body):
+        """
+        Decode a urlencoded or multipart form body into a dict of fields, with Flask's form limits.
+
+        Raises:
+            ValueError: If the body is malformed
+            RequestEntityTooLarge: If it has more fields or form data than app.py accepts
+        """
+        headers = dict(scope['headers'])
+        mimetype, options = parse_options_header(headers.get(b'content-type', b'').decode('latin-1'))
+        parser = FormDataParser(silent=False, max_form_parts=flask_app.app.config['MAX_FORM_PARTS'],
+                                max_form_memory_size=flask_app.app.config['MAX_FORM_MEMORY_SIZE'])
+        _, form, _ = parser.parse(BytesIO(body), mimetype, len(body), options)
+        return form.to_dict()
+
+    def index_html(self):
+        """Render the extraction page once and reuse it."""
+        if self._index_html is None:
+            with flask_app.app.test_request_context('/'):
+                self._index_html = render_template('index.html').encode('utf-8')
+        return self._index_html
+
+    async def static(self, filename, send):
+        """Serve a file from the Flask static folder."""
+        path = safe_join(flask_app.app.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            await self.respond_json(send, 404, {'error': 'Not found'})
+            return
+        with open(path, 'rb') as f:
+            content = f.read()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        await self.respond(send, 200, content, content_type)
+
+    @staticmethod
+    async def respond(send, status, body, content_type, headers=()):
+        """Send a complete response."""
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type.encode()),
+                        (b'content-length', str(len(body)).encode())] + list(headers)
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def respond_json(self, send, status, payload, headers=()):
+        """Send a JSON response."""
+        await self.respond(send, status, json.dumps(payload).encode('utf-8'), 'application/json', headers)
+
+
+app = ExtractionServer()
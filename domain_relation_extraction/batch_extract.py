@@ -0,0 +1,267 @@
+"""
+Stream a corpus through the domain models and write results as JSON lines.
+
+Input is read incrementally from a JSON array, an object holding the records
+under a key (such as data/*/samples.json), or JSONL, so memory stays flat
+whatever the corpus size. Progress is checkpointed after every batch and an
+interrupted run continues where it stopped:
+
+    python batch_extract.py data/healthcare/samples.json --domain healthcare -o results.jsonl
+    python batch_extract.py corpus.jsonl -o results.jsonl --workers 4 --batch-size 32
+"""
+import argparse
+from collections import deque
+import json
+import os
+import sys
+import time
+
+from models.disk_cache import DiskExtractionCache
+from models.entity_table import EntityTable
+from models.healthcare_model import HealthcareModel
+from models.finance_model import FinanceModel
+from models.registry import DEFAULT_BATCH_SIZE
+from models.relation_store import RelationStore
+from models.workers import WorkerPool
+from utils.streaming import iter_batches, iter_json_array, iter_ndjson
+
+MODEL_CLASSES = {
+    'healthcare': HealthcareModel,
+    'finance': FinanceModel
+}
+
+
+class _Completed:
+    """Already available result with the same get() interface as an AsyncResult."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, timeout=None):
+        return self.value
+
+
+def read_records(path, key='samples'):
+    """
+    Yield records from a JSONL file, a JSON array, or a JSON object holding an array under key.
+
+    Args:
+        path (str): Input file; '-' reads JSONL from standard input
+        key (str): Member holding the records when the JSON document is an object
+
+    Yields:
+        object: One record at a time
+    """
+    if path == '-':
+        yield from iter_ndjson(sys.stdin.buffer)
+        return
+    with open(path, 'rb') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            yield from iter_ndjson(f)
+        else:
+            yield from iter_json_array(f, key=key)
+
+
+def load_checkpoint(path):
+    """Return the saved progress ({'records': ..., 'output_bytes': ...}) or None."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, records, output_bytes):
+    """Atomically record how many input records are done and how much output is valid."""
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump({'records': records, 'output_bytes': output_bytes}, f)
+    os.replace(temporary, path)
+
+
+def submit_batch(batch, first_index, submit, domains, default_domain, text_field, id_field):
+    """
+    Validate a batch and start extraction for each domain in it.
+
+    Args:
+        batch (list): Records
+        first_index (int): Input position of the first record, used when a record has no id
+        submit (function): submit(domain, texts) returning an object with get()
+        domains (iterable): Domains with a loaded model
+        default_domain (str): Domain for records without a 'domain' field
+        text_field (str): Record field holding the text
+        id_field (str): Record field holding the identifier
+
+    Returns:
+        tuple: (output records with errors filled in, [(domain, indices, pending result)])
+    """
+    outputs = [None] * len(batch)
+    by_domain = {}
+    for index, record in enumerate(batch):
+        if isinstance(record, str):
+            record = batch[index] = {text_field: record}
+        if not isinstance(record, dict) or not isinstance(record.get(text_field), str):
+            outputs[index] = {'id': first_index + index, 'error': f"Record must be an object with a {text_field} field"}
+            continue
+        domain = record.get('domain', default_domain)
+        if domain not in domains:
+            outputs[index] = {'id': record.get(id_field, first_index + index), 'error': 'Invalid domain selected'}
+            continue
+        by_domain.setdefault(domain, []).append(index)
+
+    pending = [(domain, indices, submit(domain, [batch[index][text_field] for index in indices]))
+               for domain, indices in by_domain.items()]
+    return outputs, pending
+
+
+def finish_batch(batch, first_index, outputs, pending, id_field):
+    """Wait for a batch's results and return its output records in input order."""
+    for domain, indices, result in pending:
+        for index, (entities, relations) in zip(indices, result.get()):
+            outputs[index] = {
+                'id': batch[index].get(id_field, first_index + index),
+                'domain': domain,
+                'entities': entities,
+                'relations': relations
+            }
+    return outputs
+
+
+def extract_corpus(records, submit, batch_size, max_in_flight, domains=tuple(MODEL_CLASSES),
+                   default_domain=None, text_field='text', id_field='id', start=0):
+    """
+    Run records through the models batch by batch.
+
+    Args:
+        records (iterable): Input records, consumed lazily
+        submit (function): submit(domain, texts) returning an object with get()
+        batch_size (int): Records per batch
+        max_in_flight (int): Batches submitted ahead of the one being written
+        domains (iterable): Domains with a loaded model
+        default_domain (str, optional): Domain for records without a 'domain' field
+        text_field (str): Record field holding the text
+        id_field (str): Record field holding the identifier
+        start (int): Input position of the first record
+
+    Yields:
+        tuple: (number of input records finished so far, output records of one batch)
+    """
+    in_flight = deque()
+    position = start
+    for batch in iter_batches(records, batch_size):
+        outputs, pending = submit_batch(batch, position, submit, domains, default_domain, text_field, id_field)
+        in_flight.append((batch, position, outputs, pending))
+        position += len(batch)
+        # Bounded look-ahead keeps memory flat while workers stay busy
+        while len(in_flight) > max_in_flight:
+            done, first_index, outputs, pending = in_flight.popleft()
+            yield first_index + len(done), finish_batch(done, first_index, outputs, pending, id_field)
+    while in_flight:
+        done, first_index, outputs, pending = in_flight.popleft()
+        yield first_index + len(done), finish_batch(done, first_index, outputs, pending, id_field)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help="JSON array, JSON object with --key, or JSONL file ('-' for JSONL on stdin)")
+    parser.add_argument('-o', '--output', required=True, help="JSONL file results are appended to")
+    parser.add_argument('--domain', choices=sorted(MODEL_CLASSES),
+                        help="domain for records without a 'domain' field")
+    parser.add_argument('--key', default='samples', help="member holding the records in a JSON object")
+    parser.add_argument('--text-field', default='text')
+    parser.add_argument('--id-field', default='id')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=0, help="forked inference processes (0 runs in-process)")
+    parser.add_argument('--engine', choices=['full', 'rules'], default='full')
+    parser.add_argument('--checkpoint', help="progress file (default: <output>.checkpoint)")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint and start over")
+    parser.add_argument('--store', help="SQLite relation store the extracted relations are added to")
+    parser.add_argument('--cache', help="SQLite result cache; documents extracted before are served from it")
+    parser.add_argument('--compact', action='store_true',
+                        help="write entities and relations as interned entity IDs (resume with the same flag)")
+    args = parser.parse_args()
+
+    use_ner = args.engine == 'full'
+    checkpoint_path = args.checkpoint or args.output + '.checkpoint'
+    checkpoint = None if args.restart else load_checkpoint(checkpoint_path)
+    if checkpoint and not os.path.exists(args.output):
+        print(f"Ignoring {checkpoint_path}: {args.output} does not exist")
+        checkpoint = None
+    start = checkpoint['records'] if checkpoint else 0
+
+    # Drop output written after the last checkpoint so resumed runs do not duplicate lines
+    output = open(args.output, 'r+b' if checkpoint else 'wb')
+    if checkpoint:
+        output.truncate(checkpoint['output_bytes'])
+        output.seek(checkpoint['output_bytes'])
+        print(f"Resuming after {start} records")
+
+    entity_table = EntityTable() if args.compact else None
+    if entity_table is not None and checkpoint:
+        # Entity IDs continue from the ones already defined in the output
+        output.seek(0)
+        for line in output:
+            for entry in json.loads(line).get('entity_table', []):
+                entity_table.restore(*entry)
+
+    domains = [args.domain] if args.domain else list(MODEL_CLASSES)
+    # The cache has the EXTRACTION_DISK_CACHE format, so the server and the CLI can share one file
+    cache = DiskExtractionCache(args.cache) if args.cache else None
+    models = {domain: MODEL_CLASSES[domain](cache=cache, use_ner=use_ner) for domain in domains}
+    pool = None
+    if args.workers > 0:
+        try:
+            pool = WorkerPool(models, processes=args.workers)
+        except RuntimeError as e:
+            print(f"Running in-process: {e}")
+    if pool is not None:
+        submit = lambda domain, texts: pool.submit(domain, texts, use_ner=use_ner)
+        max_in_flight = args.workers * 2
+    else:
+        submit = lambda domain, texts: _Completed(
+            models[domain].extract_many(texts, batch_size=args.batch_size, use_ner=use_ner))
+        max_in_flight = 0
+
+    # Skipping already processed records reads them but keeps none in memory
+    records = read_records(args.input, args.key)
+    for _ in range(start):
+        if next(records, None) is None:
+            break
+
+    # Records are keyed by input file and id in the store, so batches repeated after a resume are
+    # not counted twice and records of different files with the same id (or position) do not collide
+    store = RelationStore(args.store) if args.store else None
+    source = 'stdin' if args.input == '-' else os.path.abspath(args.input)
+
+    started = time.perf_counter()
+    written = 0
+    try:
+        for finished, outputs in extract_corpus(records, submit, max(args.batch_size, 1), max_in_flight, list(models),
+                                                args.domain, args.text_field, args.id_field, start):
+            if store is not None:
+                store.ingest((f"{source}#{result['id']}", result['domain'], result['relations'])
+                             for result in outputs if 'error' not in result)
+            for result in outputs:
+                if entity_table is not None and 'error' not in result:
+                    result.update(entity_table.to_compact(result['domain'], result['entities'], result['relations']))
+                output.write(json.dumps(result, ensure_ascii=False).encode('utf-8') + b'\n')
+            output.flush()
+            save_checkpoint(checkpoint_path, finished, output.tell())
+            written += len(outputs)
+    finally:
+        output.close()
+        if store is not None:
+            store.close()
+        if pool is not None:
+            pool.close()
+
+    elapsed = time.perf_counter() - started
+    rate = written / elapsed if elapsed > 0 else 0
+    print(f"Processed {written} records in {elapsed:.1f}s ({rate:.1f} docs/sec); results in {args.output}")
+    if cache is not None and pool is None:
+        # Worker processes count their own lookups, so totals are only known in-process
+        stats = cache.stats()
+        print(f"Result cache: {stats['hits']} hits, {stats['misses']} misses")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,9 @@
 # In models/__init__.py
-from transformers import AutoTokenizer, AutoModel, pipeline
 
 def download_models():
+    # Imported here so that importing the models package does not load transformers
+    from transformers import AutoTokenizer, AutoModel, pipeline
+    
     # Healthcare models
     print("Downloading BioBERT...")
     biobert_tokenizer = AutoTokenizer.from_pretrained("dmis-lab/biobert-v1.1")
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+
+
+def text_hash(text):
+    """Return a stable content hash for a document."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def ruleset_fingerprint(*parts):
+    """
+    Hash model configuration so cached results are invalidated when rules change.
+
+    Args:
+        *parts: JSON-serializable pieces of configuration (checkpoint, keyword lists, ...)
+
+    Returns:
+        str: Short hexadecimal fingerprint
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def make_cache_key(domain, version, text):
+    """Build the cache key for a document processed by a domain model."""
+    return (domain, version, text_hash(text))
+
+
+class ExtractionCache:
+    """Thread-safe LRU cache of extraction results with optional time-based expiry."""
+
+    def __init__(self, max_size=1024, ttl=None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size (int): Maximum number of cached results
+            ttl (float, optional): Seconds an entry stays valid; None keeps entries until evicted
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for a key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries when full."""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for a key, computing and storing it on a miss.
+
+        Args:
+            key (tuple): Cache key from make_cache_key
+            compute (function): Called without arguments to produce the value
+
+        Returns:
+            The cached or freshly computed value
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl
+            }
@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# How many writes happen between checks of the size bound
+EVICTION_INTERVAL = 100
+
+# Seconds before a hit refreshes an entry's access time; fresher hits stay read-only
+ACCESS_REFRESH_INTERVAL = 60
+
+
+class DiskExtractionCache:
+    """SQLite-backed extraction cache that several worker processes can share."""
+
+    def __init__(self, path, max_entries=100000):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path (str): Path of the SQLite file
+            max_entries (int): Number of results kept before the least recently used are evicted
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, domain TEXT, version TEXT, value TEXT, accessed REAL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        connection.commit()
+
+    def _connection(self):
+        """Return a connection owned by the current thread and process."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            # Connections must not cross threads or survive a fork
+            connection = sqlite3.connect(self.path, timeout=30)
+            # WAL lets readers in other processes proceed while one process writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _key(key):
+        """Flatten a (domain, version, text hash) key into a string."""
+        return ':'.join(key)
+
+    def get(self, key):
+        """
+        Return the cached (entities, relations) for a key, or None if missing.
+
+        Hits only write when the stored access time is older than
+        ACCESS_REFRESH_INTERVAL, so concurrent readers do not queue for
+        SQLite's write lock; eviction order is accurate to that interval.
+        """
+        connection = self._connection()
+        row = connection.execute("SELECT value, accessed FROM results WHERE key = ?", (self._key(key),)).fetchone()
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        value, accessed = row
+        now = time.time()
+        if now - accessed > ACCESS_REFRESH_INTERVAL:
+            connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, self._key(key)))
+            connection.commit()
+        entities, relations = json.loads(value)
+        return entities, relations
+
+    def set(self, key, value):
+        """Store an (entities, relations) result and enforce the size bound."""
+        domain, version, _ = key
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO results (key, domain, version, value, accessed) VALUES (?, ?, ?, ?, ?)",
+            (self._key(key), domain, version, json.dumps(list(value)), time.time())
+        )
+        connection.commit()
+
+        with self._stats_lock:
+            self._writes += 1
+            check = self._writes % EVICTION_INTERVAL == 0
+        if check:
+            self.evict()
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for a key, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def evict(self):
+        """Delete the least recently used results beyond max_entries."""
+        connection = self._connection()
+        count = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY accessed LIMIT ?)", (excess,)
+            )
+            connection.commit()
+
+    def clear(self):
+        """Remove all cached results."""
+        connection = self._connection()
+        connection.execute("DELETE FROM results")
+        connection.commit()
+
+    def stats(self):
+        """Return hit/miss counters for this process and the number of stored results."""
+        size = self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0,
+                'size': size,
+                'max_entries': self.max_entries,
+                'path': self.path
+            }
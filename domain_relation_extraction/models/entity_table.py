@@ -0,0 +1,134 @@
+import threading
+
+
+def canonical_text(text):
+    """Normalize an entity mention: lowercase with runs of whitespace collapsed."""
+    return ' '.join(text.lower().split())
+
+
+class EntityTable:
+    """
+    Interns canonical entities, (domain, type, normalized text), to dense integer IDs.
+
+    This is only a compact output encoding. IDs are assigned to finished
+    extraction results and are local to one table, i.e. one response stream or
+    output file: another table numbers the same entities differently. The
+    models still deduplicate and return entities by text, and the relation
+    store keys entities by canonical text, never by these IDs.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def intern(self, domain, entity_type, text):
+        """
+        Return the ID of an entity, assigning the next free one on first sight.
+
+        Args:
+            domain (str): Domain the entity was extracted in
+            entity_type (str): Entity type such as 'MEDICATION'
+            text (str): Surface text; the first one seen becomes the display text
+
+        Returns:
+            int: Entity ID
+        """
+        return self._intern(domain, entity_type, text)[0]
+
+    def _intern(self, domain, entity_type, text):
+        """Return (ID, True if the ID was assigned by this call)."""
+        key = (domain, entity_type, canonical_text(text))
+        entity_id = self._ids.get(key)
+        if entity_id is not None:
+            return entity_id, False
+        with self._lock:
+            entity_id = self._ids.get(key)
+            if entity_id is not None:
+                return entity_id, False
+            entity_id = self._ids[key] = len(self._entries)
+            self._entries.append((domain, entity_type, text))
+            return entity_id, True
+
+    def restore(self, entity_id, domain, entity_type, text):
+        """Re-register an entity under the ID it was given earlier, e.g. when resuming compact output."""
+        with self._lock:
+            if entity_id != len(self._entries):
+                raise ValueError(f"Entity IDs must be restored in order; expected {len(self._entries)}, got {entity_id}")
+            self._ids[(domain, entity_type, canonical_text(text))] = entity_id
+            self._entries.append((domain, entity_type, text))
+
+    def entity(self, entity_id):
+        """Return {'id', 'domain', 'type', 'text'} for an ID."""
+        domain, entity_type, text = self._entries[entity_id]
+        return {'id': entity_id, 'domain': domain, 'type': entity_type, 'text': text}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def to_compact(self, domain, entities, relations):
+        """
+        Encode one extraction result with interned entity IDs.
+
+        Relations reference entities by ID, and each entity's type and text are
+        sent once per table (in 'entity_table' of the first result using it)
+        rather than with every mention.
+
+        Args:
+            domain (str): Domain of the result
+            entities (list): Entity dicts with text, type, start and end
+            relations (list): Relation dicts with source, target and type
+
+        Returns:
+            dict: {'entity_table': [[id, domain, type, text], ...] for new IDs,
+                   'entities': [[id, start, end], ...],
+                   'relations': [[source id, type, target id], ...]}
+        """
+        new_entries = []
+
+        def intern(entity_type, text):
+            entity_id, created = self._intern(domain, entity_type, text)
+            if created:
+                new_entries.append([entity_id, domain, entity_type, text])
+            return entity_id
+
+        compact_entities = []
+        # Relations name their endpoints by text; resolve them through this document's entities
+        by_text = {}
+        for entity in entities:
+            entity_id = intern(entity['type'], entity['text'])
+            by_text.setdefault(entity['text'], entity_id)
+            compact_entities.append([entity_id, entity['start'], entity['end']])
+
+        compact_relations = []
+        for relation in relations:
+            source = by_text.get(relation['source'])
+            if source is None:
+                source = intern(None, relation['source'])
+            target = by_text.get(relation['target'])
+            if target is None:
+                target = intern(None, relation['target'])
+            compact_relations.append([source, relation['type'], target])
+
+        return {'entity_table': new_entries, 'entities': compact_entities, 'relations': compact_relations}
+
+    def expand(self, compact):
+        """
+        Decode a result produced by to_compact back into entity and relation dicts.
+
+        IDs defined in the result's 'entity_table' are registered first, so a stream
+        of compact results can be decoded in order by one table.
+
+        Returns:
+            tuple: (entities, relations) using each entity's display text
+        """
+        for entity_id, domain, entity_type, text in compact.get('entity_table', []):
+            if entity_id >= len(self._entries):
+                self.restore(entity_id, domain, entity_type, text)
+        entities = []
+        for entity_id, start, end in compact['entities']:
+            _, entity_type, text = self._entries[entity_id]
+            entities.append({'text': text, 'type': entity_type, 'start': start, 'end': end})
+        relations = [{'source': self._entries[source][2], 'target': self._entries[target][2], 'type': relation_type}
+                     for source, relation_type, target in compact['relations']]
+        return entities, relations
@@ -1,171 +1,236 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
 from nltk.tokenize import sent_tokenize
 import re
 
+from models.cache import make_cache_key, ruleset_fingerprint
+from models.matcher import KeywordMatcher
+from models.metrics import metrics
+from models.ner import run_ner
+from models.registry import registry, DEFAULT_NER_CHECKPOINT, DEFAULT_BATCH_SIZE
+from models.relations import build_relation_table, keyword_hits
+from models.spans import group_by_sentence, keep_longer, resolve_overlaps, sentence_spans
+
 class FinanceModel:
     """Model for finance domain entity and relation extraction using public models."""
     
-    def __init__(self):
-        """Initialize finance model with publicly available models."""
-        try:
-            # For NER, use general NER model
-            self.ner_tokenizer = AutoTokenizer.from_pretrained("dslim/bert-base-NER")
-            self.ner_model = AutoModelForTokenClassification.from_pretrained("dslim/bert-base-NER")
-            self.ner_pipeline = pipeline("ner", model=self.ner_model, tokenizer=self.ner_tokenizer, aggregation_strategy="simple")
-            
-            # Finance-specific entity lists
-            self.entities = {
-                'COMPANY': ['apple', 'amazon', 'google', 'microsoft', 'tesla', 'bank of america', 'jpmorgan', 
-                            'goldman sachs', 'morgan stanley', 'wells fargo', 'walmart', 'meta', 'facebook', 
-                            'netflix', 'alibaba', 'tencent', 'samsung', 'ibm', 'intel', 'amd', 'whole foods'],
-                'PRODUCT': ['iphone', 'aws', 'cloud', 'windows', 'model s', 'model 3', 'azure', 'office 365',
-                            'loan', 'mortgage', 'bond', 'credit card', 'investment', 'ai product', 'fintech'],
-                'METRIC': ['revenue', 'profit', 'loss', 'earnings', 'market share', 'stock price', 'growth', 
-                          'dividend', 'sales', 'margin', 'income', 'debt', 'cash flow', 'eps', 'p/e ratio'],
-                'EVENT': ['merger', 'acquisition', 'ipo', 'bankruptcy', 'investment', 'layoff', 'restructuring',
-                         'product launch', 'earnings report', 'quarterly report', 'share buyback', 'stock split']
-            }
-            
-            # Map general NER tags to finance entity types
-            self.ner_tag_mapping = {
-                'B-ORG': 'COMPANY',
-                'I-ORG': 'COMPANY',
-                'B-MISC': 'PRODUCT',
-                'I-MISC': 'PRODUCT'
-            }
-            
-            # Finance-specific relation types
-            self.relation_types = {
-                'acquired': {'source': ['COMPANY'], 'target': ['COMPANY']},
-                'launched': {'source': ['COMPANY'], 'target': ['PRODUCT']},
-                'increased': {'source': ['COMPANY', 'PRODUCT'], 'target': ['METRIC']},
-                'decreased': {'source': ['COMPANY', 'PRODUCT'], 'target': ['METRIC']},
-                'invested_in': {'source': ['COMPANY'], 'target': ['COMPANY', 'PRODUCT']}
-            }
-            
-            # Keywords for relation extraction
-            self.relation_keywords = {
-                'acquired': ['acquire', 'acquisition', 'buy', 'purchase', 'takeover', 'merge'],
-                'launched': ['launch', 'release', 'introduce', 'unveil', 'announce', 'debut'],
-                'increased': ['increase', 'grow', 'rise', 'boost', 'improve', 'expand', 'gain', 'up'],
-                'decreased': ['decrease', 'reduce', 'drop', 'decline', 'fall', 'lower', 'cut', 'down'],
-                'invested_in': ['invest', 'funding', 'stake', 'share', 'partner']
-            }
-            
-            # Create negation patterns
-            self.negation_patterns = [
-                r'did\s+not\s+', 
-                r'didn\'t\s+', 
-                r'not\s+',
-                r'no\s+',
-                r'failed\s+to\s+',
-                r'declined\s+to\s+',
-                r'unable\s+to\s+'
-            ]
-            
-            # Sentiment indicators will be used to determine increase/decrease relations
-            self.positive_indicators = ['growth', 'profit', 'success', 'positive', 'strong', 'higher', 
-                                      'better', 'exceeded', 'improvement', 'outperform']
-            self.negative_indicators = ['loss', 'decline', 'negative', 'weak', 'lower', 'below', 
-                                      'disappointment', 'missed', 'underperform']
-            
+    # Domain name used in cache keys
+    domain = 'finance'
+    
+    def __init__(self, ner_checkpoint=DEFAULT_NER_CHECKPOINT, cache=None, use_ner=True):
+        """
+        Initialize finance model with publicly available models.
+        
+        Args:
+            ner_checkpoint (str): NER checkpoint loaded through the shared registry
+            cache (optional): Result cache (e.g. DiskExtractionCache) consulted by extract
+            use_ner (bool): Load the NER model; False runs the keyword and relation rules only
+        """
+        self.cache = cache
+        
+        # For NER, use general NER model shared through the registry
+        self.ner_checkpoint = ner_checkpoint
+        self.ner_pipeline = None
+        if use_ner:
+            try:
+                self.ner_pipeline = registry.acquire(ner_checkpoint)
+            except Exception as e:
+                print(f"Error initializing finance model: {e}")
+        
+        # Finance-specific entity lists
+        self.entities = {
+            'COMPANY': ['apple', 'amazon', 'google', 'microsoft', 'tesla', 'bank of america', 'jpmorgan', 
+                        'goldman sachs', 'morgan stanley', 'wells fargo', 'walmart', 'meta', 'facebook', 
+                        'netflix', 'alibaba', 'tencent', 'samsung', 'ibm', 'intel', 'amd', 'whole foods'],
+            'PRODUCT': ['iphone', 'aws', 'cloud', 'windows', 'model s', 'model 3', 'azure', 'office 365',
+                        'loan', 'mortgage', 'bond', 'credit card', 'investment', 'ai product', 'fintech'],
+            'METRIC': ['revenue', 'profit', 'loss', 'earnings', 'market share', 'stock price', 'growth', 
+                      'dividend', 'sales', 'margin', 'income', 'debt', 'cash flow', 'eps', 'p/e ratio'],
+            'EVENT': ['merger', 'acquisition', 'ipo', 'bankruptcy', 'investment', 'layoff', 'restructuring',
+                     'product launch', 'earnings report', 'quarterly report', 'share buyback', 'stock split']
+        }
+        
+        # Entity types added from keywords. With NER, only metrics and events are; companies
+        # are used to vet NER output. Without NER, companies and products come from the lists too
+        self.keyword_types = ['METRIC', 'EVENT']
+        self.rules_keyword_types = ['METRIC', 'EVENT', 'COMPANY', 'PRODUCT']
+        
+        # Compile keyword lists once so matching is a single pass per text
+        self._compile_matchers()
+        
+        # Overlapping entities are resolved by keeping the longer span
+        self.overlap_policy = keep_longer
+        
+        # Map general NER tags to finance entity types
+        self.ner_tag_mapping = {
+            'B-ORG': 'COMPANY',
+            'I-ORG': 'COMPANY',
+            'B-MISC': 'PRODUCT',
+            'I-MISC': 'PRODUCT'
+        }
+        
+        # Finance-specific relation types
+        self.relation_types = {
+            'acquired': {'source': ['COMPANY'], 'target': ['COMPANY']},
+            'launched': {'source': ['COMPANY'], 'target': ['PRODUCT']},
+            'increased': {'source': ['COMPANY', 'PRODUCT'], 'target': ['METRIC']},
+            'decreased': {'source': ['COMPANY', 'PRODUCT'], 'target': ['METRIC']},
+            'invested_in': {'source': ['COMPANY'], 'target': ['COMPANY', 'PRODUCT']}
+        }
+        
+        # Candidate relation types for each (source type, target type) pair
+        self.relation_table = build_relation_table(self.relation_types)
+        
+        # Keywords for relation extraction
+        self.relation_keywords = {
+            'acquired': ['acquire', 'acquisition', 'buy', 'purchase', 'takeover', 'merge'],
+            'launched': ['launch', 'release', 'introduce', 'unveil', 'announce', 'debut'],
+            'increased': ['increase', 'grow', 'rise', 'boost', 'improve', 'expand', 'gain', 'up'],
+            'decreased': ['decrease', 'reduce', 'drop', 'decline', 'fall', 'lower', 'cut', 'down'],
+            'invested_in': ['invest', 'funding', 'stake', 'share', 'partner']
+        }
+        
+        # Create negation patterns
+        self.negation_patterns = [
+            r'did\s+not\s+', 
+            r'didn\'t\s+', 
+            r'not\s+',
+            r'no\s+',
+            r'failed\s+to\s+',
+            r'declined\s+to\s+',
+            r'unable\s+to\s+'
+        ]
+        
+        # Sentiment indicators will be used to determine increase/decrease relations
+        self.positive_indicators = ['growth', 'profit', 'success', 'positive', 'strong', 'higher', 
+                                  'better', 'exceeded', 'improvement', 'outperform']
+        self.negative_indicators = ['loss', 'decline', 'negative', 'weak', 'lower', 'below', 
+                                  'disappointment', 'missed', 'underperform']
+        
+        if self.ner_pipeline is not None:
             print("Finance model initialized with public models")
-            
-        except Exception as e:
-            print(f"Error initializing finance model: {e}")
+        else:
             print("Finance model initialized with rules only")
     
-    def extract_entities(self, text):
+    def add_keywords(self, entity_type, keywords):
+        """
+        Extend a keyword dictionary, e.g. with a large list loaded from disk.
+        
+        Args:
+            entity_type (str): Entity type the keywords belong to
+            keywords (iterable): Keywords to add
+        """
+        self.entities.setdefault(entity_type, []).extend(keywords)
+        self._compile_matchers()
+        self._ruleset_version = None
+    
+    def _compile_matchers(self):
+        """Build the keyword matchers used with and without NER."""
+        self.keyword_matcher = KeywordMatcher({entity_type: self.entities[entity_type] for entity_type in self.keyword_types})
+        self.rules_matcher = KeywordMatcher({entity_type: self.entities[entity_type] for entity_type in self.rules_keyword_types})
+        self.company_matcher = KeywordMatcher({'COMPANY': self.entities['COMPANY']})
+    
+    @property
+    def ruleset_version(self):
+        """Fingerprint of the NER checkpoint and rule tables, used to key cached results."""
+        if getattr(self, '_ruleset_version', None) is None:
+            self._ruleset_version = ruleset_fingerprint(
+                type(self).__name__, self.ner_checkpoint, self.entities, self.keyword_types,
+                self.rules_keyword_types, self.ner_tag_mapping,
+                self.relation_types, self.relation_keywords, self.negation_patterns,
+                self.positive_indicators, self.negative_indicators)
+        return self._ruleset_version
+    
+    def cache_version(self, use_ner=True):
+        """Version used in cache keys; rules-only results and each NER backend are cached separately."""
+        if self._ner_enabled(use_ner):
+            return self.ruleset_version + ':' + registry.backend
+        return self.ruleset_version + ':rules'
+    
+    def _ner_enabled(self, use_ner=True):
+        """Return True if this call should run the NER model."""
+        return use_ner and self.ner_pipeline is not None
+    
+    def extract_entities(self, text, use_ner=True):
         """Extract finance-related entities using general NER and finance keywords."""
         try:
-            # First use NER to identify organizations and misc entities
-            ner_results = self.ner_pipeline(text)
-            
-            # Process NER results
-            entities = []
-            for entity in ner_results:
-                entity_type = self.ner_tag_mapping.get(entity['entity_group'])
-                if entity_type:  # Only process relevant entity types
-                    # For organizations, check if they're likely finance-related
-                    if entity_type == 'COMPANY':
-                        # Companies often have specific suffixes
-                        company_indicators = ['inc', 'corp', 'ltd', 'llc', 'plc', 'group', 'bank', 'holdings']
-                        is_finance_company = any(indicator in entity['word'].lower() for indicator in company_indicators)
-                        
-                        # Known companies from our list
-                        is_known_company = any(company.lower() in entity['word'].lower() 
-                                              for company in self.entities['COMPANY'])
-                        
-                        if not (is_finance_company or is_known_company):
-                            continue  # Skip if not likely a finance company
-                    
-                    # Check for duplicates
-                    duplicate = False
-                    for existing_entity in entities:
-                        if (existing_entity['text'].lower() == entity['word'].lower() and
-                            existing_entity['type'] == entity_type):
-                            duplicate = True
-                            break
-                    
-                    if not duplicate:
-                        entities.append({
-                            'text': entity['word'],
-                            'type': entity_type,
-                            'start': entity['start'],
-                            'end': entity['end']
-                        })
-            
-            # Second, supplement with finance-specific entities using keyword matching
-            text_lower = text.lower()
-            for entity_type in ['METRIC', 'EVENT']:  # Only add metrics and events from keywords
-                for keyword in self.entities[entity_type]:
-                    for match in re.finditer(r'\b' + keyword + r'\b', text_lower):
-                        start = match.start()
-                        end = match.end()
-                        
-                        # Get original case from text
-                        original_text = text[start:end]
-                        
-                        # Check for duplicates
-                        duplicate = False
-                        for existing_entity in entities:
-                            if (existing_entity['text'].lower() == original_text.lower() and
-                                existing_entity['type'] == entity_type):
-                                duplicate = True
-                                break
-                        
-                        if not duplicate:
-                            entities.append({
-                                'text': original_text,
-                                'type': entity_type,
-                                'start': start,
-                                'end': end
-                            })
-            
-            # Remove overlapping entities (keep the longer one)
-            entities.sort(key=lambda x: x['start'])
-            i = 0
-            while i < len(entities) - 1:
-                curr = entities[i]
-                next_entity = entities[i+1]
-                
-                if curr['end'] > next_entity['start']:  # Overlap
-                    # Keep the longer entity
-                    if (curr['end'] - curr['start']) >= (next_entity['end'] - next_entity['start']):
-                        entities.pop(i+1)
-                    else:
-                        entities.pop(i)
-                else:
-                    i += 1
+            # First use NER to identify organizations and misc entities, unless running rules only
+            ner_results = []
+            if self._ner_enabled(use_ner):
+                with metrics.stage('ner', self.domain):
+                    ner_results = run_ner(self.ner_pipeline, [text])[0]
             
-            return entities
+            return self.extract_entities_from_ner(text, ner_results, use_ner)
             
         except Exception as e:
             print(f"Error in entity extraction: {e}")
             # Return empty list if all fails
             return []
     
+    def extract_entities_from_ner(self, text, ner_results, use_ner=True):
+        """
+        Combine NER pipeline output for a text with finance keyword matches.
+        
+        Args:
+            text (str): Input text
+            ner_results (list): NER pipeline output for the text
+            use_ner (bool): False means NER did not run, so companies and products
+                are matched from the keyword lists as well
+            
+        Returns:
+            list: Entity dicts
+        """
+        # Process NER results
+        entities = []
+        seen = set()
+        for entity in ner_results:
+            entity_type = self.ner_tag_mapping.get(entity['entity_group'])
+            if entity_type:  # Only process relevant entity types
+                # For organizations, check if they're likely finance-related
+                if entity_type == 'COMPANY':
+                    # Companies often have specific suffixes
+                    company_indicators = ['inc', 'corp', 'ltd', 'llc', 'plc', 'group', 'bank', 'holdings']
+                    is_finance_company = any(indicator in entity['word'].lower() for indicator in company_indicators)
+                    
+                    # Known companies from our list
+                    is_known_company = self.company_matcher.contains(entity['word'].lower())
+                    
+                    if not (is_finance_company or is_known_company):
+                        continue  # Skip if not likely a finance company
+                
+                # Check for duplicates
+                key = (entity['word'].lower(), entity_type)
+                if key not in seen:
+                    seen.add(key)
+                    entities.append({
+                        'text': entity['word'],
+                        'type': entity_type,
+                        'start': entity['start'],
+                        'end': entity['end']
+                    })
+        
+        # Second, supplement with finance-specific entities using keyword matching
+        text_lower = text.lower()
+        matcher = self.keyword_matcher if self._ner_enabled(use_ner) else self.rules_matcher
+        with metrics.stage('keyword_match', self.domain):
+            matches = matcher.find(text_lower)
+        for start, end, entity_type in matches:
+            # Get original case from text
+            original_text = text[start:end]
+            
+            # Check for duplicates
+            key = (original_text.lower(), entity_type)
+            if key not in seen:
+                seen.add(key)
+                entities.append({
+                    'text': original_text,
+                    'type': entity_type,
+                    'start': start,
+                    'end': end
+                })
+        
+        # Remove overlapping entities (keep the longer one)
+        with metrics.stage('overlap_resolution', self.domain):
+            return resolve_overlaps(entities, self.overlap_policy)
+    
     def determine_sentiment(self, sentence):
         """Simple rule-based sentiment detection for finance text."""
         sentence_lower = sentence.lower()
@@ -195,12 +260,18 @@ class FinanceModel:
             else:
                 return 'neutral'
     
+    @metrics.timed('relations')
     def extract_relations(self, text, entities):
         """Extract relations between finance entities using keywords and sentiment."""
         relations = []
-        sentences = sent_tokenize(text)
+        related_pairs = set()
+        with metrics.stage('sentence_split', self.domain):
+            sentences = sent_tokenize(text)
+        
+        # Bucket entities by the sentence their mentions fall in
+        sentence_groups = group_by_sentence(text, sentence_spans(text, sentences), entities)
         
-        for sentence in sentences:
+        for sentence, sentence_entities in zip(sentences, sentence_groups):
             # Skip sentences with negation patterns (for relation patterns, not sentiment)
             skip_relation_patterns = False
             for neg_pattern in self.negation_patterns:
@@ -208,14 +279,8 @@ class FinanceModel:
                     skip_relation_patterns = True
                     break
             
-            # Find entities in this sentence
-            sentence_entities = []
             sentence_lower = sentence.lower()
             
-            for entity in entities:
-                if entity['text'].lower() in sentence_lower:
-                    sentence_entities.append(entity)
-            
             # Need at least 2 entities for a relation
             if len(sentence_entities) < 2:
                 continue
@@ -223,6 +288,9 @@ class FinanceModel:
             # Determine sentiment of the sentence
             sentiment = self.determine_sentiment(sentence)
             
+            # Relation types whose keywords appear in this sentence
+            sentence_keywords = set() if skip_relation_patterns else keyword_hits(sentence_lower, self.relation_keywords)
+            
             # Check all pairs of entities in this sentence
             for i, entity1 in enumerate(sentence_entities):
                 for j, entity2 in enumerate(sentence_entities):
@@ -230,15 +298,12 @@ class FinanceModel:
                         continue
                     
                     # Determine potential relation types based on entity types
-                    potential_relations = []
-                    for rel_type, type_constraints in self.relation_types.items():
-                        if (entity1['type'] in type_constraints['source'] and 
-                            entity2['type'] in type_constraints['target']):
-                            potential_relations.append(rel_type)
-                    
+                    potential_relations = self.relation_table.get((entity1['type'], entity2['type']))
                     if not potential_relations:
                         continue
                     
+                    pair = (entity1['text'], entity2['text'])
+                    
                     # First check explicit relation keywords if not skipping
                     relation_found = False
                     if not skip_relation_patterns:
@@ -248,17 +313,10 @@ class FinanceModel:
                                 continue
                                 
                             # Check for relation keywords
-                            keywords = self.relation_keywords[rel_type]
-                            if any(keyword in sentence_lower for keyword in keywords):
+                            if rel_type in sentence_keywords:
                                 # Check for duplicates
-                                duplicate = False
-                                for rel in relations:
-                                    if (rel['source'] == entity1['text'] and 
-                                        rel['target'] == entity2['text']):
-                                        duplicate = True
-                                        break
-                                        
-                                if not duplicate:
+                                if pair not in related_pairs:
+                                    related_pairs.add(pair)
                                     relations.append({
                                         'source': entity1['text'],
                                         'target': entity2['text'],
@@ -274,14 +332,8 @@ class FinanceModel:
                             rel_type = 'increased' if sentiment == 'positive' else 'decreased'
                             
                             # Check for duplicates
-                            duplicate = False
-                            for rel in relations:
-                                if (rel['source'] == entity1['text'] and 
-                                    rel['target'] == entity2['text']):
-                                    duplicate = True
-                                    break
-                                    
-                            if not duplicate:
+                            if pair not in related_pairs:
+                                related_pairs.add(pair)
                                 relations.append({
                                     'source': entity1['text'],
                                     'target': entity2['text'],
@@ -323,9 +375,95 @@ class FinanceModel:
         
         return relations
     
-    def extract(self, text):
-        """Extract both entities and relations from text."""
-        entities = self.extract_entities(text)
+    def extract(self, text, use_ner=True):
+        """
+        Extract both entities and relations from text.
+        
+        Args:
+            text (str): Input text
+            use_ner (bool): False skips the NER model and runs the rules only
+            
+        Returns:
+            tuple: (entities, relations)
+        """
+        if self.cache is not None:
+            key = make_cache_key(self.domain, self.cache_version(use_ner), text)
+            return self.cache.get_or_compute(key, lambda: self._extract_uncached(text, use_ner))
+        
+        return self._extract_uncached(text, use_ner)
+    
+    @metrics.timed('extract')
+    def _extract_uncached(self, text, use_ner=True):
+        """Run entity and relation extraction without consulting the cache."""
+        entities = self.extract_entities(text, use_ner)
         relations = self.extract_relations(text, entities)
         
-        return entities, relations
\ No newline at end of file
+        return entities, relations
+    
+    @metrics.timed('extract_batch')
+    def extract_many(self, texts, batch_size=DEFAULT_BATCH_SIZE, use_ner=True):
+        """
+        Extract entities and relations from many texts using batched NER.
+        
+        Args:
+            texts (iterable): Input documents
+            batch_size (int): Number of documents sent to the NER pipeline at once
+            use_ner (bool): False skips the NER model and runs the rules only
+            
+        Returns:
+            list: One (entities, relations) tuple per input text, in input order
+        """
+        texts = list(texts)
+        results = [None] * len(texts)
+        
+        # Serve documents seen before from the cache and only run the rest
+        keys = {}
+        pending = []
+        for index, text in enumerate(texts):
+            if self.cache is not None:
+                keys[index] = make_cache_key(self.domain, self.cache_version(use_ner), text)
+                cached = self.cache.get(keys[index])
+                if cached is not None:
+                    results[index] = cached
+                    continue
+            pending.append(index)
+        
+        for offset in range(0, len(pending), batch_size):
+            batch_indices = pending[offset:offset + batch_size]
+            batch = [texts[index] for index in batch_indices]
+            for index, text, entities in zip(batch_indices, batch, self._extract_entities_batch(batch, batch_size, use_ner)):
+                relations = self.extract_relations(text, entities)
+                results[index] = (entities, relations)
+                if self.cache is not None:
+                    self.cache.set(keys[index], results[index])
+        
+        return results
+    
+    def _extract_entities_batch(self, texts, batch_size, use_ner=True):
+        """Run the NER pipeline over a batch of texts, falling back to one call per text."""
+        if not self._ner_enabled(use_ner):
+            ner_batch = [[] for _ in texts]
+        else:
+            try:
+                # Long documents are split into windows that fit the model
+                with metrics.stage('ner', self.domain):
+                    ner_batch = run_ner(self.ner_pipeline, texts, batch_size=batch_size)
+            except Exception as e:
+                print(f"Error in batched entity extraction: {e}")
+                return [self.extract_entities(text) for text in texts]
+        
+        batch_entities = []
+        for text, ner_results in zip(texts, ner_batch):
+            try:
+                batch_entities.append(self.extract_entities_from_ner(text, ner_results, use_ner))
+            except Exception as e:
+                print(f"Error in entity extraction: {e}")
+                batch_entities.append([])
+        
+        return batch_entities
+    
+    def close(self):
+        """Release this model's reference to the shared NER pipeline."""
+        if getattr(self, 'ner_pipeline', None) is not None:
+            registry.release(self.ner_checkpoint)
+            self.ner_pipeline = None
\ No newline at end of file
@@ -1,176 +1,218 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
 from nltk.tokenize import sent_tokenize
 import re
 
+from models.cache import make_cache_key, ruleset_fingerprint
+from models.matcher import KeywordMatcher
+from models.metrics import metrics
+from models.ner import run_ner
+from models.registry import registry, DEFAULT_NER_CHECKPOINT, DEFAULT_BATCH_SIZE
+from models.relations import build_relation_table, keyword_hits
+from models.spans import entity_key, group_by_sentence, keep_higher_priority, resolve_overlaps, sentence_spans
+
 class HealthcareModel:
     """Model for healthcare domain entity and relation extraction using public biomedical models."""
     
-    def __init__(self):
-        """Initialize healthcare model with publicly available models."""
-        try:
-            # Using publicly available models instead of restricted BioBERT
-            # For NER, use general BERT NER model
-            self.ner_tokenizer = AutoTokenizer.from_pretrained("dslim/bert-base-NER")
-            self.ner_model = AutoModelForTokenClassification.from_pretrained("dslim/bert-base-NER")
-            self.ner_pipeline = pipeline("ner", model=self.ner_model, tokenizer=self.ner_tokenizer, aggregation_strategy="simple")
-            
-            # Backup entity lists for healthcare domain
-            self.entities = {
-                'DISEASE': ['cancer', 'diabetes', 'hypertension', 'asthma', 'arthritis', 'alzheimer', 
-                          'headache', 'inflammation', 'heart attack', 'stroke', 'obesity', 'memory loss'],
-                'MEDICATION': ['aspirin', 'ibuprofen', 'metformin', 'insulin', 'atorvastatin', 'lisinopril'],
-                'PROCEDURE': ['surgery', 'biopsy', 'transplant', 'examination', 'scan', 'therapy', 'physical therapy'],
-                'SYMPTOM': ['pain', 'fever', 'cough', 'fatigue', 'nausea', 'dizziness', 'headache', 
-                          'inflammation', 'excessive thirst', 'weight loss', 'stiffness', 'swelling']
-            }
-            
-            # Map general NER tags to our healthcare entity types
-            self.ner_tag_mapping = {
-                'B-PER': None,  # Not relevant for healthcare
-                'I-PER': None,  # Not relevant for healthcare
-                'B-ORG': None,  # Not relevant for healthcare
-                'I-ORG': None,  # Not relevant for healthcare
-                'B-LOC': None,  # Not relevant for healthcare
-                'I-LOC': None,  # Not relevant for healthcare
-                'B-MISC': 'PROCEDURE',  # Map MISC to procedures as a best guess
-                'I-MISC': 'PROCEDURE'
-            }
-            
-            # Relation type mappings (for type validation)
-            self.relation_types = {
-                'treats': {'source': ['MEDICATION', 'PROCEDURE'], 'target': ['DISEASE', 'SYMPTOM']},
-                'causes': {'source': ['DISEASE'], 'target': ['SYMPTOM', 'DISEASE']},
-                'prevents': {'source': ['MEDICATION', 'PROCEDURE'], 'target': ['DISEASE']},
-                'indicates': {'source': ['SYMPTOM', 'PROCEDURE'], 'target': ['DISEASE']}
-            }
-            
-            # Relation keywords for classification
-            self.relation_keywords = {
-                'treats': ['treat', 'therapy', 'medication', 'cure', 'helps', 'reduces', 'relieves', 'prescribe'],
-                'causes': ['cause', 'lead to', 'result in', 'associated with', 'linked to', 'induce'],
-                'prevents': ['prevent', 'protect', 'reduce risk', 'avoid', 'decrease chance'],
-                'indicates': ['indicate', 'suggest', 'symptom of', 'sign of', 'diagnostic', 'marker']
-            }
-            
-            # Create negation patterns to filter out false positives
-            self.negation_patterns = [
-                r'not\s+treat', 
-                r'doesn\'t\s+treat', 
-                r'does\s+not\s+treat',
-                r'no\s+evidence',
-                r'unlikely\s+to',
-                r'cannot\s+',
-                r'never\s+'
-            ]
-            
+    # Domain name used in cache keys
+    domain = 'healthcare'
+    
+    def __init__(self, ner_checkpoint=DEFAULT_NER_CHECKPOINT, cache=None, use_ner=True):
+        """
+        Initialize healthcare model with publicly available models.
+        
+        Args:
+            ner_checkpoint (str): NER checkpoint loaded through the shared registry
+            cache (optional): Result cache (e.g. DiskExtractionCache) consulted by extract
+            use_ner (bool): Load the NER model; False runs the keyword and relation rules only
+        """
+        self.cache = cache
+        
+        # Using publicly available models instead of restricted BioBERT
+        # For NER, use general BERT NER model shared through the registry
+        self.ner_checkpoint = ner_checkpoint
+        self.ner_pipeline = None
+        if use_ner:
+            try:
+                self.ner_pipeline = registry.acquire(ner_checkpoint)
+            except Exception as e:
+                print(f"Error initializing healthcare model: {e}")
+                print("Falling back to rule-based approach only")
+        
+        # Backup entity lists for healthcare domain
+        self.entities = {
+            'DISEASE': ['cancer', 'diabetes', 'hypertension', 'asthma', 'arthritis', 'alzheimer', 
+                      'headache', 'inflammation', 'heart attack', 'stroke', 'obesity', 'memory loss'],
+            'MEDICATION': ['aspirin', 'ibuprofen', 'metformin', 'insulin', 'atorvastatin', 'lisinopril'],
+            'PROCEDURE': ['surgery', 'biopsy', 'transplant', 'examination', 'scan', 'therapy', 'physical therapy'],
+            'SYMPTOM': ['pain', 'fever', 'cough', 'fatigue', 'nausea', 'dizziness', 'headache', 
+                      'inflammation', 'excessive thirst', 'weight loss', 'stiffness', 'swelling']
+        }
+        
+        # Compile keyword lists once so matching is a single pass per text
+        self.keyword_matcher = KeywordMatcher(self.entities)
+        
+        # Overlapping entities are resolved by priority
+        # Priority: MEDICATION > DISEASE > SYMPTOM > PROCEDURE
+        self.overlap_policy = keep_higher_priority({'MEDICATION': 3, 'DISEASE': 2, 'SYMPTOM': 1, 'PROCEDURE': 0})
+        
+        # Map general NER tags to our healthcare entity types
+        self.ner_tag_mapping = {
+            'B-PER': None,  # Not relevant for healthcare
+            'I-PER': None,  # Not relevant for healthcare
+            'B-ORG': None,  # Not relevant for healthcare
+            'I-ORG': None,  # Not relevant for healthcare
+            'B-LOC': None,  # Not relevant for healthcare
+            'I-LOC': None,  # Not relevant for healthcare
+            'B-MISC': 'PROCEDURE',  # Map MISC to procedures as a best guess
+            'I-MISC': 'PROCEDURE'
+        }
+        
+        # Relation type mappings (for type validation)
+        self.relation_types = {
+            'treats': {'source': ['MEDICATION', 'PROCEDURE'], 'target': ['DISEASE', 'SYMPTOM']},
+            'causes': {'source': ['DISEASE'], 'target': ['SYMPTOM', 'DISEASE']},
+            'prevents': {'source': ['MEDICATION', 'PROCEDURE'], 'target': ['DISEASE']},
+            'indicates': {'source': ['SYMPTOM', 'PROCEDURE'], 'target': ['DISEASE']}
+        }
+        
+        # Candidate relation types for each (source type, target type) pair
+        self.relation_table = build_relation_table(self.relation_types)
+        
+        # Relation keywords for classification
+        self.relation_keywords = {
+            'treats': ['treat', 'therapy', 'medication', 'cure', 'helps', 'reduces', 'relieves', 'prescribe'],
+            'causes': ['cause', 'lead to', 'result in', 'associated with', 'linked to', 'induce'],
+            'prevents': ['prevent', 'protect', 'reduce risk', 'avoid', 'decrease chance'],
+            'indicates': ['indicate', 'suggest', 'symptom of', 'sign of', 'diagnostic', 'marker']
+        }
+        
+        # Create negation patterns to filter out false positives
+        self.negation_patterns = [
+            r'not\s+treat', 
+            r'doesn\'t\s+treat', 
+            r'does\s+not\s+treat',
+            r'no\s+evidence',
+            r'unlikely\s+to',
+            r'cannot\s+',
+            r'never\s+'
+        ]
+        
+        if self.ner_pipeline is not None:
             print("Healthcare model initialized with public models")
-            
-        except Exception as e:
-            print(f"Error initializing healthcare model: {e}")
-            print("Falling back to rule-based approach only")
+        else:
             print("Healthcare model initialized with rules only")
     
-    def extract_entities(self, text):
+    def add_keywords(self, entity_type, keywords):
+        """
+        Extend a keyword dictionary, e.g. with a large list loaded from disk.
+        
+        Args:
+            entity_type (str): Entity type the keywords belong to
+            keywords (iterable): Keywords to add
+        """
+        self.entities.setdefault(entity_type, []).extend(keywords)
+        self.keyword_matcher = KeywordMatcher(self.entities)
+        self._ruleset_version = None
+    
+    @property
+    def ruleset_version(self):
+        """Fingerprint of the NER checkpoint and rule tables, used to key cached results."""
+        if getattr(self, '_ruleset_version', None) is None:
+            self._ruleset_version = ruleset_fingerprint(
+                type(self).__name__, self.ner_checkpoint, self.entities, self.ner_tag_mapping,
+                self.relation_types, self.relation_keywords, self.negation_patterns)
+        return self._ruleset_version
+    
+    def cache_version(self, use_ner=True):
+        """Version used in cache keys; rules-only results and each NER backend are cached separately."""
+        if self._ner_enabled(use_ner):
+            return self.ruleset_version + ':' + registry.backend
+        return self.ruleset_version + ':rules'
+    
+    def _ner_enabled(self, use_ner=True):
+        """Return True if this call should run the NER model."""
+        return use_ner and self.ner_pipeline is not None
+    
+    def extract_entities(self, text, use_ner=True):
         """Extract healthcare-related entities using general NER and healthcare keywords."""
         try:
-            # First use NER to identify general entities
-            ner_results = self.ner_pipeline(text)
-            all_entities = []
-            
-            # Process NER results
-            for entity in ner_results:
-                entity_type = self.ner_tag_mapping.get(entity['entity_group'])
-                if entity_type:  # Only process relevant entity types
-                    all_entities.append({
-                        'text': entity['word'],
-                        'type': entity_type,
-                        'start': entity['start'],
-                        'end': entity['end']
-                    })
-            
-            # Second, supplement with healthcare-specific entities using keyword matching
-            text_lower = text.lower()
-            for entity_type, keywords in self.entities.items():
-                for keyword in keywords:
-                    for match in re.finditer(r'\b' + keyword + r'\b', text_lower):
-                        start = match.start()
-                        end = match.end()
-                        
-                        # Get original case from text
-                        original_text = text[start:end]
-                        
-                        # Check for duplicates
-                        duplicate = False
-                        for existing_entity in all_entities:
-                            if (existing_entity['text'].lower() == original_text.lower() and
-                                existing_entity['type'] == entity_type):
-                                duplicate = True
-                                break
-                        
-                        if not duplicate:
-                            all_entities.append({
-                                'text': original_text,
-                                'type': entity_type,
-                                'start': start,
-                                'end': end
-                            })
-            
-            # Remove overlapping entities based on priority
-            # Priority: MEDICATION > DISEASE > SYMPTOM > PROCEDURE
-            priority_order = {'MEDICATION': 3, 'DISEASE': 2, 'SYMPTOM': 1, 'PROCEDURE': 0}
-            
-            # Sort by start position to handle overlaps correctly
-            all_entities.sort(key=lambda x: x['start'])
-            
-            # Remove overlapping entities with lower priority
-            i = 0
-            while i < len(all_entities) - 1:
-                current = all_entities[i]
-                next_entity = all_entities[i + 1]
-                
-                # Check for overlap
-                if current['end'] > next_entity['start']:
-                    # Determine which to keep based on priority
-                    current_priority = priority_order.get(current['type'], -1)
-                    next_priority = priority_order.get(next_entity['type'], -1)
-                    
-                    if current_priority >= next_priority:
-                        all_entities.pop(i + 1)  # Remove the next entity
-                    else:
-                        all_entities.pop(i)  # Remove the current entity
-                else:
-                    i += 1
-            
-            return all_entities
+            # First use NER to identify general entities, unless running rules only
+            ner_results = []
+            if self._ner_enabled(use_ner):
+                with metrics.stage('ner', self.domain):
+                    ner_results = run_ner(self.ner_pipeline, [text])[0]
+            return self.extract_entities_from_ner(text, ner_results)
             
         except Exception as e:
             print(f"Error in entity extraction: {e}")
             # Return empty list if all fails
             return []
     
+    def extract_entities_from_ner(self, text, ner_results):
+        """Combine NER pipeline output for a text with healthcare keyword matches."""
+        all_entities = []
+        
+        # Process NER results
+        for entity in ner_results:
+            entity_type = self.ner_tag_mapping.get(entity['entity_group'])
+            if entity_type:  # Only process relevant entity types
+                all_entities.append({
+                    'text': entity['word'],
+                    'type': entity_type,
+                    'start': entity['start'],
+                    'end': entity['end']
+                })
+        
+        # Keys of entities found so far, for constant-time duplicate checks
+        seen = {entity_key(entity) for entity in all_entities}
+        
+        # Second, supplement with healthcare-specific entities using keyword matching
+        text_lower = text.lower()
+        with metrics.stage('keyword_match', self.domain):
+            matches = self.keyword_matcher.find(text_lower)
+        for start, end, entity_type in matches:
+            # Get original case from text
+            original_text = text[start:end]
+            
+            # Check for duplicates
+            key = (original_text.lower(), entity_type)
+            if key not in seen:
+                seen.add(key)
+                all_entities.append({
+                    'text': original_text,
+                    'type': entity_type,
+                    'start': start,
+                    'end': end
+                })
+        
+        # Remove overlapping entities with lower priority
+        with metrics.stage('overlap_resolution', self.domain):
+            return resolve_overlaps(all_entities, self.overlap_policy)
+    
+    @metrics.timed('relations')
     def extract_relations(self, text, entities):
         """Extract relations between healthcare entities using keywords."""
         relations = []
-        sentences = sent_tokenize(text)
+        related_pairs = set()
+        with metrics.stage('sentence_split', self.domain):
+            sentences = sent_tokenize(text)
+        
+        # Bucket entities by the sentence their mentions fall in
+        sentence_groups = group_by_sentence(text, sentence_spans(text, sentences), entities)
         
-        for sentence in sentences:
+        for sentence, sentence_entities in zip(sentences, sentence_groups):
             # Skip sentences with negation patterns
             if any(re.search(pattern, sentence.lower()) for pattern in self.negation_patterns):
                 continue
             
-            # Find entities in this sentence
-            sentence_entities = []
             sentence_lower = sentence.lower()
             
-            for entity in entities:
-                if entity['text'].lower() in sentence_lower:
-                    sentence_entities.append(entity)
-            
             # Need at least 2 entities for a relation
             if len(sentence_entities) < 2:
                 continue
             
+            # Relation types whose keywords appear in this sentence
+            sentence_keywords = keyword_hits(sentence_lower, self.relation_keywords)
+            
             # Check all pairs of entities in this sentence
             for i, entity1 in enumerate(sentence_entities):
                 for j, entity2 in enumerate(sentence_entities):
@@ -178,28 +220,17 @@ class HealthcareModel:
                         continue
                     
                     # Determine potential relation type based on entity types
-                    potential_relations = []
-                    for rel_type, type_constraints in self.relation_types.items():
-                        if (entity1['type'] in type_constraints['source'] and 
-                            entity2['type'] in type_constraints['target']):
-                            potential_relations.append(rel_type)
-                    
+                    potential_relations = self.relation_table.get((entity1['type'], entity2['type']))
                     if not potential_relations:
                         continue
                     
                     # Check if sentence contains keywords for any potential relation
                     for rel_type in potential_relations:
-                        rel_keywords = self.relation_keywords[rel_type]
-                        if any(keyword in sentence_lower for keyword in rel_keywords):
+                        if rel_type in sentence_keywords:
                             # Check for duplicates
-                            duplicate = False
-                            for rel in relations:
-                                if (rel['source'] == entity1['text'] and 
-                                    rel['target'] == entity2['text']):
-                                    duplicate = True
-                                    break
-                                    
-                            if not duplicate:
+                            pair = (entity1['text'], entity2['text'])
+                            if pair not in related_pairs:
+                                related_pairs.add(pair)
                                 relations.append({
                                     'source': entity1['text'],
                                     'target': entity2['text'],
@@ -245,9 +276,95 @@ class HealthcareModel:
         
         return relations
     
-    def extract(self, text):
-        """Extract both entities and relations from text."""
-        entities = self.extract_entities(text)
+    def extract(self, text, use_ner=True):
+        """
+        Extract both entities and relations from text.
+        
+        Args:
+            text (str): Input text
+            use_ner (bool): False skips the NER model and runs the rules only
+            
+        Returns:
+            tuple: (entities, relations)
+        """
+        if self.cache is not None:
+            key = make_cache_key(self.domain, self.cache_version(use_ner), text)
+            return self.cache.get_or_compute(key, lambda: self._extract_uncached(text, use_ner))
+        
+        return self._extract_uncached(text, use_ner)
+    
+    @metrics.timed('extract')
+    def _extract_uncached(self, text, use_ner=True):
+        """Run entity and relation extraction without consulting the cache."""
+        entities = self.extract_entities(text, use_ner)
         relations = self.extract_relations(text, entities)
         
-        return entities, relations
\ No newline at end of file
+        return entities, relations
+    
+    @metrics.timed('extract_batch')
+    def extract_many(self, texts, batch_size=DEFAULT_BATCH_SIZE, use_ner=True):
+        """
+        Extract entities and relations from many texts using batched NER.
+        
+        Args:
+            texts (iterable): Input documents
+            batch_size (int): Number of documents sent to the NER pipeline at once
+            use_ner (bool): False skips the NER model and runs the rules only
+            
+        Returns:
+            list: One (entities, relations) tuple per input text, in input order
+        """
+        texts = list(texts)
+        results = [None] * len(texts)
+        
+        # Serve documents seen before from the cache and only run the rest
+        keys = {}
+        pending = []
+        for index, text in enumerate(texts):
+            if self.cache is not None:
+                keys[index] = make_cache_key(self.domain, self.cache_version(use_ner), text)
+                cached = self.cache.get(keys[index])
+                if cached is not None:
+                    results[index] = cached
+                    continue
+            pending.append(index)
+        
+        for offset in range(0, len(pending), batch_size):
+            batch_indices = pending[offset:offset + batch_size]
+            batch = [texts[index] for index in batch_indices]
+            for index, text, entities in zip(batch_indices, batch, self._extract_entities_batch(batch, batch_size, use_ner)):
+                relations = self.extract_relations(text, entities)
+                results[index] = (entities, relations)
+                if self.cache is not None:
+                    self.cache.set(keys[index], results[index])
+        
+        return results
+    
+    def _extract_entities_batch(self, texts, batch_size, use_ner=True):
+        """Run the NER pipeline over a batch of texts, falling back to one call per text."""
+        if not self._ner_enabled(use_ner):
+            ner_batch = [[] for _ in texts]
+        else:
+            try:
+                # Long documents are split into windows that fit the model
+                with metrics.stage('ner', self.domain):
+                    ner_batch = run_ner(self.ner_pipeline, texts, batch_size=batch_size)
+            except Exception as e:
+                print(f"Error in batched entity extraction: {e}")
+                return [self.extract_entities(text) for text in texts]
+        
+        batch_entities = []
+        for text, ner_results in zip(texts, ner_batch):
+            try:
+                batch_entities.append(self.extract_entities_from_ner(text, ner_results))
+            except Exception as e:
+                print(f"Error in entity extraction: {e}")
+                batch_entities.append([])
+        
+        return batch_entities
+    
+    def close(self):
+        """Release this model's reference to the shared NER pipeline."""
+        if getattr(self, 'ner_pipeline', None) is not None:
+            registry.release(self.ner_checkpoint)
+            self.ner_pipeline = None
\ No newline at end of file
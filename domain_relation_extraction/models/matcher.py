@@ -0,0 +1,109 @@
+import re
+
+# Same definition of a word character that \b uses
+_WORD_CHAR = re.compile(r'\w')
+
+
+def _is_boundary(left, right):
+    """Return True if a \\b boundary exists between two adjacent characters."""
+    return bool(_WORD_CHAR.match(left)) != bool(_WORD_CHAR.match(right))
+
+
+def _trie_pattern(node):
+    """Build a regex from a character trie, preferring the longest keyword."""
+    branches = [re.escape(char) + _trie_pattern(child)
+                for char, child in sorted(node.items()) if char != '']
+    if not branches:
+        return ''
+    if len(branches) == 1 and '' not in node:
+        return branches[0]
+    pattern = '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # A keyword ends here, so the longer continuations are optional
+        pattern += '?'
+    return pattern
+
+
+class KeywordMatcher:
+    """Dictionary matcher that finds every keyword hit in a single pass over the text."""
+
+    def __init__(self, keywords_by_type):
+        """
+        Compile keyword lists into one trie-shaped regex.
+
+        Args:
+            keywords_by_type (dict): Mapping of entity type to a list of keywords
+        """
+        # Every (type, keyword) pair gets a rank so hits come back in dictionary order
+        self.targets = {}
+        rank = 0
+        for entity_type, keywords in keywords_by_type.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                self.targets.setdefault(keyword, []).append((rank, entity_type))
+                rank += 1
+
+        trie = {}
+        for keyword in self.targets:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = True
+
+        # Shorter keywords that start where a longer one starts and end on a word boundary
+        self.prefixes = {}
+        for keyword in self.targets:
+            node = trie
+            prefixes = []
+            for i, char in enumerate(keyword[:-1]):
+                node = node[char]
+                if '' in node and _is_boundary(char, keyword[i + 1]):
+                    prefixes.append(keyword[:i + 1])
+            self.prefixes[keyword] = prefixes
+
+        trie_pattern = _trie_pattern(trie)
+        if trie_pattern:
+            # Zero-width lookahead so hits starting inside another hit are still found
+            self.pattern = re.compile(r'(?=\b(' + trie_pattern + r')\b)')
+            self.substring_pattern = re.compile(trie_pattern)
+        else:
+            self.pattern = None
+            self.substring_pattern = None
+
+    def find(self, text_lower):
+        """
+        Find all whole-word keyword occurrences in lowercased text.
+
+        Args:
+            text_lower (str): Lowercased input text
+
+        Returns:
+            list: (start, end, entity_type) tuples ordered by dictionary order, then position
+        """
+        if self.pattern is None:
+            return []
+
+        hits = []
+        last_end = {}
+        for match in self.pattern.finditer(text_lower):
+            start = match.start()
+            longest = match.group(1)
+            for keyword in [longest] + self.prefixes[longest]:
+                # Like re.finditer, occurrences of one keyword never overlap each other
+                if start < last_end.get(keyword, 0):
+                    continue
+                end = start + len(keyword)
+                last_end[keyword] = end
+                for rank, entity_type in self.targets[keyword]:
+                    hits.append((rank, start, end, entity_type))
+
+        hits.sort()
+        return [(start, end, entity_type) for _, start, end, entity_type in hits]
+
+    def contains(self, text_lower):
+        """Return True if any keyword occurs anywhere in the text, ignoring word boundaries."""
+        if self.substring_pattern is None:
+            return False
+        return self.substring_pattern.search(text_lower) is not None
@@ -0,0 +1,378 @@
+from collections import deque
+import functools
+import os
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond rule stages up to slow NER calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    """Format a sample value the way the Prometheus text format expects."""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    """Render a dict of labels as {name="value",...}."""
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels.items():
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def format_samples(name, kind, help_text, samples):
+    """
+    Render a metric computed elsewhere (e.g. cache statistics) in the Prometheus text format.
+
+    Args:
+        name (str): Metric name
+        kind (str): 'counter' or 'gauge'
+        help_text (str): Description shown in the HELP line
+        samples (list): (labels dict, value) pairs
+
+    Returns:
+        list: Exposition lines
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+
+def format_histogram(name, buckets, total, count, labels=None):
+    """
+    Render cumulative histogram samples in the Prometheus text format.
+
+    Args:
+        name (str): Metric name
+        buckets (dict): Upper bound (number or '+Inf') mapped to cumulative count
+        total (float): Sum of all observations
+        count (int): Number of observations
+        labels (dict, optional): Labels added to every sample
+
+    Returns:
+        list: Sample lines
+    """
+    labels = dict(labels or {})
+    lines = []
+    for bound, bucket_count in buckets.items():
+        le = bound if isinstance(bound, str) else _format_value(float(bound))
+        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {bucket_count}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(total))}")
+    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return lines
+
+
+class _Metric:
+    """Base class for labelled metrics owned by a Metrics registry."""
+
+    kind = None
+
+    def __init__(self, registry, name, help_text, label_names=()):
+        self._registry = registry
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def _labels(self, key):
+        # Empty label values are left out, as Prometheus treats them as absent
+        return {name: value for name, value in zip(self.label_names, key) if value != ''}
+
+    def render(self):
+        """Return the HELP/TYPE header and samples for this metric."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(self._labels(key), value))
+        return lines
+
+    def _samples(self, labels, value):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down; set even when recording is disabled."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def snapshot(self, **labels):
+        """Return {'buckets': {bound: cumulative count}, 'sum': ..., 'count': ...} for one label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return self._cumulative(state) if state else None
+
+    def _cumulative(self, state):
+        buckets = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, state['counts']):
+            running += bucket_count
+            buckets[bound] = running
+        buckets['+Inf'] = state['count']
+        return {'buckets': buckets, 'sum': state['sum'], 'count': state['count']}
+
+    def _samples(self, labels, state):
+        snapshot = self._cumulative(state)
+        return format_histogram(self.name, snapshot['buckets'], snapshot['sum'], snapshot['count'], labels)
+
+
+class _NoopContext:
+    """Context manager returned when instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NOOP = _NoopContext()
+
+
+class _Span:
+    """A timed, nestable trace span recorded by Metrics when tracing is enabled."""
+
+    def __init__(self, metrics, name, attributes):
+        self._metrics = metrics
+        self.name = name
+        self.attributes = attributes
+        self.children = []
+
+    def __enter__(self):
+        stack = self._metrics._span_stack()
+        if stack:
+            stack[-1].children.append(self)
+        stack.append(self)
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.duration = time.perf_counter() - self._started
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        stack = self._metrics._span_stack()
+        stack.pop()
+        if not stack:
+            self._metrics._finish_trace(self)
+        return False
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'start': self.started_at,
+            'duration_ms': self.duration * 1000,
+            'attributes': self.attributes,
+            'children': [child.to_dict() for child in self.children]
+        }
+
+
+class _StageTimer:
+    """Times one pipeline stage into the stage histogram, optionally as a trace span."""
+
+    __slots__ = ('_metrics', '_stage', '_domain', '_span', '_started')
+
+    def __init__(self, metrics, stage, domain):
+        self._metrics = metrics
+        self._stage = stage
+        self._domain = domain
+        self._span = _Span(metrics, stage, {'domain': domain} if domain else {}) if metrics.tracing else None
+
+    def __enter__(self):
+        if self._span is not None:
+            self._span.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        elapsed = time.perf_counter() - self._started
+        self._metrics.stage_seconds.observe(elapsed, stage=self._stage, domain=self._domain)
+        if exc_type is not None:
+            self._metrics.stage_errors.inc(stage=self._stage, domain=self._domain)
+        if self._span is not None:
+            self._span.__exit__(exc_type, exc, traceback)
+        return False
+
+
+class Metrics:
+    """Registry of counters, gauges and histograms with optional trace spans."""
+
+    def __init__(self, enabled=False, tracing=False, max_traces=100):
+        """
+        Initialize the registry.
+
+        Args:
+            enabled (bool): Record counters, histograms and stage timings
+            tracing (bool): Also record nested trace spans for each stage
+            max_traces (int): Number of finished traces kept for inspection
+        """
+        self.enabled = enabled or tracing
+        self.tracing = tracing
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+        self._local = threading.local()
+        self._traces = deque(maxlen=max_traces)
+
+        self.stage_seconds = self.histogram('extraction_stage_seconds', 'Time spent in each extraction stage',
+                                            ('stage', 'domain'))
+        self.stage_errors = self.counter('extraction_stage_errors_total', 'Extraction stages that raised',
+                                         ('stage', 'domain'))
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        """Return the counter with this name, creating it on first use."""
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def gauge(self, name, help_text, label_names=()):
+        """Return the gauge with this name, creating it on first use."""
+        return self._get_or_create(Gauge, name, help_text, label_names)
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        """Return the histogram with this name, creating it on first use."""
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def add_collector(self, collector):
+        """
+        Register a function called on every render.
+
+        Args:
+            collector (function): Returns a list of extra exposition lines (may update gauges first)
+        """
+        self._collectors.append(collector)
+
+    def stage(self, stage, domain=''):
+        """Context manager timing one extraction stage; does nothing when disabled."""
+        if not self.enabled:
+            return _NOOP
+        return _StageTimer(self, stage, domain)
+
+    def timed(self, stage):
+        """Decorator timing a model method as a stage labelled with the model's domain."""
+        def decorator(method):
+            @functools.wraps(method)
+            def wrapper(model, *args, **kwargs):
+                if not self.enabled:
+                    return method(model, *args, **kwargs)
+                with _StageTimer(self, stage, getattr(model, 'domain', '')):
+                    return method(model, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def span(self, name, **attributes):
+        """Context manager recording a trace span; nested spans become its children."""
+        if not self.tracing:
+            return _NOOP
+        return _Span(self, name, attributes)
+
+    def _span_stack(self):
+        stack = getattr(self._local, 'spans', None)
+        if stack is None:
+            stack = self._local.spans = []
+        return stack
+
+    def _finish_trace(self, span):
+        with self._lock:
+            self._traces.append(span.to_dict())
+
+    def traces(self):
+        """Return the most recent finished traces, oldest first."""
+        with self._lock:
+            return list(self._traces)
+
+    def render(self):
+        """Render every metric and collector in the Prometheus text exposition format."""
+        lines = []
+        for collector in list(self._collectors):
+            lines.extend(collector())
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        """Reset all recorded values and traces."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            self._traces.clear()
+        for metric in metrics:
+            metric.clear()
+
+
+# Process-wide metrics, off unless enabled through the environment
+metrics = Metrics(enabled=os.environ.get('EXTRACTION_METRICS', '0') == '1',
+                  tracing=os.environ.get('EXTRACTION_TRACING', '0') == '1')
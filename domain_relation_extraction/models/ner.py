@@ -0,0 +1,178 @@
+from nltk.tokenize import sent_tokenize
+
+from models.metrics import metrics
+from models.registry import DEFAULT_BATCH_SIZE
+from models.spans import sentence_spans
+
+# Largest chunk sent to the NER model, in tokens; BERT accepts 512 including special tokens
+MAX_CHUNK_TOKENS = 400
+
+# Sentences repeated at the start of the next chunk so entities near a cut keep their context
+OVERLAP_SENTENCES = 1
+
+
+def token_counts(ner_pipeline, texts):
+    """
+    Count model tokens for each text.
+
+    Uses the pipeline's tokenizer when it has one and falls back to counting
+    whitespace-separated words otherwise.
+
+    Args:
+        ner_pipeline: NER pipeline (or any callable with an optional tokenizer attribute)
+        texts (list): Texts to measure
+
+    Returns:
+        list: Token count per text
+    """
+    tokenizer = getattr(ner_pipeline, 'tokenizer', None)
+    if tokenizer is not None and texts:
+        encoded = tokenizer(list(texts), add_special_tokens=False, verbose=False)
+        return [len(ids) for ids in encoded['input_ids']]
+    return [len(text.split()) for text in texts]
+
+
+def _word_spans(text, start, end):
+    """Return (start, end) offsets of the whitespace-separated words in text[start:end]."""
+    spans = []
+    position = start
+    for word in text[start:end].split():
+        word_start = text.index(word, position)
+        spans.append((word_start, word_start + len(word)))
+        position = word_start + len(word)
+    return spans
+
+
+def _pack(units, counts, max_tokens, overlap):
+    """
+    Greedily pack consecutive (start, end) units into windows of at most max_tokens.
+
+    Args:
+        units (list): Character spans in document order
+        counts (list): Token count of each unit
+        max_tokens (int): Token budget per window
+        overlap (int): Units repeated at the start of the following window
+
+    Returns:
+        list: (first unit index, last unit index + 1) for each window
+    """
+    windows = []
+    first = 0
+    while first < len(units):
+        last = first
+        total = 0
+        while last < len(units) and (last == first or total + counts[last] <= max_tokens):
+            total += counts[last]
+            last += 1
+        windows.append((first, last))
+        if last >= len(units):
+            break
+        # Step back for the overlap, but always move forward
+        first = max(last - overlap, first + 1)
+    return windows
+
+
+def chunk_document(ner_pipeline, text, max_tokens=MAX_CHUNK_TOKENS, overlap=OVERLAP_SENTENCES):
+    """
+    Split a long document into overlapping windows on sentence boundaries.
+
+    Sentences longer than max_tokens are split further on whitespace.
+
+    Args:
+        ner_pipeline: NER pipeline whose tokenizer measures the windows
+        text (str): Document text
+        max_tokens (int): Token budget per window
+        overlap (int): Sentences shared between consecutive windows
+
+    Returns:
+        list: (start, end) character offsets of each window
+    """
+    spans = [(start, end) for start, end in sentence_spans(text, sent_tokenize(text)) if end > start]
+    counts = token_counts(ner_pipeline, [text[start:end] for start, end in spans])
+
+    units = []
+    unit_counts = []
+    for (start, end), count in zip(spans, counts):
+        if count <= max_tokens:
+            units.append((start, end))
+            unit_counts.append(count)
+            continue
+        # An oversized sentence is packed word by word without overlap
+        words = _word_spans(text, start, end)
+        word_counts = token_counts(ner_pipeline, [text[ws:we] for ws, we in words])
+        for first, last in _pack(words, word_counts, max_tokens, 0):
+            units.append((words[first][0], words[last - 1][1]))
+            unit_counts.append(sum(word_counts[first:last]))
+
+    return [(units[first][0], units[last - 1][1]) for first, last in _pack(units, unit_counts, max_tokens, overlap)]
+
+
+def _merge_chunk_entities(entities):
+    """Drop duplicates found in overlapping windows, keeping the higher-scoring span."""
+    merged = []
+    for entity in sorted(entities, key=lambda e: (e['start'], -e.get('score', 0))):
+        if merged and entity['start'] < merged[-1]['end']:
+            if entity.get('score', 0) > merged[-1].get('score', 0):
+                merged[-1] = entity
+            continue
+        merged.append(entity)
+    return merged
+
+
+def run_ner(ner_pipeline, texts, batch_size=DEFAULT_BATCH_SIZE,
+            max_tokens=MAX_CHUNK_TOKENS, overlap=OVERLAP_SENTENCES):
+    """
+    Run the NER pipeline over documents of any length.
+
+    Documents that fit the model are sent whole. Longer ones are cut into
+    overlapping sentence windows. All pieces are sorted by length so each
+    batch carries little padding, run through the pipeline in one call, and
+    their entity offsets are mapped back onto the original documents.
+
+    Args:
+        ner_pipeline: Hugging Face token-classification pipeline
+        texts (list): Documents
+        batch_size (int): Pieces sent through the model at once
+        max_tokens (int): Token budget per piece
+        overlap (int): Sentences shared between consecutive windows
+
+    Returns:
+        list: NER results per document with document-level offsets
+    """
+    texts = list(texts)
+    pieces = []
+    chunked = set()
+    # Counting tokens to plan the pieces; the pipeline tokenizes them again inside ner_forward
+    with metrics.stage('ner_chunk_planning'):
+        for index, (text, count) in enumerate(zip(texts, token_counts(ner_pipeline, texts))):
+            if count <= max_tokens:
+                pieces.append((count, index, 0, text))
+                continue
+            chunked.add(index)
+            windows = chunk_document(ner_pipeline, text, max_tokens, overlap)
+            window_counts = token_counts(ner_pipeline, [text[start:end] for start, end in windows])
+            for (start, end), window_count in zip(windows, window_counts):
+                pieces.append((window_count, index, start, text[start:end]))
+
+    results = [[] for _ in texts]
+    if not pieces:
+        return results
+
+    # Similar lengths batched together waste less compute on padding
+    pieces.sort(key=lambda piece: piece[0])
+    with metrics.stage('ner_forward'):
+        outputs = ner_pipeline([piece[3] for piece in pieces], batch_size=batch_size)
+
+    for (_, index, offset, _), entities in zip(pieces, outputs):
+        if index not in chunked:
+            results[index] = entities
+            continue
+        for entity in entities:
+            entity = dict(entity)
+            entity['start'] += offset
+            entity['end'] += offset
+            results[index].append(entity)
+
+    for index in chunked:
+        results[index] = _merge_chunk_entities(results[index])
+    return results
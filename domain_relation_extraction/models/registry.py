@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+
+# Default checkpoint shared by the healthcare and finance models
+DEFAULT_NER_CHECKPOINT = "dslim/bert-base-NER"
+
+# Number of documents sent through the NER pipeline per call in batch mode
+DEFAULT_BATCH_SIZE = 16
+
+# NER inference backends: fp32 PyTorch, dynamic int8 PyTorch, or an exported ONNX graph
+NER_BACKENDS = ('pytorch', 'quantized', 'onnx')
+DEFAULT_NER_BACKEND = os.environ.get('NER_BACKEND', 'pytorch')
+
+# Exported ONNX graphs are kept here so the export only runs once per checkpoint
+ONNX_CACHE_DIR = os.environ.get('NER_ONNX_CACHE',
+                                os.path.join(os.path.expanduser('~'), '.cache', 'domain_relation_extraction', 'onnx'))
+
+
+class ModelRegistry:
+    """Process-wide registry that loads each NER checkpoint once and shares it."""
+
+    def __init__(self, backend=DEFAULT_NER_BACKEND):
+        """
+        Initialize an empty registry.
+
+        Args:
+            backend (str): One of NER_BACKENDS, used for every checkpoint this registry loads
+        """
+        if backend not in NER_BACKENDS:
+            raise ValueError(f"Unknown NER backend '{backend}', expected one of {', '.join(NER_BACKENDS)}")
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._pipelines = {}
+        self._refcounts = {}
+        self._timings = {'import_seconds': None, 'load_seconds': {}}
+
+    def _load(self, checkpoint):
+        """Load tokenizer, model and NER pipeline for a checkpoint."""
+        # torch and transformers are imported on first load so importing the app stays fast
+        started = time.perf_counter()
+        from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
+        imported = time.perf_counter()
+        if self._timings['import_seconds'] is None:
+            self._timings['import_seconds'] = imported - started
+
+        tokenizer = AutoTokenizer.from_pretrained(checkpoint)
+        if self.backend == 'onnx':
+            model = self._load_onnx(checkpoint)
+        else:
+            model = AutoModelForTokenClassification.from_pretrained(checkpoint)
+            if self.backend == 'quantized':
+                import torch
+                # int8 weights for the Linear layers, activations quantized on the fly
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        ner_pipeline = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+        self._timings['load_seconds'][checkpoint] = time.perf_counter() - imported
+        return ner_pipeline
+
+    @staticmethod
+    def _load_onnx(checkpoint):
+        """Load a checkpoint as an ONNX Runtime model, exporting it on first use."""
+        try:
+            from optimum.onnxruntime import ORTModelForTokenClassification
+        except ImportError:
+            raise ImportError("The onnx backend needs optimum with onnxruntime: pip install -r requirements-onnx.txt")
+
+        export_dir = os.path.join(ONNX_CACHE_DIR, checkpoint.replace('/', '__'))
+        if os.path.exists(os.path.join(export_dir, 'model.onnx')):
+            return ORTModelForTokenClassification.from_pretrained(export_dir)
+
+        model = ORTModelForTokenClassification.from_pretrained(checkpoint, export=True)
+        model.save_pretrained(export_dir)
+        return model
+
+    def acquire(self, checkpoint=DEFAULT_NER_CHECKPOINT):
+        """
+        Return the shared NER pipeline for a checkpoint, loading it on first use.
+
+        Args:
+            checkpoint (str): Hugging Face model identifier
+
+        Returns:
+            transformers.Pipeline: The shared NER pipeline
+        """
+        with self._lock:
+            if checkpoint not in self._pipelines:
+                # Loading under the lock keeps concurrent callers from loading twice
+                self._pipelines[checkpoint] = self._load(checkpoint)
+                self._refcounts[checkpoint] = 0
+            self._refcounts[checkpoint] += 1
+            return self._pipelines[checkpoint]
+
+    def release(self, checkpoint=DEFAULT_NER_CHECKPOINT):
+        """
+        Drop one reference to a checkpoint and unload it when nobody uses it.
+
+        Args:
+            checkpoint (str): Hugging Face model identifier
+        """
+        with self._lock:
+            if checkpoint not in self._refcounts:
+                return
+            self._refcounts[checkpoint] -= 1
+            if self._refcounts[checkpoint] <= 0:
+                del self._refcounts[checkpoint]
+                del self._pipelines[checkpoint]
+
+    def refcount(self, checkpoint=DEFAULT_NER_CHECKPOINT):
+        """Return the number of live references to a checkpoint."""
+        with self._lock:
+            return self._refcounts.get(checkpoint, 0)
+
+    def loaded(self):
+        """Return the list of checkpoints currently held in memory."""
+        with self._lock:
+            return list(self._pipelines)
+
+    def timings(self):
+        """Return the backend and seconds spent importing transformers and loading each checkpoint."""
+        with self._lock:
+            return {'backend': self.backend,
+                    'import_seconds': self._timings['import_seconds'],
+                    'load_seconds': dict(self._timings['load_seconds'])}
+
+
+# Shared registry used by all domain models in this process
+registry = ModelRegistry()
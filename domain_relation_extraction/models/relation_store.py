@@ -0,0 +1,265 @@
+import os
+import sqlite3
+import threading
+import time
+
+from models.entity_table import canonical_text
+
+
+def entity_key(text):
+    """Normalize an entity mention so different casings aggregate together."""
+    return canonical_text(text)
+
+
+class RelationStore:
+    """Append-only store of (source, type, target) relations aggregated across documents."""
+
+    def __init__(self, path=None):
+        """
+        Open (or create) the store and load its indexes.
+
+        Relations are persisted to SQLite; the aggregated triples and the indexes
+        by entity and by relation type are held in memory for fast queries. Each
+        process keeps its own indexes, so relations ingested by another process
+        appear after reopening the store.
+
+        Args:
+            path (str, optional): Path of the SQLite file; None keeps the store in memory only
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path or ':memory:', timeout=30, check_same_thread=False)
+        if path:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id INTEGER PRIMARY KEY, doc_key TEXT, domain TEXT, ingested REAL, UNIQUE (domain, doc_key));"
+            "CREATE TABLE IF NOT EXISTS relations ("
+            "id INTEGER PRIMARY KEY, domain TEXT, source_key TEXT, type TEXT, target_key TEXT, "
+            "source TEXT, target TEXT, count INTEGER, UNIQUE (domain, source_key, type, target_key));"
+            "CREATE TABLE IF NOT EXISTS provenance ("
+            "relation_id INTEGER, document_id INTEGER, count INTEGER, PRIMARY KEY (relation_id, document_id));"
+        )
+        self._connection.commit()
+
+        self._load()
+
+    def _load(self):
+        """Rebuild the in-memory triples and indexes from the database."""
+        # Aggregated triples keyed by (domain, source key, type, target key)
+        self._triples = {}
+        self._by_entity = {}
+        self._by_type = {}
+        # Documents keyed by (domain, key): the same text extracted in two domains is two documents
+        self._documents = {}
+        self._document_keys = {}
+        for document_id, domain, doc_key in self._connection.execute("SELECT id, domain, doc_key FROM documents"):
+            self._documents[(domain, doc_key)] = document_id
+            self._document_keys[document_id] = doc_key
+        documents = {}
+        for relation_id, document_id in self._connection.execute("SELECT relation_id, document_id FROM provenance"):
+            documents.setdefault(relation_id, set()).add(document_id)
+        rows = self._connection.execute(
+            "SELECT id, domain, source_key, type, target_key, source, target, count FROM relations")
+        for relation_id, domain, source_key, relation_type, target_key, source, target, count in rows:
+            self._index((domain, source_key, relation_type, target_key), {
+                'id': relation_id,
+                'domain': domain,
+                'source': source,
+                'type': relation_type,
+                'target': target,
+                'count': count,
+                'documents': documents.get(relation_id, set())
+            })
+
+    def _index(self, triple, record):
+        """Add a new triple to the hash indexes."""
+        domain, source_key, relation_type, target_key = triple
+        self._triples[triple] = record
+        self._by_entity.setdefault(source_key, set()).add(triple)
+        self._by_entity.setdefault(target_key, set()).add(triple)
+        self._by_type.setdefault(relation_type, set()).add(triple)
+
+    def ingest(self, documents):
+        """
+        Add the relations of a batch of documents in one transaction.
+
+        Documents already in the store are skipped, so re-ingesting the same
+        results does not inflate the counts. Several processes may ingest into
+        the same file; conflicting rows are merged in the database.
+
+        Args:
+            documents (iterable): (document key, domain, relations) tuples; the key
+                identifies the document within its domain (an id or a text hash)
+
+        Returns:
+            int: Number of documents added
+        """
+        added = 0
+        with self._lock:
+            cursor = self._connection.cursor()
+            try:
+                for doc_key, domain, relations in documents:
+                    doc_key = str(doc_key)
+                    if (domain, doc_key) in self._documents:
+                        continue
+                    # Another process with the same file may have stored the document already
+                    cursor.execute("INSERT INTO documents (doc_key, domain, ingested) VALUES (?, ?, ?) "
+                                   "ON CONFLICT (domain, doc_key) DO NOTHING", (doc_key, domain, time.time()))
+                    inserted = cursor.rowcount == 1
+                    document_id = cursor.execute("SELECT id FROM documents WHERE domain = ? AND doc_key = ?",
+                                                 (domain, doc_key)).fetchone()[0]
+                    self._documents[(domain, doc_key)] = document_id
+                    self._document_keys[document_id] = doc_key
+                    if not inserted:
+                        continue
+                    added += 1
+
+                    # Repeated relations within one document count once per mention
+                    mentions = {}
+                    for relation in relations:
+                        triple = (domain, entity_key(relation['source']), relation['type'],
+                                  entity_key(relation['target']))
+                        if triple not in mentions:
+                            mentions[triple] = [relation, 0]
+                        mentions[triple][1] += 1
+
+                    for triple, (relation, count) in mentions.items():
+                        # Ids and counts are read back, as other processes may share the triple
+                        cursor.execute(
+                            "INSERT INTO relations (domain, source_key, type, target_key, source, target, count) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                            "ON CONFLICT (domain, source_key, type, target_key) DO UPDATE SET count = count + excluded.count",
+                            (*triple, relation['source'], relation['target'], count))
+                        relation_id, total = cursor.execute(
+                            "SELECT id, count FROM relations WHERE domain = ? AND source_key = ? AND type = ? "
+                            "AND target_key = ?", triple).fetchone()
+                        record = self._triples.get(triple)
+                        if record is None:
+                            self._index(triple, {
+                                'id': relation_id,
+                                'domain': domain,
+                                'source': relation['source'],
+                                'type': relation['type'],
+                                'target': relation['target'],
+                                'count': total,
+                                'documents': {document_id}
+                            })
+                        else:
+                            record['count'] = total
+                            record['documents'].add(document_id)
+                        cursor.execute("INSERT INTO provenance (relation_id, document_id, count) VALUES (?, ?, ?) "
+                                       "ON CONFLICT (relation_id, document_id) DO NOTHING",
+                                       (relation_id, document_id, count))
+                self._connection.commit()
+            except Exception:
+                # Keep memory consistent with the database by reloading after a failed batch
+                self._connection.rollback()
+                self._load()
+                raise
+        return added
+
+    def add_document(self, doc_key, domain, relations):
+        """Add the relations extracted from one document; returns False if it was already stored for this domain."""
+        return self.ingest([(doc_key, domain, relations)]) == 1
+
+    def query(self, entity=None, relation_type=None, role='any', domain=None, limit=None):
+        """
+        Find aggregated relations by entity and/or relation type.
+
+        Args:
+            entity (str, optional): Entity text, matched case-insensitively
+            relation_type (str, optional): Relation type such as 'treats'
+            role (str): 'source', 'target' or 'any' position of the entity
+            domain (str, optional): Only relations from this domain
+            limit (int, optional): Largest number of results
+
+        Returns:
+            list: Dicts with domain, source, type, target, count and documents
+                (number of distinct documents), most frequent first
+        """
+        with self._lock:
+            candidates = None
+            if entity is not None:
+                key = entity_key(entity)
+                candidates = self._by_entity.get(key, set())
+                if role == 'source':
+                    candidates = {triple for triple in candidates if triple[1] == key}
+                elif role == 'target':
+                    candidates = {triple for triple in candidates if triple[3] == key}
+            if relation_type is not None:
+                by_type = self._by_type.get(relation_type, set())
+                candidates = by_type if candidates is None else candidates & by_type
+            if candidates is None:
+                candidates = self._triples.keys()
+
+            results = [self._result(self._triples[triple]) for triple in candidates
+                       if domain is None or triple[0] == domain]
+        results.sort(key=lambda result: (-result['count'], result['source'], result['type'], result['target']))
+        return results[:limit] if limit is not None else results
+
+    @staticmethod
+    def _result(record):
+        return {
+            'domain': record['domain'],
+            'source': record['source'],
+            'type': record['type'],
+            'target': record['target'],
+            'count': record['count'],
+            'documents': len(record['documents'])
+        }
+
+    def provenance(self, source, relation_type, target, domain=None):
+        """
+        Return the documents a relation was extracted from.
+
+        Args:
+            source (str): Source entity text
+            relation_type (str): Relation type
+            target (str): Target entity text
+            domain (str, optional): Domain of the relation; all domains if omitted
+
+        Returns:
+            list: Document keys, in ingestion order
+        """
+        source_key, target_key = entity_key(source), entity_key(target)
+        with self._lock:
+            document_ids = set()
+            for triple in self._by_type.get(relation_type, set()):
+                if triple[1] == source_key and triple[3] == target_key and (domain is None or triple[0] == domain):
+                    document_ids |= self._triples[triple]['documents']
+            return [self._document_keys[document_id] for document_id in sorted(document_ids)]
+
+    def triples(self, domain=None):
+        """
+        Return every aggregated relation, e.g. to build an analytics graph.
+
+        Args:
+            domain (str, optional): Only relations from this domain
+
+        Returns:
+            list: (source, type, target, count, document ids) tuples; the ids are the
+                store's internal integer ids of the documents the relation came from
+        """
+        with self._lock:
+            return [(record['source'], record['type'], record['target'], record['count'], sorted(record['documents']))
+                    for triple, record in self._triples.items() if domain is None or triple[0] == domain]
+
+    def stats(self):
+        """Return the number of documents, distinct relations and relation mentions stored."""
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'relations': len(self._triples),
+                'mentions': sum(record['count'] for record in self._triples.values()),
+                'entities': len(self._by_entity),
+                'path': self.path
+            }
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
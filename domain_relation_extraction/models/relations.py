@@ -0,0 +1,35 @@
+def build_relation_table(relation_types):
+    """
+    Precompute which relation types are allowed between two entity types.
+
+    Args:
+        relation_types (dict): Mapping of relation type to its 'source' and
+            'target' entity type constraints
+
+    Returns:
+        dict: Mapping of (source_type, target_type) to candidate relation types,
+            in the order they are declared
+    """
+    table = {}
+    for rel_type, type_constraints in relation_types.items():
+        for source_type in type_constraints['source']:
+            for target_type in type_constraints['target']:
+                candidates = table.setdefault((source_type, target_type), [])
+                if rel_type not in candidates:
+                    candidates.append(rel_type)
+    return table
+
+
+def keyword_hits(sentence_lower, relation_keywords):
+    """
+    Find the relation types whose trigger keywords occur in a sentence.
+
+    Args:
+        sentence_lower (str): Lowercased sentence
+        relation_keywords (dict): Mapping of relation type to trigger keywords
+
+    Returns:
+        set: Relation types with at least one keyword in the sentence
+    """
+    return {rel_type for rel_type, keywords in relation_keywords.items()
+            if any(keyword in sentence_lower for keyword in keywords)}
@@ -0,0 +1,157 @@
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+# Upper bounds of the histogram buckets exported by stats()
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+WAIT_MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+# Queue item that stops the worker thread
+_STOP = object()
+
+
+class _Request:
+    """A queued single-document extraction request."""
+
+    __slots__ = ('text', 'use_ner', 'future', 'enqueued')
+
+    def __init__(self, text, use_ner):
+        self.text = text
+        self.use_ner = use_ner
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+def _histogram(buckets):
+    """Return an empty cumulative histogram with a +Inf bucket."""
+    return {'buckets': {str(bound): 0 for bound in buckets + ('+Inf',)}, 'sum': 0.0, 'count': 0}
+
+
+def _observe(histogram, bounds, value):
+    """Record a value in a cumulative histogram."""
+    for bound in bounds:
+        if value <= bound:
+            histogram['buckets'][str(bound)] += 1
+    histogram['buckets']['+Inf'] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+
+class MicroBatchScheduler:
+    """Gather concurrent single-document requests for one model into batched pipeline calls."""
+
+    def __init__(self, model, max_batch_size=16, max_wait_ms=10):
+        """
+        Start the batching worker for a model.
+
+        Args:
+            model: HealthcareModel or FinanceModel instance
+            max_batch_size (int): Largest number of documents sent in one batch
+            max_wait_ms (float): Longest time the first request of a batch waits for company
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batch_sizes = _histogram(BATCH_SIZE_BUCKETS)
+        self._wait_ms = _histogram(WAIT_MS_BUCKETS)
+        self._thread = threading.Thread(target=self._run, name=f'{model.domain}-micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text, use_ner=True):
+        """
+        Queue a document for extraction.
+
+        Args:
+            text (str): Input text
+            use_ner (bool): False runs the rules only
+
+        Returns:
+            concurrent.futures.Future: Resolves to (entities, relations)
+
+        Raises:
+            RuntimeError: If the scheduler has been closed
+        """
+        request = _Request(text, use_ner)
+        # Checked under the lock so nothing is queued behind the stop marker
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            self._queue.put(request)
+        return request.future
+
+    def extract(self, text, use_ner=True, timeout=None):
+        """Queue a document and wait for its (entities, relations) result."""
+        return self.submit(text, use_ner).result(timeout)
+
+    def _collect(self, first):
+        """Gather requests until the batch is full or the first one has waited max_wait."""
+        batch = [first]
+        deadline = first.enqueued + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Finish this batch, then let the run loop see the stop marker
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        """Worker loop: one batched pipeline call per collected batch."""
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+
+            started = time.perf_counter()
+            with self._lock:
+                _observe(self._batch_sizes, BATCH_SIZE_BUCKETS, len(batch))
+                for request in batch:
+                    _observe(self._wait_ms, WAIT_MS_BUCKETS, (started - request.enqueued) * 1000)
+
+            # Requests with different engines cannot share a pipeline call
+            for use_ner in (True, False):
+                group = [request for request in batch if request.use_ner == use_ner]
+                if not group:
+                    continue
+                try:
+                    results = self.model.extract_many([request.text for request in group],
+                                                      batch_size=len(group), use_ner=use_ner)
+                except Exception as e:
+                    for request in group:
+                        request.future.set_exception(e)
+                    continue
+                for request, result in zip(group, results):
+                    request.future.set_result(result)
+
+    def stats(self):
+        """Return queue depth, batch-size histogram and wait-time histogram."""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batch_size': {'buckets': dict(self._batch_sizes['buckets']),
+                               'sum': self._batch_sizes['sum'], 'count': self._batch_sizes['count']},
+                'wait_ms': {'buckets': dict(self._wait_ms['buckets']),
+                            'sum': self._wait_ms['sum'], 'count': self._wait_ms['count']}
+            }
+
+    def close(self, timeout=None):
+        """Stop the worker after the requests already queued are served; later submits raise RuntimeError."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        self._thread.join(timeout)
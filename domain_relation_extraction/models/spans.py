@@ -0,0 +1,105 @@
+from bisect import bisect_right
+
+
+def entity_key(entity):
+    """Key used to detect duplicate entities: lowercased surface text and type."""
+    return (entity['text'].lower(), entity['type'])
+
+
+def keep_higher_priority(priority_order):
+    """
+    Build an overlap policy that keeps the entity whose type has higher priority.
+
+    Args:
+        priority_order (dict): Mapping of entity type to priority (higher wins)
+
+    Returns:
+        function: Policy returning True when the current entity should be kept
+    """
+    def policy(current, candidate):
+        return priority_order.get(current['type'], -1) >= priority_order.get(candidate['type'], -1)
+    return policy
+
+
+def keep_longer(current, candidate):
+    """Overlap policy that keeps the longer span (the earlier one on ties)."""
+    return (current['end'] - current['start']) >= (candidate['end'] - candidate['start'])
+
+
+def resolve_overlaps(entities, keep_current):
+    """
+    Remove overlapping entities with a single sweep over start-sorted spans.
+
+    Args:
+        entities (list): List of entity dictionaries with 'start' and 'end'
+        keep_current (function): Policy called as keep_current(current, candidate)
+            for each overlapping pair; True drops the candidate, False drops current
+
+    Returns:
+        list: Non-overlapping entities sorted by start position
+    """
+    # Stable sort keeps insertion order for entities starting at the same position
+    ordered = sorted(entities, key=lambda x: x['start'])
+    if not ordered:
+        return []
+
+    resolved = []
+    current = ordered[0]
+    for candidate in ordered[1:]:
+        if current['end'] > candidate['start']:
+            if not keep_current(current, candidate):
+                current = candidate
+        else:
+            resolved.append(current)
+            current = candidate
+    resolved.append(current)
+
+    return resolved
+
+
+def sentence_spans(text, sentences):
+    """
+    Locate tokenized sentences in the original text.
+
+    Args:
+        text (str): Original text
+        sentences (list): Sentences returned by sent_tokenize for the text
+
+    Returns:
+        list: (start, end) character offsets of each sentence
+    """
+    spans = []
+    cursor = 0
+    for sentence in sentences:
+        start = text.find(sentence, cursor)
+        if start < 0:
+            start = cursor
+        end = start + len(sentence)
+        spans.append((start, end))
+        cursor = end
+    return spans
+
+
+def group_by_sentence(text, spans, entities):
+    """
+    Assign each entity to the sentence containing its start offset.
+
+    Sentence starts are searched with bisect, so grouping is linear in the
+    number of entities and sentences, and an entity is only a relation
+    candidate in the sentence where it was mentioned.
+
+    Args:
+        text (str): Original text
+        spans (list): Sentence offsets from sentence_spans
+        entities (list): List of entity dictionaries
+
+    Returns:
+        list: One list of entities per sentence, in the order of the input entities
+    """
+    if not spans:
+        return []
+    starts = [start for start, _ in spans]
+    groups = [[] for _ in spans]
+    for entity in entities:
+        groups[max(bisect_right(starts, entity['start']) - 1, 0)].append(entity)
+    return groups
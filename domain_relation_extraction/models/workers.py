@@ -0,0 +1,107 @@
+import gc
+import multiprocessing
+import os
+
+from models.registry import DEFAULT_BATCH_SIZE
+
+# Models inherited by forked workers; set in the parent before the pool starts
+_worker_models = {}
+
+
+def _init_worker(torch_threads):
+    """
+    Limit torch's intra-op threads so the workers do not oversubscribe the cores.
+
+    The parent has already imported torch and started its thread pool before
+    forking, so environment variables such as OMP_NUM_THREADS no longer have an
+    effect; the limit is applied through torch directly.
+    """
+    if not torch_threads:
+        return
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+
+def _extract_batch(domain, texts, use_ner):
+    """Run one batch of documents through a preloaded model inside a worker."""
+    return _worker_models[domain].extract_many(texts, batch_size=len(texts), use_ner=use_ner)
+
+
+def default_torch_threads(processes):
+    """Split the available cores evenly between the worker processes."""
+    return max(1, (os.cpu_count() or 1) // max(processes, 1))
+
+
+class WorkerPool:
+    """Pool of forked processes that share the parent's loaded models copy-on-write."""
+
+    def __init__(self, models, processes=None, torch_threads=None):
+        """
+        Fork the worker processes.
+
+        The models must be fully loaded before the pool is created, and the parent
+        should not have run inference yet: a fork taken after torch has started its
+        OpenMP threads can deadlock in the children.
+
+        Args:
+            models (dict): Domain name mapped to a loaded HealthcareModel or FinanceModel
+            processes (int, optional): Number of workers; defaults to the CPU count
+            torch_threads (int, optional): torch threads per worker; defaults to cores / processes
+        """
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("WorkerPool needs the 'fork' start method to share loaded models")
+
+        global _worker_models
+        _worker_models = dict(models)
+        self.processes = processes or os.cpu_count() or 1
+        self.torch_threads = torch_threads or default_torch_threads(self.processes)
+
+        # Move everything allocated so far out of the collector's reach so that
+        # garbage collection in the workers does not touch (and copy) shared pages
+        gc.freeze()
+        context = multiprocessing.get_context('fork')
+        self._pool = context.Pool(self.processes, initializer=_init_worker, initargs=(self.torch_threads,))
+
+    def submit(self, domain, texts, use_ner=True):
+        """
+        Queue one batch of documents for a worker without waiting.
+
+        Returns:
+            multiprocessing.pool.AsyncResult: get() returns the (entities, relations) list
+        """
+        return self._pool.apply_async(_extract_batch, (domain, list(texts), use_ner))
+
+    def extract(self, domain, text, use_ner=True, timeout=None):
+        """Extract entities and relations for one document in a worker process."""
+        return self.submit(domain, [text], use_ner).get(timeout)[0]
+
+    def extract_many(self, domain, texts, batch_size=DEFAULT_BATCH_SIZE, use_ner=True):
+        """
+        Spread documents over the workers in batches.
+
+        Args:
+            domain (str): Domain of the model to use
+            texts (list): Input texts
+            batch_size (int): Documents sent to a worker at a time
+            use_ner (bool): False runs the rules only
+
+        Returns:
+            list: (entities, relations) tuples in the order of texts
+        """
+        texts = list(texts)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        pending = [self.submit(domain, batch, use_ner) for batch in batches]
+
+        results = []
+        for result in pending:
+            results.extend(result.get())
+        return results
+
+    def close(self):
+        """Let the workers finish queued work and exit."""
+        self._pool.close()
+        self._pool.join()
+        gc.unfreeze()
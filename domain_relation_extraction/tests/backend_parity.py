@@ -0,0 +1,94 @@
+"""
+Check that the quantized and ONNX NER backends find the same entity spans as fp32 PyTorch.
+
+Runs every text in data/*/samples.json through each backend and reports
+span mismatches and per-document latency:
+
+    python tests/backend_parity.py --backends quantized onnx
+"""
+import argparse
+import glob
+import json
+import sys
+import os
+import time
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.ner import run_ner
+from models.registry import ModelRegistry, DEFAULT_NER_CHECKPOINT, NER_BACKENDS
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+def load_corpora():
+    """Return {domain: [texts]} from every data/<domain>/samples.json."""
+    corpora = {}
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, '*', 'samples.json'))):
+        domain = os.path.basename(os.path.dirname(path))
+        with open(path) as f:
+            corpora[domain] = [sample['text'] for sample in json.load(f)['samples']]
+    return corpora
+
+def entity_spans(ner_results):
+    """Reduce NER output to comparable (start, end, entity_group) spans."""
+    return {(entity['start'], entity['end'], entity['entity_group']) for entity in ner_results}
+
+def run_backend(backend, checkpoint, corpora):
+    """Run every corpus through one backend and return spans and seconds per document."""
+    ner_pipeline = ModelRegistry(backend=backend).acquire(checkpoint)
+    spans = {}
+    seconds = {}
+    for domain, texts in corpora.items():
+        # Warm-up call so one-off initialization is not counted
+        run_ner(ner_pipeline, texts[:1])
+        started = time.perf_counter()
+        results = [run_ner(ner_pipeline, [text])[0] for text in texts]
+        seconds[domain] = (time.perf_counter() - started) / max(len(texts), 1)
+        spans[domain] = [entity_spans(result) for result in results]
+    return spans, seconds
+
+def compare(reference, candidate, corpora):
+    """Count documents whose spans differ from the reference and print the differences."""
+    mismatches = 0
+    for domain, texts in corpora.items():
+        for text, expected, found in zip(texts, reference[domain], candidate[domain]):
+            if expected != found:
+                mismatches += 1
+                print(f"  [{domain}] {text[:70]}")
+                print(f"    missing: {sorted(expected - found)}")
+                print(f"    extra:   {sorted(found - expected)}")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backends', nargs='+', default=['quantized', 'onnx'],
+                        choices=[backend for backend in NER_BACKENDS if backend != 'pytorch'])
+    parser.add_argument('--checkpoint', default=DEFAULT_NER_CHECKPOINT)
+    args = parser.parse_args()
+
+    corpora = load_corpora()
+    documents = sum(len(texts) for texts in corpora.values())
+    print(f"Comparing {', '.join(args.backends)} against pytorch on {documents} documents")
+
+    reference, reference_seconds = run_backend('pytorch', args.checkpoint, corpora)
+    failed = False
+    for backend in args.backends:
+        print("=" * 80)
+        try:
+            spans, seconds = run_backend(backend, args.checkpoint, corpora)
+        except ImportError as e:
+            print(f"{backend}: skipped ({e})")
+            continue
+        mismatches = compare(reference, spans, corpora)
+        failed = failed or mismatches > 0
+        print(f"{backend}: {documents - mismatches}/{documents} documents match")
+        for domain in corpora:
+            speedup = reference_seconds[domain] / seconds[domain] if seconds[domain] else 0
+            print(f"  {domain}: {seconds[domain] * 1000:.1f} ms/doc "
+                  f"(pytorch {reference_seconds[domain] * 1000:.1f} ms/doc, {speedup:.1f}x)")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""
+Benchmark extraction throughput and latency per stage and domain.
+
+Synthetic corpora are built by concatenating texts from data/*/samples.json,
+so the benchmark runs offline. NER is either skipped (rules), replaced by a
+deterministic stub (stub), or the real model (model). Results are written as
+JSON and can be compared against a previous run:
+
+    python tests/benchmark.py --mode stub --docs 500 --scale 1 4 16 --output bench.json
+    python tests/benchmark.py --mode stub --compare bench.json
+"""
+import argparse
+import glob
+import json
+import platform
+import random
+import resource
+import sys
+import os
+import time
+import tracemalloc
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.healthcare_model import HealthcareModel
+from models.finance_model import FinanceModel
+from models.metrics import metrics
+from models.ner import run_ner
+from tests.stubs import CapitalizedRunNER
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+MODEL_CLASSES = {
+    'healthcare': HealthcareModel,
+    'finance': FinanceModel
+}
+
+STAGES = ['ner', 'entities', 'keyword_match', 'overlap_resolution', 'relations', 'end_to_end']
+
+# Stages inside extract_entities_from_ner, timed through the models' own stage instrumentation
+ENTITY_SUBSTAGES = ['keyword_match', 'overlap_resolution']
+
+def load_samples():
+    """Return {domain: [texts]} from every data/<domain>/samples.json."""
+    samples = {}
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, '*', 'samples.json'))):
+        domain = os.path.basename(os.path.dirname(path))
+        with open(path) as f:
+            samples[domain] = [sample['text'] for sample in json.load(f)['samples']]
+    return samples
+
+def build_corpus(texts, docs, scale, seed):
+    """Build docs synthetic documents, each joining scale randomly chosen sample texts."""
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(texts) for _ in range(scale)) for _ in range(docs)]
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def peak_rss_kb():
+    """Peak resident set size of this process in kilobytes, native allocations included."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def peak_py_heap_kb(function, inputs):
+    """
+    Peak Python-heap memory allocated while calling function on every input, in kilobytes.
+
+    The process-wide peak RSS never goes down, so it cannot be split by stage;
+    instead the stage runs again under tracemalloc, separately from the timed
+    pass, and its outputs count towards the peak. Only allocations made through
+    Python's allocators are traced, so memory held natively by torch and the
+    tokenizers is not included; the run's peak RSS is reported separately.
+    """
+    tracemalloc.start()
+    try:
+        outputs = [function(item) for item in inputs]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+def summarize(latencies, peak_kb=None):
+    """Turn per-document latencies (seconds) and a stage's Python-heap peak into throughput and percentile metrics."""
+    total = sum(latencies)
+    ordered = sorted(latencies)
+    return {
+        'docs': len(latencies),
+        'docs_per_sec': len(latencies) / total if total > 0 else 0.0,
+        'mean_ms': total / len(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'peak_py_heap_kb': peak_kb
+    }
+
+def time_stage(function, inputs):
+    """Call function on every input and return (outputs, per-call seconds)."""
+    outputs = []
+    latencies = []
+    for item in inputs:
+        started = time.perf_counter()
+        outputs.append(function(item))
+        latencies.append(time.perf_counter() - started)
+    return outputs, latencies
+
+def stage_total(stage, domain):
+    """Seconds recorded so far for an instrumented stage of a domain."""
+    snapshot = metrics.stage_seconds.snapshot(stage=stage, domain=domain)
+    return snapshot['sum'] if snapshot else 0.0
+
+def time_substages(function, inputs, domain, stages):
+    """
+    Call function on every input and return (outputs, per-call seconds, {stage: per-call seconds}).
+
+    Per-call time in each stage is the growth of the models' stage_seconds
+    histogram across the call, so the stages are the ones production runs.
+    """
+    enabled = metrics.enabled
+    metrics.enabled = True
+    outputs = []
+    latencies = []
+    stage_latencies = {stage: [] for stage in stages}
+    try:
+        for item in inputs:
+            before = {stage: stage_total(stage, domain) for stage in stages}
+            started = time.perf_counter()
+            outputs.append(function(item))
+            latencies.append(time.perf_counter() - started)
+            for stage in stages:
+                stage_latencies[stage].append(stage_total(stage, domain) - before[stage])
+    finally:
+        metrics.enabled = enabled
+    return outputs, latencies, stage_latencies
+
+def run_stage(function, inputs):
+    """Time a stage over every input, then measure its memory; returns (outputs, metrics)."""
+    outputs, latencies = time_stage(function, inputs)
+    return outputs, summarize(latencies, peak_py_heap_kb(function, inputs))
+
+def benchmark_corpus(model, corpus, use_ner):
+    """Run each stage over a whole corpus and return metrics per stage."""
+    results = {}
+
+    if use_ner:
+        ner_outputs, results['ner'] = run_stage(lambda text: run_ner(model.ner_pipeline, [text])[0], corpus)
+    else:
+        ner_outputs = [[] for _ in corpus]
+
+    # The model's own entity step: keyword matching, NER vetting, dedup and overlap resolution
+    extract_entities = lambda pair: model.extract_entities_from_ner(*pair)
+    pairs = list(zip(corpus, ner_outputs))
+    entities, latencies, stage_latencies = time_substages(extract_entities, pairs, model.domain, ENTITY_SUBSTAGES)
+    results['entities'] = summarize(latencies, peak_py_heap_kb(extract_entities, pairs))
+    for stage in ENTITY_SUBSTAGES:
+        results[stage] = summarize(stage_latencies[stage])
+
+    _, results['relations'] = run_stage(lambda pair: model.extract_relations(*pair), list(zip(corpus, entities)))
+
+    _, results['end_to_end'] = run_stage(lambda text: model.extract(text, use_ner=use_ner), corpus)
+
+    return results
+
+def make_model(domain, mode):
+    """Construct a domain model for a benchmark mode without a result cache."""
+    if mode == 'model':
+        return MODEL_CLASSES[domain]()
+    model = MODEL_CLASSES[domain](use_ner=False)
+    if mode == 'stub':
+        model.ner_pipeline = CapitalizedRunNER()
+    return model
+
+def run_benchmark(mode, docs, scales, seed, domains=None):
+    """Benchmark every domain and scale; returns the JSON-serializable report."""
+    samples = load_samples()
+    report = {
+        'meta': {
+            'mode': mode,
+            'docs': docs,
+            'scales': scales,
+            'seed': seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'peak_rss_kb': None
+        },
+        'results': {}
+    }
+
+    for domain, texts in samples.items():
+        if domains and domain not in domains:
+            continue
+        model = make_model(domain, mode)
+        use_ner = mode != 'rules'
+        report['results'][domain] = {}
+        for scale in scales:
+            corpus = build_corpus(texts, docs, scale, seed)
+            # One untimed pass so lazy initialization does not skew the first stage
+            for text in corpus[:5]:
+                model.extract(text, use_ner=use_ner)
+            report['results'][domain][str(scale)] = benchmark_corpus(model, corpus, use_ner)
+        model.close()
+
+    report['meta']['peak_rss_kb'] = peak_rss_kb()
+    return report
+
+def print_report(report, baseline=None):
+    """Print a table of stage metrics, with the change against a baseline when given."""
+    for domain, scales in report['results'].items():
+        for scale, stages in scales.items():
+            print("=" * 80)
+            print(f"{domain.upper()} (scale {scale}, {report['meta']['docs']} docs, mode {report['meta']['mode']})")
+            print(f"{'stage':<20}{'docs/sec':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'heap MB':>10}{'vs base':>10}")
+            for stage in STAGES:
+                if stage not in stages:
+                    continue
+                stage_metrics = stages[stage]
+                change = ''
+                base = (baseline or {}).get('results', {}).get(domain, {}).get(scale, {}).get(stage)
+                if base and base['docs_per_sec']:
+                    change = f"{stage_metrics['docs_per_sec'] / base['docs_per_sec']:.2f}x"
+                heap = stage_metrics['peak_py_heap_kb']
+                heap = f"{heap / 1024:.1f}" if heap is not None else '-'
+                print(f"{stage:<20}{stage_metrics['docs_per_sec']:>12.1f}{stage_metrics['p50_ms']:>10.3f}"
+                      f"{stage_metrics['p95_ms']:>10.3f}{stage_metrics['p99_ms']:>10.3f}{heap:>10}{change:>10}")
+    print(f"Peak RSS of the run: {report['meta']['peak_rss_kb'] / 1024:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['rules', 'stub', 'model'], default='stub',
+                        help="rules skips NER, stub uses a fake NER, model loads the real checkpoint")
+    parser.add_argument('--docs', type=int, default=200, help="documents per corpus")
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 4, 16],
+                        help="sample texts concatenated per synthetic document")
+    parser.add_argument('--domain', nargs='+', choices=sorted(MODEL_CLASSES), help="domains to run (default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="previous results file to compare throughput against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    report = run_benchmark(args.mode, args.docs, args.scale, args.seed, args.domain)
+    print_report(report, baseline)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Parallel, cached evaluation of the domain models against labelled corpora.
+
+Raw NER output is cached by text hash (per checkpoint and backend), so after a
+rule change the corpora are re-scored without running the NER model again.
+The rule stages (keyword matching, overlap resolution, relations) and the
+scoring run in forked worker processes.
+"""
+import json
+import multiprocessing
+import os
+import sys
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.cache import text_hash
+from models.ner import run_ner
+from models.registry import DEFAULT_BATCH_SIZE, registry
+from tests.expected_outputs import evaluate_prediction, metrics_from_counts
+from utils.streaming import iter_json_array, iter_ndjson
+
+# Documents handed to a worker process at a time
+CHUNK_SIZE = 64
+
+# Models inherited by forked evaluation workers; set in the parent before the pool starts
+_eval_models = {}
+
+
+class NerOutputCache:
+    """Raw NER pipeline output keyed by checkpoint, backend and text hash, optionally kept in a JSON file."""
+
+    def __init__(self, path=None):
+        """
+        Load the cache.
+
+        Args:
+            path (str, optional): JSON file the cache is read from and saved to; None keeps it in memory
+        """
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable NER cache {path}: {e}")
+
+    @staticmethod
+    def key(model, text):
+        """Cache key of a document's NER output; independent of the keyword and relation rules."""
+        return f"{model.ner_checkpoint}:{registry.backend}:{text_hash(text)}"
+
+    def get(self, model, text):
+        """Return the cached NER output for a document, or None if missing."""
+        entry = self.entries.get(self.key(model, text))
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, model, text, ner_results):
+        """Store a document's NER output with plain JSON types."""
+        self.entries[self.key(model, text)] = [
+            {'entity_group': entity['entity_group'], 'word': entity['word'],
+             'start': int(entity['start']), 'end': int(entity['end']), 'score': float(entity['score'])}
+            for entity in ner_results
+        ]
+        self._dirty = True
+
+    def save(self):
+        """Write the cache back to its file if anything was added."""
+        if not self.path or not self._dirty:
+            return
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(temporary, self.path)
+        self._dirty = False
+
+
+def load_corpus(path):
+    """
+    Read a labelled corpus in the data/*/samples.json format (or JSONL of the same records).
+
+    Args:
+        path (str): JSON file with a 'samples' array, or a .jsonl file
+
+    Returns:
+        dict: Case name (the record id, or its position) mapped to {'text', 'entities', 'relations'}
+    """
+    cases = {}
+    with open(path, 'rb') as f:
+        records = iter_ndjson(f) if path.endswith(('.jsonl', '.ndjson')) else iter_json_array(f, key='samples')
+        for index, record in enumerate(records):
+            cases[str(record.get('id', index))] = {
+                'text': record['text'],
+                'entities': record.get('expected_entities', []),
+                'relations': record.get('expected_relations', [])
+            }
+    return cases
+
+
+def ner_outputs(model, texts, cache, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Return raw NER output for each text, running the model only on texts missing from the cache.
+
+    Args:
+        model: HealthcareModel or FinanceModel
+        texts (list): Documents
+        cache (NerOutputCache): Cache of earlier NER output
+        batch_size (int): Documents sent to the NER pipeline at once
+
+    Returns:
+        list: NER entity dicts for each text, in input order
+    """
+    if model.ner_pipeline is None:
+        return [[] for _ in texts]
+
+    results = [cache.get(model, text) for text in texts]
+    missing = sorted({text for text, result in zip(texts, results) if result is None})
+    if missing:
+        try:
+            computed = run_ner(model.ner_pipeline, missing, batch_size=batch_size)
+        except Exception as e:
+            print(f"Error in batched NER: {e}")
+            computed = [None] * len(missing)
+        for text, ner_results in zip(missing, computed):
+            # Failed documents are scored without NER and not cached
+            if ner_results is not None:
+                cache.set(model, text, ner_results)
+        computed = dict(zip(missing, computed))
+        results = [result if result is not None else computed[text] or []
+                   for text, result in zip(texts, results)]
+    return results
+
+
+def _score_chunk(domain, chunk):
+    """Run the rule stages and scoring for (text, ner output, expected) triples."""
+    model = _eval_models[domain]
+    scored = []
+    for text, ner_results, expected in chunk:
+        try:
+            entities = model.extract_entities_from_ner(text, ner_results)
+            relations = model.extract_relations(text, entities)
+        except Exception as e:
+            print(f"Error in extraction: {e}")
+            entities, relations = [], []
+        scored.append((entities, relations, evaluate_prediction(entities, relations, expected)))
+    return scored
+
+
+def evaluate_corpus(model, cases, cache=None, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    """
+    Extract and score every case of a labelled corpus.
+
+    NER runs batched in this process; the rule stages run in forked workers.
+    The workers never call the NER model, so forking after inference is safe.
+
+    Args:
+        model: HealthcareModel or FinanceModel
+        cases (dict): Case name mapped to {'text', 'entities', 'relations'}
+        cache (NerOutputCache, optional): Cache of raw NER output; an in-memory one is used if omitted
+        batch_size (int): Documents sent to the NER pipeline at once
+        workers (int, optional): Worker processes; defaults to the CPU count, 1 runs in-process
+
+    Returns:
+        dict: Case name mapped to {'entities', 'relations', 'evaluation'}
+    """
+    cache = cache if cache is not None else NerOutputCache()
+    names = list(cases)
+    texts = [cases[name]['text'] for name in names]
+    ner_batch = ner_outputs(model, texts, cache, batch_size)
+    triples = [(text, ner_results, cases[name]) for name, text, ner_results in zip(names, texts, ner_batch)]
+    chunks = [triples[i:i + CHUNK_SIZE] for i in range(0, len(triples), CHUNK_SIZE)]
+
+    global _eval_models
+    _eval_models = {model.domain: model}
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            scored_chunks = pool.starmap(_score_chunk, [(model.domain, chunk) for chunk in chunks])
+    else:
+        scored_chunks = [_score_chunk(model.domain, chunk) for chunk in chunks]
+
+    results = {}
+    scored = (item for chunk in scored_chunks for item in chunk)
+    for name, (entities, relations, evaluation) in zip(names, scored):
+        results[name] = {'entities': entities, 'relations': relations, 'evaluation': evaluation}
+    return results
+
+
+def summarize(evaluations):
+    """
+    Aggregate per-case evaluations of a corpus.
+
+    Args:
+        evaluations (list): Results of evaluate_prediction
+
+    Returns:
+        dict: For 'entity_metrics' and 'relation_metrics', the macro average of each
+            case's recall/precision/f1 and the micro average over the pooled counts
+    """
+    summary = {}
+    for kind in ("entity_metrics", "relation_metrics"):
+        per_case = [evaluation[kind] for evaluation in evaluations]
+        count = len(per_case) or 1
+        summary[kind] = {
+            "macro": {metric: sum(case[metric] for case in per_case) / count
+                      for metric in ("recall", "precision", "f1")},
+            "micro": metrics_from_counts(*(sum(case[field] for case in per_case) for field in
+                                            ("expected", "extracted", "correctly_identified", "correctly_typed")))
+        }
+    return summary
@@ -2,6 +2,7 @@
 This module contains expected outputs for test cases to validate 
 the domain-specific relation extraction system.
 """
+from collections import Counter
 import sys
 import os
 
@@ -107,83 +108,94 @@ FINANCE_EXPECTED = {
     }
 }
 
-def evaluate_test_results(entities, relations, expected, test_name):
+def metrics_from_counts(expected, extracted, found, typed):
     """
-    Evaluate test results against expected outputs.
-    
+    Compute recall, precision, F1 and type accuracy from match counts.
+
+    Args:
+        expected (int): Number of expected items
+        extracted (int): Number of extracted items
+        found (int): Matches between expected and extracted items
+        typed (int): Matches that also agree on the type
+
+    Returns:
+        dict: Counts and metrics
+    """
+    recall = found / expected if expected > 0 else 0
+    precision = found / extracted if extracted > 0 else 0
+    f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
+    type_accuracy = typed / found if found > 0 else 0
+
+    return {
+        "expected": expected,
+        "extracted": extracted,
+        "correctly_identified": found,
+        "correctly_typed": typed,
+        "recall": recall,
+        "precision": precision,
+        "f1": f1,
+        "type_accuracy": type_accuracy
+    }
+
+def evaluate_prediction(entities, relations, expected_data):
+    """
+    Evaluate extracted entities and relations against one expected output.
+
+    Every (expected, extracted) pair that matches case-insensitively on the entity
+    text, or on the relation source and target, counts as a match, as does each
+    such pair that also agrees on the type. Counting with dict lookups keeps this
+    linear in the number of entities and relations.
+
     Args:
         entities (list): List of extracted entities
         relations (list): List of extracted relations
-        expected (dict): Dictionary of expected outputs
-        test_name (str): Name of the test case
-        
+        expected_data (dict): Expected 'entities' and 'relations'
+
     Returns:
         dict: Evaluation results
     """
-    if test_name not in expected:
-        return {"error": f"No expected output defined for test '{test_name}'"}
-    
-    expected_data = expected[test_name]
-    
     # Check entities
+    by_text = Counter(entity["text"].lower() for entity in entities)
+    by_text_type = Counter((entity["text"].lower(), entity["type"]) for entity in entities)
     entity_found = 0
     entity_correct_type = 0
-    
     for exp_entity in expected_data["entities"]:
-        for entity in entities:
-            if exp_entity["text"].lower() == entity["text"].lower():
-                entity_found += 1
-                if exp_entity["type"] == entity["type"]:
-                    entity_correct_type += 1
-    
+        text = exp_entity["text"].lower()
+        entity_found += by_text[text]
+        entity_correct_type += by_text_type[(text, exp_entity["type"])]
+
     # Check relations
+    by_pair = Counter((relation["source"].lower(), relation["target"].lower()) for relation in relations)
+    by_pair_type = Counter((relation["source"].lower(), relation["target"].lower(), relation["type"])
+                           for relation in relations)
     relation_found = 0
     relation_correct_type = 0
-    
     for exp_relation in expected_data["relations"]:
-        for relation in relations:
-            if (exp_relation["source"].lower() == relation["source"].lower() and
-                exp_relation["target"].lower() == relation["target"].lower()):
-                relation_found += 1
-                if exp_relation["type"] == relation["type"]:
-                    relation_correct_type += 1
-    
-    # Calculate metrics
-    total_expected_entities = len(expected_data["entities"])
-    total_expected_relations = len(expected_data["relations"])
-    
-    entity_recall = entity_found / total_expected_entities if total_expected_entities > 0 else 0
-    entity_precision = entity_found / len(entities) if len(entities) > 0 else 0
-    entity_f1 = 2 * (entity_precision * entity_recall) / (entity_precision + entity_recall) if (entity_precision + entity_recall) > 0 else 0
-    
-    entity_type_accuracy = entity_correct_type / entity_found if entity_found > 0 else 0
-    
-    relation_recall = relation_found / total_expected_relations if total_expected_relations > 0 else 0
-    relation_precision = relation_found / len(relations) if len(relations) > 0 else 0
-    relation_f1 = 2 * (relation_precision * relation_recall) / (relation_precision + relation_recall) if (relation_precision + relation_recall) > 0 else 0
+        pair = (exp_relation["source"].lower(), exp_relation["target"].lower())
+        relation_found += by_pair[pair]
+        relation_correct_type += by_pair_type[pair + (exp_relation["type"],)]
+
+    return {
+        "entity_metrics": metrics_from_counts(len(expected_data["entities"]), len(entities),
+                                              entity_found, entity_correct_type),
+        "relation_metrics": metrics_from_counts(len(expected_data["relations"]), len(relations),
+                                                relation_found, relation_correct_type)
+    }
+
+def evaluate_test_results(entities, relations, expected, test_name):
+    """
+    Evaluate test results against expected outputs.
     
-    relation_type_accuracy = relation_correct_type / relation_found if relation_found > 0 else 0
+    Args:
+        entities (list): List of extracted entities
+        relations (list): List of extracted relations
+        expected (dict): Dictionary of expected outputs
+        test_name (str): Name of the test case
+        
+    Returns:
+        dict: Evaluation results
+    """
+    if test_name not in expected:
+        return {"error": f"No expected output defined for test '{test_name}'"}
     
-    # Return evaluation results
-    return {
-        "entity_metrics": {
-            "expected": total_expected_entities,
-            "extracted": len(entities),
-            "correctly_identified": entity_found,
-            "correctly_typed": entity_correct_type,
-            "recall": entity_recall,
-            "precision": entity_precision,
-            "f1": entity_f1,
-            "type_accuracy": entity_type_accuracy
-        },
-        "relation_metrics": {
-            "expected": total_expected_relations,
-            "extracted": len(relations),
-            "correctly_identified": relation_found,
-            "correctly_typed": relation_correct_type,
-            "recall": relation_recall,
-            "precision": relation_precision,
-            "f1": relation_f1,
-            "type_accuracy": relation_type_accuracy
-        }
-    }
\ No newline at end of file
+    return evaluate_prediction(entities, relations, expected[test_name])
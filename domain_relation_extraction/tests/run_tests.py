@@ -1,6 +1,15 @@
 """
 Run evaluation tests for the domain-specific relation extraction system.
+
+With --cache, NER output is cached by text hash in that file, so re-running
+after a rule change only re-applies the rules. Larger labelled corpora in the
+data/*/samples.json format can be evaluated with --corpus:
+
+    python tests/run_tests.py
+    python tests/run_tests.py --corpus data/healthcare/samples.json --domain healthcare --quiet
+    python tests/run_tests.py --cache evaluation_ner_cache.json
 """
+import argparse
 import json
 import sys
 import os
@@ -10,7 +19,13 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from models.healthcare_model import HealthcareModel
 from models.finance_model import FinanceModel
-from tests.expected_outputs import HEALTHCARE_EXPECTED, FINANCE_EXPECTED, evaluate_test_results
+from tests.evaluation import NerOutputCache, evaluate_corpus, load_corpus, summarize
+from tests.expected_outputs import HEALTHCARE_EXPECTED, FINANCE_EXPECTED
+
+MODEL_CLASSES = {
+    'healthcare': HealthcareModel,
+    'finance': FinanceModel
+}
 
 def format_metrics(metrics):
     """Format metrics for display."""
@@ -21,188 +36,144 @@ def format_metrics(metrics):
         "Type Accuracy": f"{metrics['type_accuracy']:.2f}"
     }
 
-def run_healthcare_tests():
-    """Run tests on the healthcare model."""
+def print_case(test_name, text, evaluation):
+    """Print the entity and relation results of one test case."""
+    print(f"\nRunning test: {test_name}")
+    print(f"Text: {text}")
+    
+    # Display entity results
+    entity_metrics = evaluation["entity_metrics"]
+    print(f"\nEntity Results:")
+    print(f"Found {entity_metrics['extracted']} entities, expected {entity_metrics['expected']}")
+    print(f"Correctly identified: {entity_metrics['correctly_identified']}")
+    print(f"Correctly typed: {entity_metrics['correctly_typed']}")
+    
+    # Display relation results
+    relation_metrics = evaluation["relation_metrics"]
+    print(f"\nRelation Results:")
+    print(f"Found {relation_metrics['extracted']} relations, expected {relation_metrics['expected']}")
+    print(f"Correctly identified: {relation_metrics['correctly_identified']}")
+    print(f"Correctly typed: {relation_metrics['correctly_typed']}")
+    
+    print("-" * 80)
+
+def run_domain_tests(domain, cases, cache, workers=None, quiet=False):
+    """
+    Evaluate a domain model on labelled cases and print the results.
+
+    Args:
+        domain (str): 'healthcare' or 'finance'
+        cases (dict): Case name mapped to {'text', 'entities', 'relations'}
+        cache (NerOutputCache): Cache of raw NER output
+        workers (int, optional): Processes running the rule stages
+        quiet (bool): Print only the summary, not each case
+
+    Returns:
+        dict: Case name mapped to its evaluation
+    """
     print("=" * 80)
-    print("HEALTHCARE MODEL EVALUATION")
+    print(f"{domain.upper()} MODEL EVALUATION")
     print("=" * 80)
     
-    model = HealthcareModel()
-    results = {}
-    
-    # Run tests and evaluate
-    for test_name, test_data in HEALTHCARE_EXPECTED.items():
-        print(f"\nRunning test: {test_name}")
-        print(f"Text: {test_data['text']}")
-        
-        entities, relations = model.extract(test_data['text'])
-        evaluation = evaluate_test_results(entities, relations, HEALTHCARE_EXPECTED, test_name)
-        
-        # Store results
-        results[test_name] = evaluation
-        
-        # Display entity results
-        entity_metrics = evaluation["entity_metrics"]
-        print(f"\nEntity Results:")
-        print(f"Found {entity_metrics['extracted']} entities, expected {entity_metrics['expected']}")
-        print(f"Correctly identified: {entity_metrics['correctly_identified']}")
-        print(f"Correctly typed: {entity_metrics['correctly_typed']}")
-        
-        # Display relation results
-        relation_metrics = evaluation["relation_metrics"]
-        print(f"\nRelation Results:")
-        print(f"Found {relation_metrics['extracted']} relations, expected {relation_metrics['expected']}")
-        print(f"Correctly identified: {relation_metrics['correctly_identified']}")
-        print(f"Correctly typed: {relation_metrics['correctly_typed']}")
-        
-        print("-" * 80)
-    
-    # Create summary table
-    entity_summary = []
-    relation_summary = []
-    
-    for test_name, eval_results in results.items():
-        entity_metrics = format_metrics(eval_results["entity_metrics"])
-        entity_metrics["Test"] = test_name
-        entity_summary.append(entity_metrics)
-        
-        relation_metrics = format_metrics(eval_results["relation_metrics"])
-        relation_metrics["Test"] = test_name
-        relation_summary.append(relation_metrics)
-    
-    try:
-        from tabulate import tabulate
-        # Print summary tables
-        print("\nEntity Metrics Summary:")
-        print(tabulate(entity_summary, headers="keys", tablefmt="grid"))
-        
-        print("\nRelation Metrics Summary:")
-        print(tabulate(relation_summary, headers="keys", tablefmt="grid"))
-    except ImportError:
-        print("Install tabulate for better formatted tables: pip install tabulate")
-        print("\nEntity Metrics Summary:")
-        for item in entity_summary:
-            print(item)
-        
-        print("\nRelation Metrics Summary:")
-        for item in relation_summary:
-            print(item)
-    
-    # Calculate averages
-    avg_entity_recall = sum(float(item["Recall"]) for item in entity_summary) / len(entity_summary)
-    avg_entity_precision = sum(float(item["Precision"]) for item in entity_summary) / len(entity_summary)
-    avg_entity_f1 = sum(float(item["F1 Score"]) for item in entity_summary) / len(entity_summary)
-    
-    avg_relation_recall = sum(float(item["Recall"]) for item in relation_summary) / len(relation_summary)
-    avg_relation_precision = sum(float(item["Precision"]) for item in relation_summary) / len(relation_summary)
-    avg_relation_f1 = sum(float(item["F1 Score"]) for item in relation_summary) / len(relation_summary)
+    hits, misses = cache.hits, cache.misses
+    model = MODEL_CLASSES[domain]()
+    outputs = evaluate_corpus(model, cases, cache=cache, workers=workers)
+    model.close()
+    results = {test_name: output["evaluation"] for test_name, output in outputs.items()}
+    
+    if not quiet:
+        for test_name, evaluation in results.items():
+            print_case(test_name, cases[test_name]['text'], evaluation)
+        
+        # Create summary table
+        entity_summary = []
+        relation_summary = []
+        
+        for test_name, eval_results in results.items():
+            entity_metrics = format_metrics(eval_results["entity_metrics"])
+            entity_metrics["Test"] = test_name
+            entity_summary.append(entity_metrics)
+            
+            relation_metrics = format_metrics(eval_results["relation_metrics"])
+            relation_metrics["Test"] = test_name
+            relation_summary.append(relation_metrics)
+        
+        try:
+            from tabulate import tabulate
+            # Print summary tables
+            print("\nEntity Metrics Summary:")
+            print(tabulate(entity_summary, headers="keys", tablefmt="grid"))
+            
+            print("\nRelation Metrics Summary:")
+            print(tabulate(relation_summary, headers="keys", tablefmt="grid"))
+        except ImportError:
+            print("Install tabulate for better formatted tables: pip install tabulate")
+            print("\nEntity Metrics Summary:")
+            for item in entity_summary:
+                print(item)
+            
+            print("\nRelation Metrics Summary:")
+            for item in relation_summary:
+                print(item)
+    
+    # Averages per case (macro) and over all pooled matches (micro)
+    summary = summarize(list(results.values()))
+    entity = summary["entity_metrics"]
+    relation = summary["relation_metrics"]
     
     print("\nAverage Metrics:")
-    print(f"Entity: Recall={avg_entity_recall:.2f}, Precision={avg_entity_precision:.2f}, F1={avg_entity_f1:.2f}")
-    print(f"Relation: Recall={avg_relation_recall:.2f}, Precision={avg_relation_precision:.2f}, F1={avg_relation_f1:.2f}")
+    print(f"Entity: Recall={entity['macro']['recall']:.2f}, Precision={entity['macro']['precision']:.2f}, F1={entity['macro']['f1']:.2f}")
+    print(f"Relation: Recall={relation['macro']['recall']:.2f}, Precision={relation['macro']['precision']:.2f}, F1={relation['macro']['f1']:.2f}")
+    print("\nPooled Metrics:")
+    print(f"Entity: Recall={entity['micro']['recall']:.2f}, Precision={entity['micro']['precision']:.2f}, F1={entity['micro']['f1']:.2f}")
+    print(f"Relation: Recall={relation['micro']['recall']:.2f}, Precision={relation['micro']['precision']:.2f}, F1={relation['micro']['f1']:.2f}")
+    print(f"NER cache: {cache.hits - hits} hits, {cache.misses - misses} misses")
     
     return results
 
-def run_finance_tests():
+def run_healthcare_tests(cache=None, workers=None):
+    """Run tests on the healthcare model."""
+    return run_domain_tests('healthcare', HEALTHCARE_EXPECTED, cache or NerOutputCache(), workers)
+
+def run_finance_tests(cache=None, workers=None):
     """Run tests on the finance model."""
-    print("\n\n" + "=" * 80)
-    print("FINANCE MODEL EVALUATION")
-    print("=" * 80)
-    
-    model = FinanceModel()
-    results = {}
-    
-    # Run tests and evaluate
-    for test_name, test_data in FINANCE_EXPECTED.items():
-        print(f"\nRunning test: {test_name}")
-        print(f"Text: {test_data['text']}")
-        
-        entities, relations = model.extract(test_data['text'])
-        evaluation = evaluate_test_results(entities, relations, FINANCE_EXPECTED, test_name)
-        
-        # Store results
-        results[test_name] = evaluation
-        
-        # Display entity results
-        entity_metrics = evaluation["entity_metrics"]
-        print(f"\nEntity Results:")
-        print(f"Found {entity_metrics['extracted']} entities, expected {entity_metrics['expected']}")
-        print(f"Correctly identified: {entity_metrics['correctly_identified']}")
-        print(f"Correctly typed: {entity_metrics['correctly_typed']}")
-        
-        # Display relation results
-        relation_metrics = evaluation["relation_metrics"]
-        print(f"\nRelation Results:")
-        print(f"Found {relation_metrics['extracted']} relations, expected {relation_metrics['expected']}")
-        print(f"Correctly identified: {relation_metrics['correctly_identified']}")
-        print(f"Correctly typed: {relation_metrics['correctly_typed']}")
-        
-        print("-" * 80)
-    
-    # Create summary table
-    entity_summary = []
-    relation_summary = []
-    
-    for test_name, eval_results in results.items():
-        entity_metrics = format_metrics(eval_results["entity_metrics"])
-        entity_metrics["Test"] = test_name
-        entity_summary.append(entity_metrics)
-        
-        relation_metrics = format_metrics(eval_results["relation_metrics"])
-        relation_metrics["Test"] = test_name
-        relation_summary.append(relation_metrics)
-    
-    try:
-        from tabulate import tabulate
-        # Print summary tables
-        print("\nEntity Metrics Summary:")
-        print(tabulate(entity_summary, headers="keys", tablefmt="grid"))
-        
-        print("\nRelation Metrics Summary:")
-        print(tabulate(relation_summary, headers="keys", tablefmt="grid"))
-    except ImportError:
-        print("Install tabulate for better formatted tables: pip install tabulate")
-        print("\nEntity Metrics Summary:")
-        for item in entity_summary:
-            print(item)
-        
-        print("\nRelation Metrics Summary:")
-        for item in relation_summary:
-            print(item)
-    
-    # Calculate averages
-    avg_entity_recall = sum(float(item["Recall"]) for item in entity_summary) / len(entity_summary)
-    avg_entity_precision = sum(float(item["Precision"]) for item in entity_summary) / len(entity_summary)
-    avg_entity_f1 = sum(float(item["F1 Score"]) for item in entity_summary) / len(entity_summary)
-    
-    avg_relation_recall = sum(float(item["Recall"]) for item in relation_summary) / len(relation_summary)
-    avg_relation_precision = sum(float(item["Precision"]) for item in relation_summary) / len(relation_summary)
-    avg_relation_f1 = sum(float(item["F1 Score"]) for item in relation_summary) / len(relation_summary)
-    
-    print("\nAverage Metrics:")
-    print(f"Entity: Recall={avg_entity_recall:.2f}, Precision={avg_entity_precision:.2f}, F1={avg_entity_f1:.2f}")
-    print(f"Relation: Recall={avg_relation_recall:.2f}, Precision={avg_relation_precision:.2f}, F1={avg_relation_f1:.2f}")
-    
-    return results
+    print("\n")
+    return run_domain_tests('finance', FINANCE_EXPECTED, cache or NerOutputCache(), workers)
 
-def save_results(healthcare_results, finance_results):
-    """Save evaluation results to a file."""
-    all_results = {
-        "healthcare": healthcare_results,
-        "finance": finance_results
-    }
-    
-    with open('evaluation_results.json', 'w') as f:
+def save_results(all_results, path='evaluation_results.json'):
+    """Save evaluation results, keyed by domain, to a file."""
+    with open(path, 'w') as f:
         json.dump(all_results, f, indent=2)
     
-    print("\nResults saved to evaluation_results.json")
+    print(f"\nResults saved to {path}")
 
-if __name__ == "__main__":
-    # Run healthcare tests
-    healthcare_results = run_healthcare_tests()
-    
-    # Run finance tests
-    finance_results = run_finance_tests()
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', help="labelled corpus to evaluate instead of the built-in test cases")
+    parser.add_argument('--domain', choices=sorted(MODEL_CLASSES), help="domain of --corpus")
+    parser.add_argument('--workers', type=int, help="processes running the rule stages (default: CPU count)")
+    parser.add_argument('--cache', help="JSON file caching NER output between runs (default: kept in memory)")
+    parser.add_argument('--quiet', action='store_true', help="print only the summary of each domain")
+    parser.add_argument('--output', default='evaluation_results.json')
+    args = parser.parse_args()
+    
+    if args.corpus and not args.domain:
+        parser.error("--corpus needs --domain")
+    
+    cache = NerOutputCache(args.cache or None)
+    if args.corpus:
+        all_results = {args.domain: run_domain_tests(args.domain, load_corpus(args.corpus), cache,
+                                                     args.workers, args.quiet)}
+    else:
+        all_results = {}
+        for domain, cases in (('healthcare', HEALTHCARE_EXPECTED), ('finance', FINANCE_EXPECTED)):
+            if all_results:
+                print("\n")
+            all_results[domain] = run_domain_tests(domain, cases, cache, args.workers, args.quiet)
+    cache.save()
     
     # Save results
-    save_results(healthcare_results, finance_results)
\ No newline at end of file
+    save_results(all_results, args.output)
+
+if __name__ == "__main__":
+    main()
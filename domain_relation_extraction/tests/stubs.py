@@ -0,0 +1,33 @@
+"""
+Test doubles shared by the tests and the benchmark.
+"""
+import re
+import zlib
+
+
+class CapitalizedRunNER:
+    """
+    Deterministic NER stand-in tagging runs of capitalized words; needs no model download.
+
+    Each run gets an entity group derived from its text, so results are stable
+    across calls. The inputs of every call are recorded in calls.
+    """
+
+    groups = ['ORG', 'MISC', 'PER', 'LOC']
+    pattern = re.compile(r'\b[A-Z][A-Za-z]+(?: [A-Z][A-Za-z]+)*')
+
+    def __init__(self):
+        self.calls = []
+
+    def _tag(self, text):
+        return [{'entity_group': self.groups[zlib.crc32(m.group().encode()) % len(self.groups)],
+                 'word': m.group(), 'start': m.start(), 'end': m.end(), 'score': 0.99}
+                for m in self.pattern.finditer(text)]
+
+    def __call__(self, inputs, batch_size=None):
+        if isinstance(inputs, str):
+            self.calls.append(inputs)
+            return self._tag(inputs)
+        inputs = list(inputs)
+        self.calls.append(inputs)
+        return [self._tag(text) for text in inputs]
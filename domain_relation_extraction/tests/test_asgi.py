@@ -0,0 +1,109 @@
+"""
+Tests for the asyncio serving mode.
+"""
+import sys
+import os
+import asyncio
+import threading
+from urllib.parse import urlencode
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asgi
+
+
+async def call(server, method, path, form=None, body=None, content_type=b'application/x-www-form-urlencoded'):
+    """Send one HTTP request to the ASGI app and return (status, headers, body)."""
+    if body is None:
+        body = urlencode(form).encode() if form else b''
+    scope = {'type': 'http', 'method': method, 'path': path,
+             'headers': [(b'content-type', content_type)]}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await server(scope, receive, send)
+    return sent[0]['status'], dict(sent[0]['headers']), sent[1]['body']
+
+
+def blocking_extraction(release):
+    """Stand-in for app.run_extraction that waits until released."""
+    def run(domain, text, use_ner=True):
+        release.wait(5)
+        return [{'text': text, 'type': domain}], []
+    return run
+
+
+def test_extract_matches_flask_contract(monkeypatch):
+    release = threading.Event()
+    release.set()
+    monkeypatch.setattr(asgi.flask_app, 'run_extraction', blocking_extraction(release))
+    server = asgi.ExtractionServer(inference_threads=1, max_pending=4)
+
+    status, _, body = asyncio.run(call(server, 'POST', '/extract', {'text': 'x', 'domain': 'finance'}))
+    assert status == 200
+    assert body == b'{"entities": [{"text": "x", "type": "finance"}], "relations": []}'
+
+    status, _, body = asyncio.run(call(server, 'POST', '/extract', {'text': 'x', 'domain': 'legal'}))
+    assert status == 200
+    assert body == b'{"error": "Invalid domain selected"}'
+
+
+def test_malformed_form_is_rejected():
+    server = asgi.ExtractionServer(inference_threads=1, max_pending=4)
+    content_type = b'multipart/form-data; boundary=x'
+
+    truncated = b'--x\r\nContent-Disposition: form-data; name="text"\r\n\r\nabc'
+    status, _, body = asyncio.run(call(server, 'POST', '/extract', body=truncated, content_type=content_type))
+    assert (status, body) == (400, b'{"error": "Malformed form data"}')
+
+    many_fields = b'--x\r\nContent-Disposition: form-data; name="a"\r\n\r\nv\r\n' * 2000 + b'--x--\r\n'
+    status, _, _ = asyncio.run(call(server, 'POST', '/extract', body=many_fields, content_type=content_type))
+    assert status == 413
+
+
+def test_full_queue_is_rejected_with_retry_after(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(asgi.flask_app, 'run_extraction', blocking_extraction(release))
+    server = asgi.ExtractionServer(inference_threads=1, max_pending=2)
+
+    async def scenario():
+        form = {'text': 'x', 'domain': 'healthcare'}
+        running = [asyncio.ensure_future(call(server, 'POST', '/extract', form)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        rejected = await call(server, 'POST', '/extract', form)
+        release.set()
+        return rejected, await asyncio.gather(*running)
+
+    rejected, accepted = asyncio.run(scenario())
+    assert rejected[0] == 429
+    assert rejected[1][b'retry-after'] == b'1'
+    assert [status for status, _, _ in accepted] == [200, 200]
+
+
+def test_drain_waits_for_in_flight_requests(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(asgi.flask_app, 'run_extraction', blocking_extraction(release))
+    server = asgi.ExtractionServer(inference_threads=1, max_pending=4)
+
+    async def scenario():
+        form = {'text': 'x', 'domain': 'healthcare'}
+        in_flight = asyncio.ensure_future(call(server, 'POST', '/extract', form))
+        await asyncio.sleep(0.05)
+        drain = asyncio.ensure_future(server.drain(timeout=5))
+        await asyncio.sleep(0.05)
+        during = await call(server, 'POST', '/extract', form)
+        assert not drain.done()
+        release.set()
+        await drain
+        return during, await in_flight
+
+    during, finished = asyncio.run(scenario())
+    assert during[0] == 503
+    assert finished[0] == 200
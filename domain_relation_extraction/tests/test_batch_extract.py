@@ -0,0 +1,77 @@
+"""
+Tests for the streaming corpus extraction CLI helpers.
+"""
+import sys
+import os
+import tempfile
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batch_extract import _Completed, extract_corpus, load_checkpoint, save_checkpoint
+
+
+def fake_submit(calls):
+    def submit(domain, texts):
+        calls.append((domain, list(texts)))
+        return _Completed([([{'text': text, 'type': domain}], []) for text in texts])
+    return submit
+
+
+def test_extract_corpus_keeps_input_order_and_reports_errors():
+    records = [
+        {'id': 'a', 'text': 'first', 'domain': 'finance'},
+        {'id': 'b', 'text': 'second', 'domain': 'healthcare'},
+        {'id': 'c', 'text': 'third', 'domain': 'legal'},
+        'plain text',
+        {'id': 'e'},
+    ]
+    calls = []
+    batches = list(extract_corpus(iter(records), fake_submit(calls), batch_size=2, max_in_flight=1,
+                                  default_domain='finance'))
+
+    assert [finished for finished, _ in batches] == [2, 4, 5]
+    outputs = [output for _, batch in batches for output in batch]
+    assert [output['id'] for output in outputs] == ['a', 'b', 'c', 3, 4]
+    assert outputs[1]['domain'] == 'healthcare'
+    assert outputs[2]['error'] == 'Invalid domain selected'
+    assert outputs[3]['entities'] == [{'text': 'plain text', 'type': 'finance'}]
+    assert 'error' in outputs[4]
+    assert ('finance', ['first']) in calls and ('healthcare', ['second']) in calls
+
+
+def test_extract_corpus_numbers_resumed_records_from_start():
+    batches = list(extract_corpus(iter(['x', 'y']), fake_submit([]), batch_size=5, max_in_flight=0,
+                                  default_domain='finance', start=10))
+
+    assert batches[0][0] == 12
+    assert [output['id'] for output in batches[0][1]] == [10, 11]
+
+
+def test_checkpoint_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'results.jsonl.checkpoint')
+        assert load_checkpoint(path) is None
+        save_checkpoint(path, 64, 2048)
+        assert load_checkpoint(path) == {'records': 64, 'output_bytes': 2048}
+        assert os.listdir(directory) == ['results.jsonl.checkpoint']
+
+
+def test_second_run_is_served_from_the_cache(tmp_path, monkeypatch, capsys):
+    import batch_extract
+
+    corpus = tmp_path / 'notes.jsonl'
+    corpus.write_text('{"id": "a", "text": "Aspirin treats headache."}\n'
+                      '{"id": "b", "text": "Metformin treats diabetes."}\n')
+    outputs = []
+    for run in ('first.jsonl', 'second.jsonl'):
+        output = tmp_path / run
+        monkeypatch.setattr(sys, 'argv', ['batch_extract.py', str(corpus), '-o', str(output), '--domain', 'healthcare',
+                                          '--engine', 'rules', '--cache', str(tmp_path / 'cache.db')])
+        batch_extract.main()
+        outputs.append(output.read_text())
+
+    printed = capsys.readouterr().out
+    assert "Result cache: 0 hits, 2 misses" in printed
+    assert "Result cache: 2 hits, 0 misses" in printed
+    assert outputs[0] == outputs[1]
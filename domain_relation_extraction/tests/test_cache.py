@@ -0,0 +1,90 @@
+"""
+Tests for the extraction result cache.
+"""
+import sys
+import os
+import time
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.cache import ExtractionCache, make_cache_key, ruleset_fingerprint
+
+
+def test_lru_eviction_and_counters():
+    cache = ExtractionCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' becomes most recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 1, 1, 2)
+
+
+def test_entries_expire_after_ttl():
+    cache = ExtractionCache(max_size=10, ttl=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+
+
+def test_get_or_compute_runs_once():
+    cache = ExtractionCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return ([], [])
+
+    key = make_cache_key('healthcare', 'v1', 'Aspirin treats headache.')
+    cache.get_or_compute(key, compute)
+    cache.get_or_compute(key, compute)
+    assert len(calls) == 1
+
+
+def test_keys_change_with_ruleset():
+    old_version = ruleset_fingerprint({'MEDICATION': ['aspirin']})
+    new_version = ruleset_fingerprint({'MEDICATION': ['aspirin', 'metformin']})
+
+    assert old_version != new_version
+    assert make_cache_key('healthcare', old_version, 'text') != make_cache_key('healthcare', new_version, 'text')
+
+
+def test_disk_cache_round_trip_and_eviction(tmp_path):
+    from models.disk_cache import DiskExtractionCache
+
+    cache = DiskExtractionCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    result = ([{'text': 'Aspirin', 'type': 'MEDICATION', 'start': 0, 'end': 7}], [])
+    for text in ['one', 'two', 'three']:
+        cache.set(make_cache_key('healthcare', 'v1', text), result)
+        time.sleep(0.01)
+
+    # A second handle on the same file sees the stored results
+    other = DiskExtractionCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    assert other.get(make_cache_key('healthcare', 'v1', 'three')) == result
+
+    cache.evict()
+    assert cache.get(make_cache_key('healthcare', 'v1', 'one')) is None
+    assert cache.stats()['size'] == 2
+
+
+def test_disk_cache_hits_refresh_stale_access_times_only(tmp_path, monkeypatch):
+    from models import disk_cache
+
+    cache = disk_cache.DiskExtractionCache(str(tmp_path / 'cache.sqlite'))
+    key = make_cache_key('healthcare', 'v1', 'one')
+    cache.set(key, ([], []))
+    accessed = lambda: cache._connection().execute("SELECT accessed FROM results").fetchone()[0]
+    stored = accessed()
+
+    cache.get(key)
+    assert accessed() == stored
+
+    monkeypatch.setattr(disk_cache, 'ACCESS_REFRESH_INTERVAL', 0)
+    time.sleep(0.01)
+    cache.get(key)
+    assert accessed() > stored
@@ -0,0 +1,64 @@
+"""
+Tests for interned entity IDs and the compact result encoding.
+"""
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.entity_table import EntityTable, canonical_text
+
+ENTITIES = [
+    {'text': 'Metformin', 'type': 'MEDICATION', 'start': 0, 'end': 9},
+    {'text': 'diabetes', 'type': 'DISEASE', 'start': 17, 'end': 25},
+]
+RELATIONS = [{'source': 'Metformin', 'target': 'diabetes', 'type': 'treats'}]
+
+
+def test_ids_are_per_domain_type_and_normalized_text():
+    table = EntityTable()
+    first = table.intern('healthcare', 'MEDICATION', 'Metformin')
+
+    assert table.intern('healthcare', 'MEDICATION', ' METFORMIN ') == first
+    assert table.intern('healthcare', 'DISEASE', 'Metformin') != first
+    assert table.intern('finance', 'MEDICATION', 'Metformin') != first
+    assert table.entity(first) == {'id': first, 'domain': 'healthcare', 'type': 'MEDICATION', 'text': 'Metformin'}
+    assert canonical_text('Whole  Foods') == 'whole foods'
+
+
+def test_compact_results_define_each_entity_once():
+    table = EntityTable()
+    first = table.to_compact('healthcare', ENTITIES, RELATIONS)
+    second = table.to_compact('healthcare', [dict(ENTITIES[1], text='Diabetes', start=3, end=11)], [])
+
+    assert first['entity_table'] == [[0, 'healthcare', 'MEDICATION', 'Metformin'], [1, 'healthcare', 'DISEASE', 'diabetes']]
+    assert first['entities'] == [[0, 0, 9], [1, 17, 25]]
+    assert first['relations'] == [[0, 'treats', 1]]
+    assert second == {'entity_table': [], 'entities': [[1, 3, 11]], 'relations': []}
+
+
+def test_compact_stream_round_trip():
+    writer = EntityTable()
+    stream = [writer.to_compact('healthcare', ENTITIES, RELATIONS),
+              writer.to_compact('healthcare', ENTITIES[1:], [])]
+
+    reader = EntityTable()
+    entities, relations = reader.expand(stream[0])
+    assert entities == ENTITIES and relations == RELATIONS
+    assert reader.expand(stream[1]) == (ENTITIES[1:], [])
+    assert len(reader) == len(writer) == 2
+
+
+def test_restore_keeps_numbering():
+    table = EntityTable()
+    table.restore(0, 'finance', 'COMPANY', 'Amazon')
+
+    assert table.intern('finance', 'COMPANY', 'amazon') == 0
+    assert table.intern('finance', 'COMPANY', 'Apple') == 1
+    try:
+        table.restore(5, 'finance', 'COMPANY', 'Tesla')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for an out-of-order ID")
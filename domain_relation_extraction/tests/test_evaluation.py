@@ -0,0 +1,83 @@
+"""
+Tests for the cached evaluation engine and its scoring.
+"""
+import sys
+import os
+import tempfile
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.evaluation import NerOutputCache, ner_outputs, summarize
+from tests.expected_outputs import evaluate_prediction
+
+
+class CountingNER:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, inputs, batch_size=None):
+        self.calls += 1
+        return [[{'entity_group': 'ORG', 'word': text.split()[0], 'start': 0,
+                  'end': len(text.split()[0]), 'score': 0.9}] for text in inputs]
+
+
+class FakeModel:
+    domain = 'finance'
+    ner_checkpoint = 'fake-checkpoint'
+
+    def __init__(self):
+        self.ner_pipeline = CountingNER()
+
+
+def test_every_matching_pair_is_counted():
+    expected = {
+        "entities": [{"text": "Aspirin", "type": "MEDICATION"}, {"text": "fever", "type": "SYMPTOM"}],
+        "relations": [{"source": "Aspirin", "target": "fever", "type": "treats"}]
+    }
+    entities = [{"text": "aspirin", "type": "MEDICATION"}, {"text": "Aspirin", "type": "DISEASE"},
+                {"text": "cough", "type": "SYMPTOM"}]
+    relations = [{"source": "ASPIRIN", "target": "Fever", "type": "causes"}]
+
+    evaluation = evaluate_prediction(entities, relations, expected)
+
+    entity_metrics = evaluation["entity_metrics"]
+    assert entity_metrics["correctly_identified"] == 2
+    assert entity_metrics["correctly_typed"] == 1
+    assert entity_metrics["recall"] == 1.0
+    assert abs(entity_metrics["precision"] - 2 / 3) < 1e-9
+    relation_metrics = evaluation["relation_metrics"]
+    assert relation_metrics["correctly_identified"] == 1
+    assert relation_metrics["correctly_typed"] == 0
+    assert relation_metrics["type_accuracy"] == 0
+
+
+def test_ner_output_is_reused_from_the_cache_file():
+    texts = ["Apple launched iPhone.", "Amazon acquired Whole Foods.", "Apple launched iPhone."]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ner.json')
+        model = FakeModel()
+        cache = NerOutputCache(path)
+        first = ner_outputs(model, texts, cache)
+        cache.save()
+        assert model.ner_pipeline.calls == 1
+
+        model = FakeModel()
+        cache = NerOutputCache(path)
+        assert ner_outputs(model, texts, cache) == first
+        assert model.ner_pipeline.calls == 0
+        assert cache.hits == 3 and cache.misses == 0
+        assert first[0][0]['word'] == 'Apple' and first[1][0]['word'] == 'Amazon'
+
+
+def test_summarize_macro_and_micro():
+    expected = {"entities": [{"text": "a", "type": "X"}], "relations": []}
+    evaluations = [
+        evaluate_prediction([{"text": "a", "type": "X"}], [], expected),
+        evaluate_prediction([{"text": "b", "type": "X"}] * 3, [], expected),
+    ]
+
+    summary = summarize(evaluations)["entity_metrics"]
+    assert summary["macro"]["precision"] == 0.5
+    assert summary["micro"]["precision"] == 0.25
+    assert summary["micro"]["recall"] == 0.5
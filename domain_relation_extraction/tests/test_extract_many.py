@@ -0,0 +1,41 @@
+"""
+Tests that batched extraction returns the same results as extracting one document at a time.
+"""
+import sys
+import os
+import json
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.healthcare_model import HealthcareModel
+from models.finance_model import FinanceModel
+from tests.stubs import CapitalizedRunNER
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def sample_texts(domain):
+    with open(os.path.join(DATA_DIR, domain, 'samples.json')) as f:
+        return [sample['text'] for sample in json.load(f)['samples']]
+
+
+def assert_batched_matches_single(model_class, domain):
+    texts = sample_texts(domain)
+    # Repeated documents must come back identical too
+    texts = texts + texts[:5]
+
+    rules = model_class(use_ner=False)
+    assert rules.extract_many(texts, batch_size=3) == [rules.extract(text) for text in texts]
+
+    with_ner = model_class(use_ner=False)
+    with_ner.ner_pipeline = CapitalizedRunNER()
+    assert with_ner.extract_many(texts, batch_size=3) == [with_ner.extract(text) for text in texts]
+
+
+def test_healthcare_extract_many_matches_extract():
+    assert_batched_matches_single(HealthcareModel, 'healthcare')
+
+
+def test_finance_extract_many_matches_extract():
+    assert_batched_matches_single(FinanceModel, 'finance')
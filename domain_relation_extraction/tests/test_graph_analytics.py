@@ -0,0 +1,97 @@
+"""
+Tests for the sparse-matrix relation graph analytics.
+"""
+import sys
+import os
+
+import networkx as nx
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.relation_store import RelationStore
+from utils.graph_analytics import RelationGraph
+
+DOCUMENTS = [
+    ('note-1', [{'source': 'Metformin', 'target': 'diabetes', 'type': 'treats'},
+                {'source': 'diabetes', 'target': 'fatigue', 'type': 'causes'}]),
+    ('note-2', [{'source': 'metformin', 'target': 'Diabetes', 'type': 'treats'},
+                {'source': 'Metformin', 'target': 'nausea', 'type': 'causes'}]),
+    ('note-3', [{'source': 'Insulin', 'target': 'diabetes', 'type': 'treats'}]),
+]
+
+
+def test_matrices_per_relation_type():
+    graph = RelationGraph.from_documents(DOCUMENTS)
+
+    assert graph.relation_types == ['causes', 'treats']
+    assert len(graph) == 5
+    treats = graph.matrices['treats']
+    assert treats[graph.index['metformin'], graph.index['diabetes']] == 2
+
+
+def test_degree():
+    graph = RelationGraph.from_documents(DOCUMENTS)
+    diabetes = graph.index['diabetes']
+
+    assert graph.degree(direction='in')[diabetes] == 2
+    assert graph.degree(direction='in', weighted=True)[diabetes] == 3
+    assert graph.degree(relation_types=['causes'])[graph.index['metformin']] == 1
+    assert graph.top_entities(graph.degree(direction='both'), 1) == [('diabetes', 3.0)]
+
+
+def test_pagerank_matches_networkx():
+    graph = RelationGraph.from_documents(DOCUMENTS)
+    G = nx.DiGraph()
+    for _, relations in DOCUMENTS:
+        for relation in relations:
+            source, target = relation['source'].lower(), relation['target'].lower()
+            weight = G.edges[source, target]['weight'] + 1 if G.has_edge(source, target) else 1
+            G.add_edge(source, target, weight=weight)
+
+    expected = nx.pagerank(G, weight='weight', tol=1e-10)
+    ranks = graph.pagerank(tol=1e-10)
+    for entity, rank in expected.items():
+        assert abs(ranks[graph.index[entity]] - rank) < 1e-6
+
+
+def test_k_hop():
+    graph = RelationGraph.from_documents(DOCUMENTS)
+
+    assert graph.k_hop('Metformin', 1) == {'Metformin': 0, 'diabetes': 1, 'nausea': 1}
+    assert graph.k_hop('Metformin', 2)['fatigue'] == 2
+    assert graph.k_hop('fatigue', 2, direction='in') == {'fatigue': 0, 'diabetes': 1, 'Metformin': 2, 'Insulin': 2}
+    assert graph.k_hop('Metformin', 2, relation_types=['treats']) == {'Metformin': 0, 'diabetes': 1}
+
+
+def test_cooccurrence_from_store():
+    store = RelationStore()
+    store.ingest((key, 'healthcare', relations) for key, relations in DOCUMENTS)
+    graph = RelationGraph.from_store(store)
+
+    assert graph.cooccurrence('diabetes', top=2) == [('Metformin', 2.0), ('fatigue', 1.0)]
+    matrix = graph.cooccurrence()
+    assert matrix[graph.index['insulin'], graph.index['diabetes']] == 1
+
+    graph = RelationGraph.from_triples(triple[:4] for triple in store.triples())
+    try:
+        graph.cooccurrence('diabetes')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError without document provenance")
+
+
+def test_networkx_export_of_a_neighborhood():
+    graph = RelationGraph.from_documents(DOCUMENTS)
+    G = graph.to_networkx(graph.k_hop('Metformin', 1))
+
+    assert set(G) == {'Metformin', 'diabetes', 'nausea'}
+    assert G.edges['Metformin', 'diabetes']['weight'] == 2
+    assert G.nodes['diabetes']['count'] == 3
+    try:
+        graph.to_networkx(max_nodes=2)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for an oversized export")
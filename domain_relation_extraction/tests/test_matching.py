@@ -0,0 +1,101 @@
+"""
+Tests for keyword matching and span resolution used during entity extraction.
+"""
+import re
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.matcher import KeywordMatcher
+from models.spans import group_by_sentence, keep_higher_priority, keep_longer, resolve_overlaps, sentence_spans
+
+
+def naive_find(keywords_by_type, text_lower):
+    """Reference implementation: one regex scan per keyword."""
+    hits = []
+    for entity_type, keywords in keywords_by_type.items():
+        for keyword in keywords:
+            for match in re.finditer(r'\b' + re.escape(keyword) + r'\b', text_lower):
+                hits.append((match.start(), match.end(), entity_type))
+    return hits
+
+
+def test_matches_per_keyword_scan():
+    keywords = {
+        'METRIC': ['earnings', 'loss', 'p/e ratio', 'stock price'],
+        'EVENT': ['earnings report', 'investment', 'stock split'],
+        'PRODUCT': ['investment', 'model s', 'model 3'],
+    }
+    text = ("earnings report showed a loss; the p/e ratio and stock price fell "
+            "before the stock split. model s investment, losses, model 3.")
+
+    assert KeywordMatcher(keywords).find(text) == naive_find(keywords, text)
+
+
+def test_nested_keywords_share_start():
+    matcher = KeywordMatcher({'DISEASE': ['heart'], 'EVENT': ['heart attack']})
+
+    assert matcher.find('a heart attack') == [(2, 7, 'DISEASE'), (2, 14, 'EVENT')]
+
+
+def test_word_boundaries_respected():
+    matcher = KeywordMatcher({'SYMPTOM': ['pain']})
+
+    assert matcher.find('painful pain in spain') == [(8, 12, 'SYMPTOM')]
+
+
+def test_contains_ignores_word_boundaries():
+    matcher = KeywordMatcher({'COMPANY': ['apple', 'bank of america']})
+
+    assert matcher.contains('apple inc')
+    assert matcher.contains('pineapples')
+    assert not matcher.contains('goldman sachs')
+
+
+def span(text, entity_type, start):
+    return {'text': text, 'type': entity_type, 'start': start, 'end': start + len(text)}
+
+
+def test_resolve_overlaps_keeps_longer_span():
+    entities = [
+        span('earnings', 'METRIC', 0),
+        span('earnings report', 'EVENT', 0),
+        span('report', 'EVENT', 9),
+        span('revenue', 'METRIC', 20),
+    ]
+
+    resolved = resolve_overlaps(entities, keep_longer)
+    assert [e['text'] for e in resolved] == ['earnings report', 'revenue']
+
+
+def test_resolve_overlaps_keeps_higher_priority():
+    policy = keep_higher_priority({'MEDICATION': 3, 'DISEASE': 2, 'SYMPTOM': 1, 'PROCEDURE': 0})
+    entities = [
+        span('headache', 'SYMPTOM', 0),
+        span('headache', 'DISEASE', 0),
+        span('physical therapy', 'PROCEDURE', 20),
+        span('therapy', 'PROCEDURE', 29),
+    ]
+
+    resolved = resolve_overlaps(entities, policy)
+    assert [(e['text'], e['type']) for e in resolved] == [('headache', 'DISEASE'), ('physical therapy', 'PROCEDURE')]
+
+
+def test_group_by_sentence_uses_mention_positions():
+    text = "Patients with hypertension feel pain. Lisinopril treats hypertension. Painful joints."
+    sentences = ["Patients with hypertension feel pain.", "Lisinopril treats hypertension.", "Painful joints."]
+    entities = [
+        span('hypertension', 'DISEASE', 14),
+        span('pain', 'SYMPTOM', 32),
+        span('Lisinopril', 'MEDICATION', 38),
+    ]
+
+    groups = group_by_sentence(text, sentence_spans(text, sentences), entities)
+    # The later mention of hypertension is not attached to the second sentence
+    assert [[e['text'] for e in group] for group in groups] == [
+        ['hypertension', 'pain'],
+        ['Lisinopril'],
+        [],
+    ]
@@ -0,0 +1,96 @@
+"""
+Tests for the metrics and tracing instrumentation.
+"""
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.metrics import Metrics
+
+
+class FakeModel:
+    domain = 'test'
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def work(self, value):
+        with self.metrics.stage('inner', self.domain):
+            return value * 2
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    counter = metrics.counter('requests_total', 'Requests', ('status',))
+    counter.inc(status=200)
+    with metrics.stage('ner', 'finance'):
+        pass
+
+    assert counter.value(status=200) == 0
+    assert metrics.stage_seconds.snapshot(stage='ner', domain='finance') is None
+    assert metrics.span('extract') is metrics.stage('ner')
+
+
+def test_counter_and_histogram_render_in_prometheus_format():
+    metrics = Metrics(enabled=True)
+    counter = metrics.counter('requests_total', 'Requests', ('endpoint', 'status'))
+    counter.inc(endpoint='extract', status=200)
+    counter.inc(endpoint='extract', status=200)
+    histogram = metrics.histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, endpoint='extract')
+    histogram.observe(0.5, endpoint='extract')
+    histogram.observe(5, endpoint='extract')
+
+    lines = metrics.render().splitlines()
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{endpoint="extract",status="200"} 2' in lines
+    assert '# TYPE latency_seconds histogram' in lines
+    assert 'latency_seconds_bucket{endpoint="extract",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="extract",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="extract",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{endpoint="extract"} 5.55' in lines
+    assert 'latency_seconds_count{endpoint="extract"} 3' in lines
+
+
+def test_stage_timer_and_decorator_label_the_domain():
+    metrics = Metrics(enabled=True)
+    decorated = metrics.timed('outer')(FakeModel.work)
+
+    assert decorated(FakeModel(metrics), 21) == 42
+    assert metrics.stage_seconds.snapshot(stage='outer', domain='test')['count'] == 1
+    assert metrics.stage_seconds.snapshot(stage='inner', domain='test')['count'] == 1
+
+
+def test_stage_errors_are_counted():
+    metrics = Metrics(enabled=True)
+    try:
+        with metrics.stage('relations', 'healthcare'):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert metrics.stage_errors.value(stage='relations', domain='healthcare') == 1
+
+
+def test_spans_nest_into_one_trace():
+    metrics = Metrics(tracing=True)
+    with metrics.span('extract', domain='finance'):
+        with metrics.stage('ner', 'finance'):
+            pass
+        with metrics.stage('relations', 'finance'):
+            with metrics.stage('sentence_split', 'finance'):
+                pass
+
+    traces = metrics.traces()
+    assert len(traces) == 1
+    root = traces[0]
+    assert root['name'] == 'extract' and root['attributes'] == {'domain': 'finance'}
+    assert [child['name'] for child in root['children']] == ['ner', 'relations']
+    assert root['children'][1]['children'][0]['name'] == 'sentence_split'
+
+
+def test_collectors_are_rendered():
+    metrics = Metrics()
+    metrics.add_collector(lambda: ['# TYPE queue_depth gauge', 'queue_depth 3'])
+    assert 'queue_depth 3' in metrics.render().splitlines()
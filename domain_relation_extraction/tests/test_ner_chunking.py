@@ -0,0 +1,54 @@
+"""
+Tests for sentence-window chunking of long documents before NER.
+"""
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.ner import chunk_document, run_ner
+from tests.stubs import CapitalizedRunNER
+
+
+def long_document(sentences=40):
+    return ' '.join(f"Company{i % 7} reported revenue for quarter number {i}." for i in range(sentences))
+
+
+def test_short_documents_are_sent_whole():
+    ner = CapitalizedRunNER()
+    results = run_ner(ner, ["Apple bought Beats.", "Nothing here."])
+
+    assert ner.calls == [["Nothing here.", "Apple bought Beats."]]
+    assert [e['word'] for e in results[0]] == ['Apple', 'Beats']
+    assert [(e['word'], e['start'], e['end']) for e in results[1]] == [('Nothing', 0, 7)]
+
+
+def test_windows_fit_and_overlap_by_a_sentence():
+    text = long_document()
+    windows = chunk_document(CapitalizedRunNER(), text, max_tokens=30, overlap=1)
+
+    assert len(windows) > 1
+    assert windows[0][0] == 0 and windows[-1][1] == len(text)
+    for (start, end), (next_start, _) in zip(windows, windows[1:]):
+        assert len(text[start:end].split()) <= 30
+        assert next_start < end
+
+
+def test_long_document_offsets_map_back_without_duplicates():
+    text = long_document()
+    ner = CapitalizedRunNER()
+    entities = run_ner(ner, [text], max_tokens=30)[0]
+
+    assert len(ner.calls) == 1 and len(ner.calls[0]) > 1
+    expected = [(m.start(), m.end()) for m in CapitalizedRunNER.pattern.finditer(text)]
+    assert [(e['start'], e['end']) for e in entities] == expected
+    assert all(text[e['start']:e['end']] == e['word'] for e in entities)
+
+
+def test_oversized_sentence_is_split_on_whitespace():
+    text = ' '.join(['Word'] * 100) + '.'
+    windows = chunk_document(CapitalizedRunNER(), text, max_tokens=30)
+
+    assert all(len(text[start:end].split()) <= 30 for start, end in windows)
+    assert windows[-1][1] == len(text)
@@ -0,0 +1,55 @@
+"""
+Tests for the shared NER pipeline registry.
+"""
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.registry import ModelRegistry
+
+
+class CountingRegistry(ModelRegistry):
+    """Registry that records loads instead of downloading checkpoints."""
+
+    def __init__(self):
+        super().__init__()
+        self.loads = []
+
+    def _load(self, checkpoint):
+        self.loads.append(checkpoint)
+        return object()
+
+
+def test_checkpoint_loaded_once_and_shared():
+    registry = CountingRegistry()
+    first = registry.acquire("dslim/bert-base-NER")
+    second = registry.acquire("dslim/bert-base-NER")
+
+    assert first is second
+    assert registry.loads == ["dslim/bert-base-NER"]
+    assert registry.refcount("dslim/bert-base-NER") == 2
+
+
+def test_checkpoint_unloaded_after_last_release():
+    registry = CountingRegistry()
+    registry.acquire("dslim/bert-base-NER")
+    registry.acquire("dslim/bert-base-NER")
+
+    registry.release("dslim/bert-base-NER")
+    assert registry.loaded() == ["dslim/bert-base-NER"]
+
+    registry.release("dslim/bert-base-NER")
+    assert registry.loaded() == []
+    assert registry.refcount("dslim/bert-base-NER") == 0
+
+
+def test_unknown_backend_rejected():
+    try:
+        ModelRegistry(backend="tensorrt")
+    except ValueError as e:
+        assert "tensorrt" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+    assert ModelRegistry(backend="onnx").timings()['backend'] == "onnx"
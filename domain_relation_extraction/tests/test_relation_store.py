@@ -0,0 +1,96 @@
+"""
+Tests for the corpus-level relation store.
+"""
+import sys
+import os
+import tempfile
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.relation_store import RelationStore
+
+DOCUMENTS = [
+    ('note-1', 'healthcare', [{'source': 'Metformin', 'target': 'diabetes', 'type': 'treats'},
+                              {'source': 'diabetes', 'target': 'fatigue', 'type': 'causes'}]),
+    ('note-2', 'healthcare', [{'source': 'metformin', 'target': 'Diabetes', 'type': 'treats'},
+                              {'source': 'Metformin', 'target': 'nausea', 'type': 'causes'}]),
+    ('deal-1', 'finance', [{'source': 'Amazon', 'target': 'Whole Foods', 'type': 'acquired'}]),
+]
+
+
+def test_relations_are_aggregated_across_documents():
+    store = RelationStore()
+    assert store.ingest(DOCUMENTS) == 3
+
+    treats = store.query(entity='METFORMIN', relation_type='treats', role='source')
+    assert len(treats) == 1
+    assert treats[0]['source'] == 'Metformin' and treats[0]['target'] == 'diabetes'
+    assert treats[0]['count'] == 2 and treats[0]['documents'] == 2
+    assert store.provenance('metformin', 'treats', 'diabetes') == ['note-1', 'note-2']
+
+
+def test_entity_role_and_domain_filters():
+    store = RelationStore()
+    store.ingest(DOCUMENTS)
+
+    assert len(store.query(entity='diabetes')) == 2
+    assert [r['type'] for r in store.query(entity='diabetes', role='target')] == ['treats']
+    assert store.query(domain='finance')[0]['target'] == 'Whole Foods'
+    assert store.query(relation_type='acquired', domain='healthcare') == []
+    assert len(store.query(limit=2)) == 2
+
+
+def test_documents_are_ingested_once():
+    store = RelationStore()
+    store.ingest(DOCUMENTS)
+
+    assert store.add_document('note-1', 'healthcare', DOCUMENTS[0][2]) is False
+    assert store.query(entity='metformin', relation_type='treats')[0]['count'] == 2
+    assert store.stats()['documents'] == 3
+
+
+def test_same_document_in_two_domains():
+    store = RelationStore()
+    assert store.add_document('h1', 'healthcare', [{'source': 'Metformin', 'target': 'diabetes', 'type': 'treats'}])
+    assert store.add_document('h1', 'finance', [{'source': 'Amazon', 'target': 'Whole Foods', 'type': 'acquired'}])
+    assert store.add_document('h1', 'finance', []) is False
+
+    assert store.query(domain='finance')[0]['source'] == 'Amazon'
+    assert store.query(domain='healthcare')[0]['source'] == 'Metformin'
+    assert store.stats()['documents'] == 2
+
+
+def test_store_is_persisted():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'relations.db')
+        store = RelationStore(path)
+        store.ingest(DOCUMENTS[:2])
+        store.close()
+
+        store = RelationStore(path)
+        store.ingest(DOCUMENTS[2:])
+        assert store.query(entity='metformin', relation_type='treats')[0]['count'] == 2
+        assert store.provenance('Amazon', 'acquired', 'Whole Foods') == ['deal-1']
+        assert store.stats()['relations'] == 4
+        store.close()
+
+
+def test_two_stores_share_one_file():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'relations.db')
+        first, second = RelationStore(path), RelationStore(path)
+        assert first.ingest(DOCUMENTS[:1]) == 1
+
+        # The other process skips the stored document and merges the shared triple
+        assert second.add_document('note-1', 'healthcare', DOCUMENTS[0][2]) is False
+        assert second.ingest(DOCUMENTS[1:2]) == 1
+        first.close()
+        second.close()
+
+        store = RelationStore(path)
+        assert store.query(entity='metformin', relation_type='treats')[0]['count'] == 2
+        assert store.provenance('metformin', 'treats', 'diabetes') == ['note-1', 'note-2']
+        assert store.stats()['documents'] == 2
+        store.close()
+
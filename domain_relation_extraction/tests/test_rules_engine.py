@@ -0,0 +1,44 @@
+"""
+Tests for the rules-only extraction engine (no transformer model loaded).
+"""
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.healthcare_model import HealthcareModel
+from models.finance_model import FinanceModel
+
+
+def test_healthcare_rules_only():
+    model = HealthcareModel(use_ner=False)
+    entities, relations = model.extract("Aspirin treats headache and reduces inflammation.")
+
+    assert model.ner_pipeline is None
+    assert {"text": "Aspirin", "type": "MEDICATION", "start": 0, "end": 7} in entities
+    assert {"source": "Aspirin", "target": "headache", "type": "treats"} in relations
+
+
+def test_finance_rules_only():
+    model = FinanceModel(use_ner=False)
+    entities, _ = model.extract("The acquisition increased market share.")
+
+    assert [(e["text"], e["type"]) for e in entities] == [("acquisition", "EVENT"), ("market share", "METRIC")]
+
+
+def test_finance_rules_only_matches_companies_and_products():
+    model = FinanceModel(use_ner=False)
+    entities, relations = model.extract("Microsoft launched Azure last year. Later, Amazon acquired Whole Foods.")
+
+    assert {"text": "Microsoft", "type": "COMPANY", "start": 0, "end": 9} in entities
+    assert {"text": "Azure", "type": "PRODUCT", "start": 19, "end": 24} in entities
+    assert {"source": "Microsoft", "target": "Azure", "type": "launched"} in relations
+    assert {"source": "Amazon", "target": "Whole Foods", "type": "acquired"} in relations
+
+
+def test_rules_only_results_cached_separately():
+    model = HealthcareModel(use_ner=False)
+
+    assert model.cache_version(use_ner=True) == model.cache_version(use_ner=False)
+    assert model.cache_version().endswith(':rules')
@@ -0,0 +1,115 @@
+"""
+Tests for the micro-batching request scheduler.
+"""
+import sys
+import os
+import threading
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.scheduler import MicroBatchScheduler
+
+
+class RecordingModel:
+    """Model stand-in that records the batches it receives."""
+
+    domain = 'test'
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def extract_many(self, texts, batch_size=16, use_ner=True):
+        self.batches.append((list(texts), use_ner))
+        if self.fail:
+            raise RuntimeError("model failure")
+        return [([text.upper()], [use_ner]) for text in texts]
+
+
+def test_concurrent_requests_share_a_batch():
+    model = RecordingModel()
+    scheduler = MicroBatchScheduler(model, max_batch_size=8, max_wait_ms=200)
+    futures = [scheduler.submit(f"doc {i}") for i in range(5)]
+
+    results = [future.result(timeout=5) for future in futures]
+    scheduler.close()
+
+    assert results == [([f"DOC {i}"], [True]) for i in range(5)]
+    assert model.batches == [([f"doc {i}" for i in range(5)], True)]
+
+
+def test_batches_respect_max_size():
+    model = RecordingModel()
+    scheduler = MicroBatchScheduler(model, max_batch_size=2, max_wait_ms=200)
+    futures = [scheduler.submit(f"doc {i}") for i in range(5)]
+    for future in futures:
+        future.result(timeout=5)
+    scheduler.close()
+
+    assert [len(texts) for texts, _ in model.batches] == [2, 2, 1]
+    stats = scheduler.stats()
+    assert stats['batch_size']['count'] == 3
+    assert stats['batch_size']['buckets']['2'] == 3
+    assert stats['wait_ms']['count'] == 5
+    assert stats['queue_depth'] == 0
+
+
+def test_engines_are_batched_separately():
+    model = RecordingModel()
+    scheduler = MicroBatchScheduler(model, max_batch_size=8, max_wait_ms=200)
+    full = scheduler.submit("a")
+    rules = scheduler.submit("b", use_ner=False)
+
+    assert full.result(timeout=5) == (["A"], [True])
+    assert rules.result(timeout=5) == (["B"], [False])
+    scheduler.close()
+    assert sorted(model.batches, key=lambda batch: batch[1]) == [(["b"], False), (["a"], True)]
+
+
+def test_errors_reach_every_waiting_request():
+    scheduler = MicroBatchScheduler(RecordingModel(fail=True), max_batch_size=4, max_wait_ms=50)
+    futures = [scheduler.submit("x"), scheduler.submit("y")]
+    scheduler.close()
+
+    for future in futures:
+        try:
+            future.result(timeout=5)
+        except RuntimeError as e:
+            assert str(e) == "model failure"
+        else:
+            raise AssertionError("expected the model error")
+
+
+def test_extract_from_many_threads():
+    model = RecordingModel()
+    scheduler = MicroBatchScheduler(model, max_batch_size=16, max_wait_ms=20)
+    results = {}
+
+    def worker(i):
+        results[i] = scheduler.extract(f"t{i}", timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    scheduler.close()
+
+    assert results == {i: ([f"T{i}"], [True]) for i in range(20)}
+    assert sum(len(texts) for texts, _ in model.batches) == 20
+    assert len(model.batches) < 20
+
+
+def test_submit_after_close_raises():
+    scheduler = MicroBatchScheduler(RecordingModel(), max_batch_size=4, max_wait_ms=1)
+    assert scheduler.extract("a", timeout=5) == (["A"], [True])
+    scheduler.close()
+    scheduler.close()
+
+    try:
+        scheduler.submit("b")
+    except RuntimeError as e:
+        assert str(e) == "Scheduler is closed"
+    else:
+        assert False, "submit after close should raise"
@@ -0,0 +1,56 @@
+"""
+Tests for the incremental JSON/NDJSON readers used by batch processing.
+"""
+import io
+import json
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.streaming import iter_batches, iter_json_array, iter_ndjson
+
+RECORDS = [
+    {"id": "health-1", "text": "Aspirin treats headache.", "domain": "healthcare"},
+    {"id": "fin-1", "text": "Apple launched iPhone — “quoted” text, with ] and ,", "domain": "finance"},
+]
+
+
+def test_json_array_parsed_across_small_chunks():
+    data = json.dumps(RECORDS, ensure_ascii=False, indent=2).encode('utf-8')
+
+    assert list(iter_json_array(io.BytesIO(data), chunk_size=3)) == RECORDS
+
+
+def test_json_array_rejects_other_values():
+    try:
+        list(iter_json_array(io.BytesIO(b'{"samples": []}')))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for a non-array document")
+
+
+def test_json_array_read_from_object_key():
+    data = json.dumps({"domain": "finance", "samples": RECORDS, "notes": [1, {"a": []}]}).encode('utf-8')
+
+    assert list(iter_json_array(io.BytesIO(data), chunk_size=5, key='samples')) == RECORDS
+
+
+def test_numbers_split_across_chunks_are_not_truncated():
+    values = [-25000000000.0, 1e-7, 123456789, 0.5]
+    data = json.dumps(values).encode('utf-8')
+
+    for chunk_size in range(1, 8):
+        assert list(iter_json_array(io.BytesIO(data), chunk_size=chunk_size)) == values
+
+
+def test_ndjson_skips_blank_lines():
+    data = ("\n".join(json.dumps(record) for record in RECORDS) + "\n\n").encode('utf-8')
+
+    assert list(iter_ndjson(io.BytesIO(data))) == RECORDS
+
+
+def test_iter_batches():
+    assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,145 @@
+"""
+Tests for the cached, thread-pooled graph renderer.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.disk_cache import DiskExtractionCache
+from utils import visualization
+from utils.visualization import (GraphRenderer, build_graph, build_weighted_graph, create_interactive_graph,
+                                 create_relation_graph, graph_key, graph_to_json, level_of_detail, lookup_graph,
+                                 neighborhood, register_graph)
+
+ENTITIES = [
+    {'text': 'Aspirin', 'type': 'MEDICATION', 'start': 0, 'end': 7},
+    {'text': 'headache', 'type': 'SYMPTOM', 'start': 15, 'end': 23}
+]
+RELATIONS = [{'source': 'Aspirin', 'target': 'headache', 'type': 'treats'}]
+
+
+def test_build_graph():
+    G = build_graph(ENTITIES, RELATIONS)
+    assert G.nodes['Aspirin']['type'] == 'MEDICATION'
+    assert G.edges['Aspirin', 'headache']['label'] == 'treats'
+
+
+def test_key_ignores_offsets():
+    moved = [dict(entity, start=entity['start'] + 10, end=entity['end'] + 10) for entity in ENTITIES]
+    assert graph_key(ENTITIES, RELATIONS) == graph_key(moved, RELATIONS)
+    assert graph_key(ENTITIES, RELATIONS) != graph_key(ENTITIES, RELATIONS, 'svg')
+
+
+def test_repeat_renders_come_from_the_cache():
+    renderer = GraphRenderer(max_workers=2, cache_size=4)
+    try:
+        png = renderer.render(ENTITIES, RELATIONS)
+        assert png.startswith(b'\x89PNG')
+        assert renderer.render(ENTITIES, RELATIONS) is png
+        assert renderer.stats()['hits'] == 1
+
+        svg = renderer.render(ENTITIES, RELATIONS, 'svg')
+        assert b'<svg' in svg
+    finally:
+        renderer.close()
+
+
+def test_concurrent_renders():
+    renderer = GraphRenderer(max_workers=3, cache_size=16)
+    graphs = [([{'text': f'Drug{i}', 'type': 'MEDICATION'}, {'text': 'pain', 'type': 'SYMPTOM'}],
+               [{'source': f'Drug{i}', 'target': 'pain', 'type': 'treats'}]) for i in range(6)]
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            images = list(pool.map(lambda graph: renderer.render(*graph), graphs * 3))
+        assert all(image.startswith(b'\x89PNG') for image in images)
+        assert images[:6] == images[6:12] == images[12:]
+        assert renderer.stats()['size'] == 6
+    finally:
+        renderer.close()
+
+
+def test_unknown_format_rejected():
+    renderer = GraphRenderer(max_workers=1)
+    try:
+        renderer.submit(ENTITIES, RELATIONS, 'gif')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for an unsupported format")
+    finally:
+        renderer.close()
+
+
+def star_corpus():
+    """One hub linked to many drugs, a repeated relation and a tail of rare pairs."""
+    entities = [{'text': 'pain', 'type': 'SYMPTOM'}]
+    relations = []
+    for i in range(30):
+        entities.append({'text': f'Drug{i}', 'type': 'MEDICATION'})
+        relations.append({'source': f'Drug{i}', 'target': 'pain', 'type': 'treats'})
+    relations += [{'source': 'Drug0', 'target': 'pain', 'type': 'treats'}] * 4
+    relations += [{'source': f'Drug{i}', 'target': f'Rare{i}', 'type': 'causes'} for i in range(10)]
+    return entities, relations
+
+
+def test_weighted_graph_merges_repeated_relations():
+    G = build_weighted_graph(*star_corpus())
+    assert G.edges['Drug0', 'pain']['weight'] == 5
+    assert G.nodes['Rare3']['type'] is None
+    assert G.number_of_nodes() == 41
+
+
+def test_level_of_detail_prunes_nodes_and_light_edges():
+    G = build_weighted_graph(*star_corpus())
+    H = level_of_detail(G, max_nodes=5, min_edge_weight=2)
+
+    assert H.number_of_nodes() == 5
+    assert 'pain' in H and 'Drug0' in H
+    assert list(H.edges) == [('Drug0', 'pain')]
+    assert H.nodes['pain']['hidden'] == 29
+    assert level_of_detail(G, max_nodes=None).number_of_nodes() == 41
+
+
+def test_neighborhood_is_bounded():
+    G = build_weighted_graph(*star_corpus())
+    H = neighborhood(G, 'Drug1', depth=2, max_nodes=6)
+
+    assert H.number_of_nodes() == 6
+    assert {'Drug1', 'pain', 'Rare1'} <= set(H)
+    # The heaviest link out of pain is followed first
+    assert 'Drug0' in H
+    view = graph_to_json(H)
+    assert {edge['from'] for edge in view['edges']} <= set(H)
+
+
+def test_interactive_graph_size_is_bounded():
+    entities, relations = star_corpus()
+    full = create_interactive_graph(entities, relations)
+    pruned = create_interactive_graph(entities, relations, max_nodes=5)
+    assert 'Drug29' in full and 'Drug29' not in pruned
+    assert 'more connections' in pruned
+
+
+def test_registered_graphs_are_shared_between_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(visualization, 'shared_graph_store', DiskExtractionCache(str(tmp_path / 'graphs.sqlite')))
+    graph_id, G = register_graph(*star_corpus())
+
+    # Another process starts with an empty in-memory store
+    visualization.graph_store.clear()
+    rebuilt = lookup_graph(graph_id)
+    assert sorted(rebuilt.edges(data='weight')) == sorted(G.edges(data='weight'))
+    assert lookup_graph('unknown') is None
+
+
+def test_relation_graph_is_built_once(tmp_path, monkeypatch):
+    builds = []
+    monkeypatch.setattr(visualization, 'build_graph', lambda *graph: builds.append(graph) or build_graph(*graph))
+    monkeypatch.setattr(visualization, 'renderer', GraphRenderer(max_workers=1))
+
+    G = create_relation_graph(ENTITIES, RELATIONS, str(tmp_path / 'graph.svg'))
+    assert len(builds) == 1 and G.has_edge('Aspirin', 'headache')
+    assert (tmp_path / 'graph.svg').read_bytes().lstrip().startswith(b'<?xml')
+
@@ -0,0 +1,50 @@
+"""
+Tests for the forked inference worker pool.
+"""
+import sys
+import os
+import threading
+import types
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.workers import WorkerPool, _init_worker, default_torch_threads
+
+
+class ProcessReportingModel:
+    """Model stand-in that cannot be pickled and reports the process it ran in."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def extract_many(self, texts, batch_size=16, use_ner=True):
+        return [([text], [os.getpid(), use_ner]) for text in texts]
+
+
+def test_workers_share_the_parent_model():
+    pool = WorkerPool({'test': ProcessReportingModel()}, processes=2, torch_threads=1)
+    try:
+        entities, (pid, use_ner) = pool.extract('test', 'one document')
+        results = pool.extract_many('test', [f"doc {i}" for i in range(10)], batch_size=3, use_ner=False)
+    finally:
+        pool.close()
+
+    assert entities == ['one document']
+    assert pid != os.getpid() and use_ner is True
+    assert [entities for entities, _ in results] == [[f"doc {i}"] for i in range(10)]
+    assert all(pid != os.getpid() and use_ner is False for _, (pid, use_ner) in results)
+
+
+def test_default_torch_threads_splits_cores():
+    cores = os.cpu_count() or 1
+    assert default_torch_threads(1) == cores
+    assert default_torch_threads(cores * 2) == 1
+
+
+def test_worker_initializer_limits_torch_threads(monkeypatch):
+    calls = []
+    monkeypatch.setitem(sys.modules, 'torch', types.SimpleNamespace(set_num_threads=calls.append))
+    _init_worker(3)
+    _init_worker(None)
+    assert calls == [3]
@@ -0,0 +1,312 @@
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+from models.relation_store import entity_key
+
+# Largest subgraph exported to NetworkX; bigger graphs stay in sparse form
+MAX_EXPORT_NODES = 5000
+
+DIRECTIONS = ('out', 'in', 'both')
+
+class RelationGraph:
+    """Aggregated entity/relation graph held as one sparse adjacency matrix per relation type."""
+
+    def __init__(self, entities, matrices, mentions=None):
+        """
+        Initialize the graph.
+
+        Args:
+            entities (list): Entity names; position i is row and column i of every matrix
+            matrices (dict): Relation type mapped to an n x n scipy CSR matrix of relation counts
+            mentions (scipy.sparse.csr_matrix, optional): Entity x document incidence matrix
+        """
+        self.entities = list(entities)
+        self.index = {entity_key(entity): i for i, entity in enumerate(self.entities)}
+        self.matrices = matrices
+        self.mentions = mentions
+
+    @classmethod
+    def from_triples(cls, triples):
+        """
+        Build the graph from aggregated relations.
+
+        Args:
+            triples (iterable): (source, type, target, count) or
+                (source, type, target, count, document ids) tuples, as returned by RelationStore.triples
+
+        Returns:
+            RelationGraph
+        """
+        entities = []
+        index = {}
+        edges = {}
+        mention_rows = []
+        mention_documents = []
+        documents = {}
+
+        def node(name):
+            key = entity_key(name)
+            position = index.get(key)
+            if position is None:
+                position = index[key] = len(entities)
+                entities.append(name)
+            return position
+
+        for triple in triples:
+            source, relation_type, target, count = triple[:4]
+            rows, cols, counts = edges.setdefault(relation_type, ([], [], []))
+            source_index, target_index = node(source), node(target)
+            rows.append(source_index)
+            cols.append(target_index)
+            counts.append(count)
+            # Both ends of a relation are mentioned in each of its documents
+            for document in (triple[4] if len(triple) > 4 else ()):
+                column = documents.setdefault(document, len(documents))
+                mention_rows.extend((source_index, target_index))
+                mention_documents.extend((column, column))
+
+        size = len(entities)
+        matrices = {}
+        for relation_type, (rows, cols, counts) in edges.items():
+            # Duplicate (row, column) pairs are summed by the conversion
+            matrices[relation_type] = sparse.coo_matrix(
+                (np.asarray(counts, dtype=np.float64), (rows, cols)), shape=(size, size)).tocsr()
+
+        mentions = None
+        if documents:
+            mentions = sparse.coo_matrix(
+                (np.ones(len(mention_rows)), (mention_rows, mention_documents)), shape=(size, len(documents))).tocsr()
+            # An entity is in a document once, however many of its relations came from it
+            mentions.data[:] = 1
+        return cls(entities, matrices, mentions)
+
+    @classmethod
+    def from_store(cls, store, domain=None):
+        """Build the graph from everything in a RelationStore."""
+        return cls.from_triples(store.triples(domain))
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        Build the graph from per-document extraction results.
+
+        Args:
+            documents (iterable): (document key, relations) pairs
+
+        Returns:
+            RelationGraph
+        """
+        def triples():
+            for document, relations in documents:
+                for relation in relations:
+                    yield relation['source'], relation['type'], relation['target'], 1, (document,)
+        return cls.from_triples(triples())
+
+    def __len__(self):
+        return len(self.entities)
+
+    @property
+    def relation_types(self):
+        return sorted(self.matrices)
+
+    def _position(self, entity):
+        """Row of an entity, matched case-insensitively; raises KeyError if unknown."""
+        return self.index[entity_key(entity)]
+
+    def adjacency(self, relation_types=None, direction='out'):
+        """
+        Return the summed adjacency matrix of some relation types.
+
+        Args:
+            relation_types (iterable, optional): Types to include; all if omitted
+            direction (str): 'out' (row = source), 'in' (row = target) or 'both' (symmetric)
+
+        Returns:
+            scipy.sparse.csr_matrix: n x n matrix of relation counts
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction: {direction}")
+        size = len(self.entities)
+        matrix = sparse.csr_matrix((size, size))
+        for relation_type in (self.matrices if relation_types is None else relation_types):
+            if relation_type in self.matrices:
+                matrix = matrix + self.matrices[relation_type]
+        if direction == 'in':
+            return matrix.T.tocsr()
+        if direction == 'both':
+            return (matrix + matrix.T).tocsr()
+        return matrix
+
+    def degree(self, relation_types=None, direction='out', weighted=False):
+        """
+        Compute every entity's degree.
+
+        Args:
+            relation_types (iterable, optional): Types to include; all if omitted
+            direction (str): 'out', 'in' or 'both'
+            weighted (bool): Count relation mentions instead of distinct neighbors
+
+        Returns:
+            numpy.ndarray: Degree per entity, indexed like self.entities
+        """
+        matrix = self.adjacency(relation_types, direction)
+        if not weighted:
+            # Relations of different types between the same pair count once
+            matrix = (matrix > 0).astype(np.float64)
+        return np.asarray(matrix.sum(axis=1)).ravel()
+
+    def pagerank(self, relation_types=None, damping=0.85, tol=1e-6, max_iter=100):
+        """
+        Compute PageRank by power iteration over the weighted adjacency matrix.
+
+        Args:
+            relation_types (iterable, optional): Types to include; all if omitted
+            damping (float): Probability of following a relation rather than jumping
+            tol (float): Convergence threshold per entity
+            max_iter (int): Iteration limit
+
+        Returns:
+            numpy.ndarray: Scores summing to 1, indexed like self.entities
+        """
+        size = len(self.entities)
+        if size == 0:
+            return np.zeros(0)
+        matrix = self.adjacency(relation_types)
+        out_weight = np.asarray(matrix.sum(axis=1)).ravel()
+        dangling = out_weight == 0
+        inverse = np.divide(1.0, out_weight, out=np.zeros(size), where=~dangling)
+        transposed = matrix.T.tocsr()
+
+        ranks = np.full(size, 1.0 / size)
+        for _ in range(max_iter):
+            # Entities without outgoing relations spread their rank evenly
+            spread = damping * ranks[dangling].sum() / size + (1 - damping) / size
+            updated = damping * transposed.dot(ranks * inverse) + spread
+            converged = np.abs(updated - ranks).sum() < size * tol
+            ranks = updated
+            if converged:
+                break
+        return ranks / ranks.sum()
+
+    def k_hop(self, entity, k=2, relation_types=None, direction='out'):
+        """
+        Find the entities reachable from one entity within k relations.
+
+        Args:
+            entity (str): Starting entity
+            k (int): Largest number of relations followed
+            relation_types (iterable, optional): Types to follow; all if omitted
+            direction (str): 'out' follows relations forwards, 'in' backwards, 'both' either way
+
+        Returns:
+            dict: Entity name mapped to its distance in relations (the start entity has 0)
+
+        Raises:
+            KeyError: If the entity is not in the graph
+        """
+        start = self._position(entity)
+        # Rows of the transposed matrix list the entities that reach each column
+        step = self.adjacency(relation_types, direction).T.tocsr()
+        step.data[:] = 1
+
+        distances = np.full(len(self.entities), -1)
+        distances[start] = 0
+        frontier = np.zeros(len(self.entities))
+        frontier[start] = 1
+        for hop in range(1, k + 1):
+            reached = (step.dot(frontier) > 0) & (distances < 0)
+            if not reached.any():
+                break
+            distances[reached] = hop
+            frontier = reached.astype(np.float64)
+        return {self.entities[i]: int(distances[i]) for i in np.flatnonzero(distances >= 0)}
+
+    def cooccurrence(self, entity=None, top=10):
+        """
+        Count the documents entities are mentioned in together.
+
+        Args:
+            entity (str, optional): Return the entities that co-occur most with this one;
+                without it the full co-occurrence matrix is returned
+            top (int): Number of co-occurring entities returned for an entity
+
+        Returns:
+            list or scipy.sparse.csr_matrix: (entity, shared documents) pairs, or the
+                n x n matrix of shared document counts
+
+        Raises:
+            ValueError: If the graph was built without document provenance
+        """
+        if self.mentions is None:
+            raise ValueError("Co-occurrence needs document provenance; build the graph from a store or documents")
+        if entity is None:
+            return (self.mentions @ self.mentions.T).tocsr()
+
+        position = self._position(entity)
+        shared = np.asarray((self.mentions @ self.mentions[position].T).todense()).ravel()
+        shared[position] = 0
+        return self.top_entities(shared, top)
+
+    def top_entities(self, scores, n=10):
+        """
+        Return the n highest scoring entities.
+
+        Args:
+            scores (numpy.ndarray): One score per entity, e.g. from degree or pagerank
+            n (int): Number of entities
+
+        Returns:
+            list: (entity, score) pairs, highest first, leaving out zero scores
+        """
+        n = min(n, len(scores))
+        if n <= 0:
+            return []
+        best = np.argpartition(-scores, n - 1)[:n]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(self.entities[i], float(scores[i])) for i in best if scores[i] > 0]
+
+    def to_networkx(self, entities=None, relation_types=None, max_nodes=MAX_EXPORT_NODES):
+        """
+        Export a small subgraph as a weighted NetworkX graph.
+
+        The result has the attributes of visualization.build_weighted_graph, so
+        it can be passed to level_of_detail or graph_to_json.
+
+        Args:
+            entities (iterable, optional): Entities to include, e.g. the keys of k_hop; all if omitted
+            relation_types (iterable, optional): Types to include; all if omitted
+            max_nodes (int): Refuse larger exports, which NetworkX handles poorly
+
+        Returns:
+            networkx.DiGraph
+        """
+        positions = range(len(self.entities)) if entities is None else sorted(
+            {self._position(entity) for entity in entities})
+        if len(positions) > max_nodes:
+            raise ValueError(f"Subgraph of {len(positions)} entities is larger than max_nodes={max_nodes}")
+
+        positions = np.asarray(positions, dtype=np.int64)
+        documents = np.asarray(self.mentions[positions].sum(axis=1)).ravel() if self.mentions is not None \
+            else np.zeros(len(positions))
+
+        G = nx.DiGraph()
+        for position, count in zip(positions, documents):
+            G.add_node(self.entities[position], type=None, count=int(count))
+
+        for relation_type in (self.relation_types if relation_types is None else relation_types):
+            if relation_type not in self.matrices:
+                continue
+            block = self.matrices[relation_type][positions][:, positions].tocoo()
+            for row, col, count in zip(block.row, block.col, block.data):
+                source, target = self.entities[positions[row]], self.entities[positions[col]]
+                if G.has_edge(source, target):
+                    data = G.edges[source, target]
+                    data['weight'] += int(count)
+                    data['types'][relation_type] = int(count)
+                else:
+                    G.add_edge(source, target, weight=int(count), types={relation_type: int(count)})
+
+        for _, _, data in G.edges(data=True):
+            data['label'] = ', '.join(sorted(data['types'], key=lambda name: (-data['types'][name], name)))
+        return G
@@ -0,0 +1,173 @@
+import codecs
+import json
+
+# Bytes read from a stream at a time when parsing JSON arrays
+CHUNK_SIZE = 64 * 1024
+
+# Characters that can continue a JSON number
+_NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+
+def iter_ndjson(stream):
+    """
+    Yield records from newline-delimited JSON without reading the whole input.
+
+    Args:
+        stream: Binary or text file-like object with one JSON value per line
+
+    Yields:
+        object: Decoded JSON value for each non-blank line
+    """
+    for line in stream:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+class _JsonReader:
+    """Incremental reader over a JSON document that keeps only unread text buffered."""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.position = 0
+        self.exhausted = False
+
+    def _read_more(self):
+        # Returns '' only at end of input, even if a chunk ends inside a UTF-8 sequence
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not isinstance(chunk, bytes):
+                return chunk
+            text = self.utf8.decode(chunk, final=not chunk)
+            if text or not chunk:
+                return text
+
+    def _fill(self):
+        """Drop consumed text and append the next chunk; False at end of input."""
+        if self.exhausted:
+            return False
+        more = self._read_more()
+        if not more:
+            self.exhausted = True
+            return False
+        self.buffer = self.buffer[self.position:] + more
+        self.position = 0
+        return True
+
+    def peek(self, skip=' \t\r\n'):
+        """Skip the given characters and return the next one, or '' at end of input."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in skip:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ''
+
+    def decode(self):
+        """Decode the JSON value at the current position, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                # The value spans the chunk boundary; read more and retry
+                if not self._fill():
+                    raise
+                continue
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and all(char in _NUMBER_CHARS for char in self.buffer[end:]) and self._fill()):
+                # A number cut at the chunk boundary (e.g. "12" of "12.5e3") continues in the next chunk
+                continue
+            self.position = end
+            return value
+
+    def iter_array(self):
+        """Yield the elements of the array whose '[' was just consumed."""
+        while True:
+            char = self.peek(' \t\r\n,')
+            if not char:
+                raise ValueError("Unexpected end of JSON array")
+            if char == ']':
+                self.position += 1
+                return
+            yield self.decode()
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE, key=None):
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    Only the current element is held in memory, so arbitrarily large arrays
+    can be processed with a flat memory profile.
+
+    Args:
+        stream: Binary or text file-like object containing a JSON array
+        chunk_size (int): Number of bytes or characters read at a time
+        key (str, optional): Also accept a top-level object and stream the array
+            stored under this key, e.g. 'samples' for data/*/samples.json
+
+    Yields:
+        object: Each element of the array
+
+    Raises:
+        ValueError: If the input is not a JSON array (or an object holding one under key)
+    """
+    reader = _JsonReader(stream, chunk_size)
+    char = reader.peek()
+    if not char:
+        return
+    reader.position += 1
+
+    if char == '[':
+        yield from reader.iter_array()
+        return
+    if char != '{' or key is None:
+        raise ValueError("Expected a JSON array")
+
+    while True:
+        char = reader.peek(' \t\r\n,')
+        if char == '}':
+            return
+        if not char:
+            raise ValueError("Unexpected end of JSON object")
+        name = reader.decode()
+        if reader.peek() != ':':
+            raise ValueError("Expected ':' in JSON object")
+        reader.position += 1
+        if name != key:
+            # Other members are decoded and discarded
+            reader.decode()
+            continue
+        if reader.peek() != '[':
+            raise ValueError(f"Expected '{key}' to hold a JSON array")
+        reader.position += 1
+        yield from reader.iter_array()
+        return
+
+
+def iter_batches(iterable, size):
+    """
+    Group an iterable into lists of at most size items.
+
+    Args:
+        iterable: Any iterable (consumed lazily)
+        size (int): Maximum batch length
+
+    Yields:
+        list: Consecutive batches
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -1,180 +1,478 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import base64
+import hashlib
+import heapq
+import io
+import json
+import os
+import threading
+
 import networkx as nx
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from pyvis.network import Network
-import io
-import base64
 
-def create_relation_graph(entities, relations, output_path=None):
+from models.cache import ExtractionCache
+from models.disk_cache import DiskExtractionCache
+
+# Node colors by entity type for static images
+NODE_COLORS = {'DISEASE': 'red', 'MEDICATION': 'blue', 'PROCEDURE': 'purple',
+               'SYMPTOM': 'orange', 'COMPANY': 'green', 'PRODUCT': 'cyan',
+               'METRIC': 'gray', 'EVENT': 'lightgreen'}
+
+# Edge colors by relation type for static images
+EDGE_COLORS = {'treats': 'blue', 'causes': 'red', 'prevents': 'green',
+               'indicates': 'orange', 'acquired': 'purple', 'launched': 'teal',
+               'increased': 'green', 'decreased': 'red'}
+
+# Node colors by entity type for interactive graphs
+INTERACTIVE_NODE_COLORS = {
+    'DISEASE': '#dc3545',     # red
+    'MEDICATION': '#0d6efd',  # blue
+    'PROCEDURE': '#6f42c1',   # purple
+    'SYMPTOM': '#fd7e14',     # orange
+    'COMPANY': '#20c997',     # teal
+    'PRODUCT': '#0dcaf0',     # cyan
+    'METRIC': '#6c757d',      # gray
+    'EVENT': '#198754'        # green
+}
+
+# Output formats the renderer can produce, with their MIME types
+IMAGE_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+# Interactive graphs with more nodes than this are pruned to the most connected ones
+DEFAULT_MAX_NODES = 200
+
+# Ways of ranking nodes for the level-of-detail view
+RANKINGS = ('degree', 'frequency')
+
+def build_graph(entities, relations):
     """
-    Create a NetworkX graph from extracted entities and relations.
-    
+    Build a directed NetworkX graph from extracted entities and relations.
+
     Args:
         entities (list): List of entity dictionaries
         relations (list): List of relation dictionaries
-        output_path (str, optional): Path to save the visualization
-        
+
     Returns:
-        networkx.Graph: The created graph
+        networkx.DiGraph: Entities as nodes (with their type) and relations as labelled edges
     """
-    # Create a directed graph
     G = nx.DiGraph()
-    
+
     # Add nodes for entities
     for entity in entities:
         G.add_node(entity['text'], type=entity['type'])
-    
+
     # Add edges for relations
     for relation in relations:
-        G.add_edge(relation['source'], relation['target'], 
+        G.add_edge(relation['source'], relation['target'],
                    label=relation['type'], relation_type=relation['type'])
-    
+
+    return G
+
+def render_graph(G, image_format='png', figsize=(10, 6)):
+    """
+    Draw a relation graph into an image.
+
+    The drawing uses its own Figure and Agg canvas rather than the global pyplot
+    state, so renders in different threads do not interfere with each other.
+
+    Args:
+        G (networkx.DiGraph): Graph from build_graph
+        image_format (str): 'png' or 'svg'
+        figsize (tuple): Figure size in inches
+
+    Returns:
+        bytes: The encoded image
+    """
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+
+    # Get node positions using force-directed layout
+    pos = nx.spring_layout(G, seed=42)
+
+    # Draw nodes, colored by entity type ('type' is missing for nodes only seen in relations)
+    node_color = [NODE_COLORS.get(G.nodes[node].get('type'), 'black') for node in G.nodes()]
+    nx.draw_networkx_nodes(G, pos, ax=ax, node_color=node_color, alpha=0.8, node_size=500)
+
+    # Draw edges
+    edge_color = [EDGE_COLORS.get(G.edges[edge]['relation_type'], 'black') for edge in G.edges()]
+    nx.draw_networkx_edges(G, pos, ax=ax, edge_color=edge_color, width=2,
+                           arrowsize=15, arrowstyle='->')
+
+    # Draw labels
+    nx.draw_networkx_labels(G, pos, ax=ax, font_size=10, font_weight='bold')
+
+    # Draw edge labels
+    edge_labels = {(u, v): G.edges[u, v]['label'] for u, v in G.edges()}
+    nx.draw_networkx_edge_labels(G, pos, ax=ax, edge_labels=edge_labels, font_size=8)
+
+    ax.axis('off')
+    figure.tight_layout()
+
+    image = io.BytesIO()
+    figure.savefig(image, format=image_format, bbox_inches='tight')
+    return image.getvalue()
+
+def graph_key(entities, relations, *options):
+    """
+    Hash the parts of entities and relations that appear in a rendered graph.
+
+    Offsets and other fields are left out, so the same graph from different
+    documents shares one cache entry.
+
+    Args:
+        entities (list): List of entity dictionaries
+        relations (list): List of relation dictionaries
+        *options: JSON-serializable render options (format, size, ...) included in the hash
+
+    Returns:
+        str: Hexadecimal digest
+    """
+    payload = json.dumps([
+        [(entity['text'], entity['type']) for entity in entities],
+        [(relation['source'], relation['target'], relation['type']) for relation in relations],
+        *options
+    ])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class GraphRenderer:
+    """Renders relation graphs on a bounded thread pool and caches the encoded images."""
+
+    def __init__(self, max_workers=2, cache_size=128):
+        """
+        Initialize the renderer.
+
+        Args:
+            max_workers (int): Threads drawing graphs at the same time
+            cache_size (int): Number of rendered images kept
+        """
+        self.max_workers = max_workers
+        self.cache = ExtractionCache(max_size=cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='graph-render')
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, entities, relations, image_format='png', figsize=(10, 6), graph=None):
+        """
+        Start rendering a graph unless it is cached or already being rendered.
+
+        Args:
+            entities (list): List of entity dictionaries
+            relations (list): List of relation dictionaries
+            image_format (str): 'png' or 'svg'
+            figsize (tuple): Figure size in inches
+            graph (networkx.DiGraph, optional): build_graph of entities and relations, if the
+                caller already has it; built here otherwise
+
+        Returns:
+            concurrent.futures.Future: Resolves to the encoded image bytes
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        key = graph_key(entities, relations, image_format, figsize)
+
+        with self._lock:
+            image = self.cache.get(key)
+            if image is not None:
+                future = Future()
+                future.set_result(image)
+                return future
+            # Identical concurrent requests share one render
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            G = graph if graph is not None else build_graph(entities, relations)
+            future = self._executor.submit(render_graph, G, image_format, figsize)
+            self._in_flight[key] = future
+
+        # Registered outside the lock: the callback runs at once if the render already finished
+        future.add_done_callback(lambda done: self._finish(key, done))
+        return future
+
+    def _finish(self, key, future):
+        """Move a finished render from the in-flight table into the cache."""
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if future.exception() is None:
+                self.cache.set(key, future.result())
+
+    def render(self, entities, relations, image_format='png', figsize=(10, 6), timeout=None, graph=None):
+        """Render a graph (or fetch it from the cache) and return the encoded image bytes."""
+        return self.submit(entities, relations, image_format, figsize, graph).result(timeout)
+
+    def stats(self):
+        """Return cache counters and the number of renders in progress."""
+        stats = self.cache.stats()
+        with self._lock:
+            stats['in_flight'] = len(self._in_flight)
+        stats['max_workers'] = self.max_workers
+        return stats
+
+    def close(self):
+        """Wait for queued renders and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+# Shared renderer used by the helpers below and the web app
+renderer = GraphRenderer(max_workers=int(os.environ.get('GRAPH_RENDER_WORKERS', '2')),
+                         cache_size=int(os.environ.get('GRAPH_CACHE_SIZE', '128')))
+
+def create_relation_graph(entities, relations, output_path=None):
+    """
+    Create a NetworkX graph from extracted entities and relations.
+
+    Args:
+        entities (list): List of entity dictionaries
+        relations (list): List of relation dictionaries
+        output_path (str, optional): Path to save the visualization (SVG if it ends in .svg, else PNG)
+
+    Returns:
+        networkx.Graph: The created graph
+    """
+    G = build_graph(entities, relations)
+
     # Save the graph if output path is provided
     if output_path:
-        plt.figure(figsize=(12, 8))
-        
-        # Get node positions using force-directed layout
-        pos = nx.spring_layout(G, seed=42)
-        
-        # Draw nodes
-        node_colors = {'DISEASE': 'red', 'MEDICATION': 'blue', 'PROCEDURE': 'purple', 
-                      'SYMPTOM': 'orange', 'COMPANY': 'green', 'PRODUCT': 'cyan',
-                      'METRIC': 'gray', 'EVENT': 'lightgreen'}
-        
-        # Get node types and colors
-        node_color = [node_colors.get(G.nodes[node]['type'], 'black') for node in G.nodes()]
-        
-        nx.draw_networkx_nodes(G, pos, node_color=node_color, alpha=0.8, node_size=500)
-        
-        # Draw edges
-        edge_colors = {'treats': 'blue', 'causes': 'red', 'prevents': 'green', 
-                      'indicates': 'orange', 'acquired': 'purple', 'launched': 'teal',
-                      'increased': 'green', 'decreased': 'red'}
-        
-        edge_color = [edge_colors.get(G.edges[edge]['relation_type'], 'black') for edge in G.edges()]
-        
-        nx.draw_networkx_edges(G, pos, edge_color=edge_color, width=2, 
-                              arrowsize=15, arrowstyle='->')
-        
-        # Draw labels
-        nx.draw_networkx_labels(G, pos, font_size=10, font_weight='bold')
-        
-        # Draw edge labels
-        edge_labels = {(u, v): G.edges[u, v]['label'] for u, v in G.edges()}
-        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=8)
-        
-        plt.axis('off')
-        plt.tight_layout()
-        plt.savefig(output_path, format='png', bbox_inches='tight')
-        plt.close()
-    
+        image_format = 'svg' if output_path.lower().endswith('.svg') else 'png'
+        image = renderer.render(entities, relations, image_format, figsize=(12, 8), graph=G)
+        with open(output_path, 'wb') as f:
+            f.write(image)
+
+    return G
+
+def build_weighted_graph(entities, relations):
+    """
+    Aggregate repeated entities and relations into a weighted directed graph.
+
+    Args:
+        entities (list): List of entity dictionaries
+        relations (list): List of relation dictionaries
+
+    Returns:
+        networkx.DiGraph: Nodes carry 'type' and 'count' (mentions); edges carry
+            'weight' (relations between the pair), 'types' (count per relation type)
+            and 'label' (the relation types, most frequent first)
+    """
+    G = nx.DiGraph()
+
+    for entity in entities:
+        if entity['text'] in G:
+            G.nodes[entity['text']]['count'] += 1
+        else:
+            G.add_node(entity['text'], type=entity['type'], count=1)
+
+    for relation in relations:
+        source, target = relation['source'], relation['target']
+        # Relation endpoints are not always among the entities
+        for node in (source, target):
+            if node not in G:
+                G.add_node(node, type=None, count=0)
+        if G.has_edge(source, target):
+            data = G.edges[source, target]
+            data['weight'] += 1
+            data['types'][relation['type']] = data['types'].get(relation['type'], 0) + 1
+        else:
+            G.add_edge(source, target, weight=1, types={relation['type']: 1})
+
+    for _, _, data in G.edges(data=True):
+        data['label'] = ', '.join(sorted(data['types'], key=lambda name: (-data['types'][name], name)))
+
+    return G
+
+def _neighbors(G, node, min_edge_weight=1):
+    """Nodes linked to node in either direction by an edge of at least min_edge_weight."""
+    linked = set()
+    for source, target, weight in G.out_edges(node, data='weight'):
+        if weight >= min_edge_weight:
+            linked.add(target)
+    for source, target, weight in G.in_edges(node, data='weight'):
+        if weight >= min_edge_weight:
+            linked.add(source)
+    return linked
+
+def _subgraph(G, nodes, min_edge_weight, rank_by):
+    """Copy the induced subgraph without light edges, noting on each node how many neighbors are hidden."""
+    weight = None if rank_by == 'degree' else 'weight'
+    H = G.subgraph(nodes).copy()
+    H.remove_edges_from([(u, v) for u, v, w in H.edges(data='weight') if w < min_edge_weight])
+    for node in H:
+        H.nodes[node]['degree'] = G.degree(node, weight=weight)
+        H.nodes[node]['hidden'] = len(_neighbors(G, node)) - len(_neighbors(H, node))
+    return H
+
+def level_of_detail(G, max_nodes=DEFAULT_MAX_NODES, min_edge_weight=1, rank_by='degree'):
+    """
+    Reduce a weighted graph to its most important part.
+
+    Args:
+        G (networkx.DiGraph): Graph from build_weighted_graph
+        max_nodes (int, optional): Nodes kept, ranked by rank_by; None keeps all
+        min_edge_weight (int): Edges seen fewer times than this are collapsed (left out)
+        rank_by (str): 'degree' (distinct neighbors) or 'frequency' (relations, counting repeats)
+
+    Returns:
+        networkx.DiGraph: The reduced graph; each node has 'degree' (in G) and
+            'hidden' (neighbors in G not shown)
+    """
+    if rank_by not in RANKINGS:
+        raise ValueError(f"Unknown ranking: {rank_by}")
+    nodes = list(G)
+    if max_nodes is not None and len(nodes) > max_nodes:
+        weight = None if rank_by == 'degree' else 'weight'
+        degrees = dict(G.degree(weight=weight))
+        nodes = heapq.nlargest(max_nodes, nodes, key=lambda node: (degrees[node], G.nodes[node]['count']))
+    return _subgraph(G, nodes, min_edge_weight, rank_by)
+
+def neighborhood(G, node, depth=1, max_nodes=50, min_edge_weight=1, rank_by='degree'):
+    """
+    Select the nodes within depth links of node, strongest links first.
+
+    Args:
+        G (networkx.DiGraph): Graph from build_weighted_graph
+        node (str): Node to expand
+        depth (int): Number of links to follow
+        max_nodes (int): Largest number of nodes returned, including node
+        min_edge_weight (int): Lighter edges are neither followed nor returned
+        rank_by (str): Ranking reported as each node's 'degree'
+
+    Returns:
+        networkx.DiGraph: The neighborhood, annotated like level_of_detail
+
+    Raises:
+        KeyError: If node is not in the graph
+    """
+    if node not in G:
+        raise KeyError(node)
+    selected = {node}
+    frontier = [node]
+    for _ in range(depth):
+        # Score each new neighbor by the weight of its links into the frontier
+        scores = {}
+        for current in frontier:
+            for neighbor in _neighbors(G, current, min_edge_weight):
+                if neighbor not in selected:
+                    weight = (G.edges[current, neighbor]['weight'] if G.has_edge(current, neighbor) else 0) + \
+                             (G.edges[neighbor, current]['weight'] if G.has_edge(neighbor, current) else 0)
+                    scores[neighbor] = scores.get(neighbor, 0) + weight
+        room = max_nodes - len(selected)
+        frontier = heapq.nlargest(room, scores, key=lambda neighbor: (scores[neighbor], G.nodes[neighbor]['count'])) \
+            if room > 0 else []
+        if not frontier:
+            break
+        selected.update(frontier)
+    return _subgraph(G, selected, min_edge_weight, rank_by)
+
+def graph_to_json(H):
+    """
+    Convert a reduced graph to vis.js-style node and edge lists.
+
+    Args:
+        H (networkx.DiGraph): Graph from level_of_detail or neighborhood
+
+    Returns:
+        dict: {'nodes': [{id, label, group, value, hidden}], 'edges': [{from, to, label, weight}]}
+    """
+    return {
+        'nodes': [{'id': node, 'label': node, 'group': data['type'], 'value': data['degree'],
+                   'hidden': data['hidden']} for node, data in H.nodes(data=True)],
+        'edges': [{'from': u, 'to': v, 'label': data['label'], 'weight': data['weight']}
+                  for u, v, data in H.edges(data=True)]
+    }
+
+# Graphs kept for on-demand neighborhood expansion, keyed by graph_key
+graph_store = ExtractionCache(max_size=int(os.environ.get('GRAPH_STORE_SIZE', '32')), ttl=3600)
+
+# Number of registered graphs kept in the shared SQLite store
+SHARED_GRAPH_STORE_SIZE = 1000
+
+# Entities and relations of registered graphs, shared by every server process so a graph
+# registered by one worker can be expanded by another; None keeps graphs in this process only
+shared_graph_store = (DiskExtractionCache(os.environ['GRAPH_STORE_PATH'], max_entries=SHARED_GRAPH_STORE_SIZE)
+                      if os.environ.get('GRAPH_STORE_PATH') else None)
+
+def _shared_key(graph_id):
+    return ('graph', 'weighted', graph_id)
+
+def register_graph(entities, relations):
+    """
+    Build (or reuse) the weighted graph of entities and relations and keep it for expansion.
+
+    Returns:
+        tuple: (graph id, networkx.DiGraph)
+    """
+    graph_id = graph_key(entities, relations, 'weighted')
+    G = graph_store.get(graph_id)
+    if G is None:
+        G = build_weighted_graph(entities, relations)
+        graph_store.set(graph_id, G)
+        if shared_graph_store is not None:
+            shared_graph_store.set(_shared_key(graph_id), (entities, relations))
+    return graph_id, G
+
+def lookup_graph(graph_id):
+    """
+    Return a registered graph, or None if it is unknown or has expired.
+
+    Graphs registered by other processes are rebuilt from the shared store.
+    """
+    G = graph_store.get(graph_id)
+    if G is None and shared_graph_store is not None:
+        stored = shared_graph_store.get(_shared_key(graph_id))
+        if stored is not None:
+            G = build_weighted_graph(*stored)
+            graph_store.set(graph_id, G)
     return G
 
-def create_interactive_graph(entities, relations):
+def create_interactive_graph(entities, relations, max_nodes=None, min_edge_weight=1, rank_by='degree'):
     """
     Create an interactive HTML visualization using pyvis.
-    
+
+    Repeated relations between two entities are drawn as one edge. Large graphs
+    can be pruned to their max_nodes most connected entities (DEFAULT_MAX_NODES
+    is a good bound) so the page stays small enough for the browser to lay out;
+    the neighborhoods left out can be fetched from the /graph/expand endpoint.
+
     Args:
         entities (list): List of entity dictionaries
         relations (list): List of relation dictionaries
-        
+        max_nodes (int, optional): Largest number of entities drawn; None draws all
+        min_edge_weight (int): Relations seen fewer times than this are not drawn
+        rank_by (str): 'degree' or 'frequency', see level_of_detail
+
     Returns:
         str: HTML string of the visualization
     """
+    H = level_of_detail(build_weighted_graph(entities, relations), max_nodes, min_edge_weight, rank_by)
+
     # Create a pyvis network
     net = Network(height="500px", width="100%", directed=True)
-    
-    # Define node colors by type
-    node_colors = {
-        'DISEASE': '#dc3545',     # red
-        'MEDICATION': '#0d6efd',  # blue
-        'PROCEDURE': '#6f42c1',   # purple
-        'SYMPTOM': '#fd7e14',     # orange
-        'COMPANY': '#20c997',     # teal
-        'PRODUCT': '#0dcaf0',     # cyan
-        'METRIC': '#6c757d',      # gray
-        'EVENT': '#198754'        # green
-    }
-    
-    # Add nodes
-    for entity in entities:
-        node_color = node_colors.get(entity['type'], '#000000')
-        net.add_node(entity['text'], label=entity['text'], title=entity['type'], 
-                    color=node_color, shape='box')
-    
-    # Add edges
-    for relation in relations:
-        net.add_edge(relation['source'], relation['target'], 
-                    title=relation['type'], label=relation['type'])
-    
+
+    # Add nodes, noting connections left out of the view
+    for node, data in H.nodes(data=True):
+        node_color = INTERACTIVE_NODE_COLORS.get(data['type'], '#000000')
+        title = data['type'] or ''
+        if data['hidden']:
+            title += f" ({data['hidden']} more connections)"
+        net.add_node(node, label=node, title=title, color=node_color, shape='box')
+
+    # Add edges, one per related pair
+    for source, target, data in H.edges(data=True):
+        net.add_edge(source, target, title=data['label'], label=data['label'], value=data['weight'])
+
     # Generate HTML
-    html = net.generate_html()
-    
-    return html
+    return net.generate_html()
 
 def get_graph_image_base64(entities, relations):
     """
     Create a graph image and return as base64 encoded string.
-    
+
     Args:
         entities (list): List of entity dictionaries
         relations (list): List of relation dictionaries
-        
+
     Returns:
         str: Base64 encoded PNG image
     """
-    # Create a graph
-    G = nx.DiGraph()
-    
-    # Add nodes for entities
-    for entity in entities:
-        G.add_node(entity['text'], type=entity['type'])
-    
-    # Add edges for relations
-    for relation in relations:
-        G.add_edge(relation['source'], relation['target'], 
-                   label=relation['type'], relation_type=relation['type'])
-    
-    # Create figure
-    plt.figure(figsize=(10, 6))
-    
-    # Get node positions using force-directed layout
-    pos = nx.spring_layout(G, seed=42)
-    
-    # Draw nodes
-    node_colors = {'DISEASE': 'red', 'MEDICATION': 'blue', 'PROCEDURE': 'purple', 
-                  'SYMPTOM': 'orange', 'COMPANY': 'green', 'PRODUCT': 'cyan',
-                  'METRIC': 'gray', 'EVENT': 'lightgreen'}
-    
-    # Get node types and colors
-    node_color = [node_colors.get(G.nodes[node]['type'], 'black') for node in G.nodes()]
-    
-    nx.draw_networkx_nodes(G, pos, node_color=node_color, alpha=0.8, node_size=500)
-    
-    # Draw edges
-    edge_colors = {'treats': 'blue', 'causes': 'red', 'prevents': 'green', 
-                  'indicates': 'orange', 'acquired': 'purple', 'launched': 'teal',
-                  'increased': 'green', 'decreased': 'red'}
-    
-    edge_color = [edge_colors.get(G.edges[edge]['relation_type'], 'black') for edge in G.edges()]
-    
-    nx.draw_networkx_edges(G, pos, edge_color=edge_color, width=2, 
-                          arrowsize=15, arrowstyle='->')
-    
-    # Draw labels
-    nx.draw_networkx_labels(G, pos, font_size=10, font_weight='bold')
-    
-    # Draw edge labels
-    edge_labels = {(u, v): G.edges[u, v]['label'] for u, v in G.edges()}
-    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=8)
-    
-    plt.axis('off')
-    plt.tight_layout()
-    
-    # Convert to base64
-    img_data = io.BytesIO()
-    plt.savefig(img_data, format='png', bbox_inches='tight')
-    img_data.seek(0)
-    plt.close()
-    
-    encoded = base64.b64encode(img_data.read()).decode('utf-8')
-    return encoded
\ No newline at end of file
+    image = renderer.render(entities, relations, 'png', figsize=(10, 6))
+    return base64.b64encode(image).decode('utf-8')